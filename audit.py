@@ -0,0 +1,138 @@
+"""Queue-backed JSONL audit log.
+
+`run_tool_by_name` logs an `invoke` and a `result` record per call on the
+`audit` logger. Writing those straight to a file handler would put disk I/O
+on the event loop, so `logging.conf` attaches an `AuditQueueHandler`
+instead: it only enqueues the record, and a `QueueListener` thread drains
+the queue in batches into a size-rotated JSONL file (one write and flush per
+batch). Every `extra=` field is kept, so the file can be loaded straight
+into pandas/jq for throughput analysis:
+
+    {"ts": 1718000000.123, "level": "INFO", "logger": "audit", "event": "result",
+     "tool": "pslist64", "exit_code": 0, "timeout": false, ...}
+"""
+import copy
+import json
+import logging
+import logging.handlers
+import queue
+from typing import List
+
+# attributes every LogRecord has; anything else on a record came from `extra=`
+_RESERVED = frozenset(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+
+class JsonlFormatter(logging.Formatter):
+    """One JSON object per record: timestamp, level, logger, event and all extras."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        out = {
+            "ts": round(record.created, 6),
+            "level": record.levelname,
+            "logger": record.name,
+            "event": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RESERVED and not key.startswith("_"):
+                out[key] = value
+        if record.exc_text:
+            out["exc"] = record.exc_text
+        return json.dumps(out, default=str, ensure_ascii=False)
+
+
+class JsonlRotatingFileHandler(logging.handlers.RotatingFileHandler):
+    """Size-rotating file handler that can write a batch of records at once."""
+
+    def emit_batch(self, records: List[logging.LogRecord]) -> None:
+        try:
+            data = "".join(self.format(r) + "\n" for r in records)
+        except Exception:
+            self.handleError(records[0])
+            return
+        self.acquire()
+        try:
+            if self.stream is None:
+                self.stream = self._open()
+            pos = self.stream.tell()
+            if self.maxBytes > 0 and pos and pos + len(data.encode("utf-8")) > self.maxBytes:
+                self.doRollover()
+            self.stream.write(data)
+            self.stream.flush()
+        except Exception:
+            self.handleError(records[0])
+        finally:
+            self.release()
+
+
+class BatchQueueListener(logging.handlers.QueueListener):
+    """QueueListener that hands everything already queued to the handler as one batch."""
+
+    def __init__(self, q, handler: JsonlRotatingFileHandler, batch_size: int = 256):
+        super().__init__(q, handler, respect_handler_level=True)
+        self.batch_size = max(1, batch_size)
+
+    def _monitor(self):
+        q = self.queue
+        has_task_done = hasattr(q, "task_done")
+        stop = False
+        while not stop:
+            try:
+                record = self.dequeue(True)
+            except queue.Empty:
+                break
+            batch = []
+            while True:
+                if record is self._sentinel:
+                    stop = True
+                else:
+                    batch.append(record)
+                if has_task_done:
+                    q.task_done()
+                if stop or len(batch) >= self.batch_size:
+                    break
+                try:
+                    record = self.dequeue(False)
+                except queue.Empty:
+                    break
+            if batch:
+                self.handle_batch(batch)
+
+    def handle_batch(self, records: List[logging.LogRecord]) -> None:
+        for handler in self.handlers:
+            records = [r for r in records if r.levelno >= handler.level]
+            if records:
+                handler.emit_batch(records)
+
+
+class AuditQueueHandler(logging.handlers.QueueHandler):
+    """Non-blocking audit handler for `logging.conf`.
+
+    args=(filename, max_bytes, backup_count, batch_size). The listener thread
+    starts with the handler and is stopped (draining the queue) when logging
+    shuts down.
+    """
+
+    def __init__(self, filename: str = "audit.log", max_bytes: int = 10 * 1024 * 1024,
+                 backup_count: int = 5, batch_size: int = 256):
+        super().__init__(queue.SimpleQueue())
+        self.sink = JsonlRotatingFileHandler(filename, maxBytes=max_bytes, backupCount=backup_count,
+                                             encoding="utf-8", delay=True)
+        self.sink.setFormatter(JsonlFormatter())
+        self.listener = BatchQueueListener(self.queue, self.sink, batch_size=batch_size)
+        self.listener.start()
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # keep extras as attributes; only make the record safe to hand to another thread
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def close(self) -> None:
+        if self.listener._thread is not None:
+            self.listener.stop()
+        self.sink.close()
+        super().close()
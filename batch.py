@@ -0,0 +1,140 @@
+"""Run several catalog tools in one request.
+
+Items run concurrently through `run_tool_by_name`, so the scheduler caps,
+caches and safety checks still apply to each one. Every item has its own
+timeout and error slot. Results are reported through `on_item` as soon as
+each finishes, so one slow tool does not hold back the ones already done.
+
+`run_fanout` runs one invocation on many `[targets]` at once the same way:
+one item per target, each with the per-target timeout.
+"""
+import asyncio
+import inspect
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Union
+
+from server import run_tool_by_name
+
+LOG = logging.getLogger("mcp_server")
+
+MAX_BATCH_ITEMS = 64
+MAX_FANOUT_TARGETS = 256
+
+# on_item(key, result) -> None | awaitable
+ItemCallback = Callable[[str, dict], Union[None, Awaitable[None]]]
+
+
+def item_key(index: int, item: dict) -> str:
+    return str(item.get("id") or f"{index}:{item.get('tool', '')}")
+
+
+def structured_opts(item: dict) -> Optional[dict]:
+    """Structured-output options in the per-tool form: `structured: true` plus
+    optional `columns`, `where`, `limit` and `format` keys on the item."""
+    if not item.get("structured"):
+        return None
+    return {"format": item.get("format") or "xml", "columns": item.get("columns") or "",
+            "where": item.get("where") or "", "limit": item.get("limit") or 0}
+
+
+async def _run_item(item: dict, cfg: dict, default_timeout: Optional[float]) -> dict:
+    tool = item.get("tool")
+    if not tool or not isinstance(tool, str):
+        return {"error": "invalid_item", "detail": "each item needs a `tool` name"}
+    try:
+        priority = int(item.get("priority") or 0)
+        timeout = float(item.get("timeout") or default_timeout or 0)
+        limit = int(item.get("limit") or 0)
+    except (TypeError, ValueError):
+        return {"error": "invalid_item", "tool": tool,
+                "detail": "`priority`, `timeout` and `limit` must be numbers"}
+    if timeout < 0 or limit < 0:
+        return {"error": "invalid_item", "tool": tool, "detail": "`timeout` and `limit` must not be negative"}
+    coro = run_tool_by_name(tool, str(item.get("args") or ""), cfg, priority=priority,
+                            structured=structured_opts(item), target=item.get("target") or None)
+    started = time.monotonic()
+    try:
+        if timeout:
+            res = await asyncio.wait_for(coro, timeout=timeout)
+        else:
+            res = await coro
+    except asyncio.TimeoutError:
+        return {"error": "item_timeout", "tool": tool, "timeout": True, "success": False,
+                "detail": f"no result within {timeout}s"}
+    except Exception as ex:
+        LOG.exception("batch item %s failed", tool)
+        return {"error": "internal_error", "tool": tool, "detail": str(ex)}
+    res = dict(res)
+    res["elapsed_ms"] = round(1000 * (time.monotonic() - started), 3)
+    return res
+
+
+async def run_batch(items: List[Dict[str, Any]], cfg: dict, timeout: Optional[float] = None,
+                    on_item: Optional[ItemCallback] = None, max_items: int = MAX_BATCH_ITEMS) -> dict:
+    """Run `items` ({tool, args, id?, timeout?, priority?, target?}) concurrently.
+
+    NirSoft items may also set `structured`, `columns`, `where`, `limit` and
+    `format` exactly as on the per-tool call.
+
+    Returns {"results": {key: result}, "completed": [keys in finish order]}.
+    """
+    if not isinstance(items, list) or not items:
+        return {"error": "invalid_batch", "detail": "items must be a non-empty list"}
+    if len(items) > max_items:
+        return {"error": "invalid_batch", "detail": f"at most {max_items} items per batch"}
+
+    started = time.monotonic()
+    tasks: Dict[asyncio.Task, str] = {}
+    results: Dict[str, dict] = {}
+    for i, item in enumerate(items):
+        key = item_key(i, item) if isinstance(item, dict) else str(i)
+        if key in results or key in tasks.values():
+            key = f"{i}:{key}"
+        if not isinstance(item, dict):
+            results[key] = {"error": "invalid_item", "detail": "items must be objects"}
+            continue
+        tasks[asyncio.ensure_future(_run_item(item, cfg, timeout))] = key
+
+    completed = list(results)
+    try:
+        pending = set(tasks)
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for t in done:
+                key = tasks[t]
+                results[key] = t.result()
+                completed.append(key)
+                if on_item is not None:
+                    try:
+                        r = on_item(key, results[key])
+                        if inspect.isawaitable(r):
+                            await r
+                    except Exception:
+                        LOG.exception("batch progress callback failed")
+    finally:
+        # a cancelled batch cancels every item (and so kills their processes)
+        for t in tasks:
+            if not t.done():
+                t.cancel()
+
+    return {
+        "results": {k: results[k] for k in completed},
+        "completed": completed,
+        "elapsed_ms": round(1000 * (time.monotonic() - started), 3),
+    }
+
+
+async def run_fanout(tool: str, args: str, targets: List[str], cfg: dict, timeout: Optional[float] = None,
+                     on_item: Optional[ItemCallback] = None) -> dict:
+    """Run `tool args` on every target in `targets` at once; results are keyed by target.
+
+    `timeout` bounds each target separately, so one unreachable host only
+    fails its own entry.
+    """
+    if not isinstance(targets, list) or not targets or not all(isinstance(t, str) and t for t in targets):
+        return {"error": "invalid_batch", "detail": "targets must be a non-empty list of target names"}
+    if len(set(targets)) > MAX_FANOUT_TARGETS:
+        return {"error": "invalid_batch", "detail": f"at most {MAX_FANOUT_TARGETS} targets per fan-out"}
+    items = [{"tool": tool, "args": args, "id": t, "target": t} for t in dict.fromkeys(targets)]
+    return await run_batch(items, cfg, timeout=timeout, on_item=on_item, max_items=MAX_FANOUT_TARGETS)
@@ -0,0 +1,127 @@
+"""Cold-start benchmark: process launch to the first `tools/list` response.
+
+Spawns `server_mcp.py` over stdio, performs the MCP handshake and times how
+long the first `tools/list` takes to come back. Each run is a fresh process,
+so import time, config/catalog loading and tool registration are all counted.
+
+A second, in-process measurement splits a cold start into module import
+(dominated by fastmcp itself) and `build_mcp` (config, manifest and tool
+registration), which is the part this project controls.
+
+    python benchmarks/bench_startup.py --runs 5
+
+Exits non-zero when the median `tools/list` time exceeds `--budget-ms` or the
+median `build_mcp` time exceeds `--build-budget-ms`.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Budgets for the median cold start, in milliseconds. The end-to-end figure
+# includes interpreter start-up and importing fastmcp; build_mcp is ours alone.
+DEFAULT_BUDGET_MS = 2500
+DEFAULT_BUILD_BUDGET_MS = 100
+
+_PHASES = """
+import json, sys, time
+t0 = time.perf_counter()
+import server_mcp
+t1 = time.perf_counter()
+server_mcp.build_mcp()
+t2 = time.perf_counter()
+sys.__stdout__.write(json.dumps({"import_ms": 1000 * (t1 - t0), "build_ms": 1000 * (t2 - t1)}))
+"""
+
+
+def _send(proc, msg: dict) -> None:
+    proc.stdin.write((json.dumps(msg) + "\n").encode())
+    proc.stdin.flush()
+
+
+def _recv(proc, msg_id: int) -> dict:
+    while True:
+        line = proc.stdout.readline()
+        if not line:
+            raise RuntimeError("server exited before answering")
+        msg = json.loads(line)
+        if msg.get("id") == msg_id:
+            return msg
+
+
+def measure_once(server: Path, cwd: Path) -> dict:
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE="0")
+    started = time.perf_counter()
+    proc = subprocess.Popen([sys.executable, str(server)], cwd=str(cwd), env=env,
+                            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    try:
+        _send(proc, {"jsonrpc": "2.0", "id": 1, "method": "initialize", "params": {
+            "protocolVersion": "2025-06-18", "capabilities": {},
+            "clientInfo": {"name": "bench_startup", "version": "1"}}})
+        _recv(proc, 1)
+        initialized = time.perf_counter()
+        _send(proc, {"jsonrpc": "2.0", "method": "notifications/initialized"})
+        _send(proc, {"jsonrpc": "2.0", "id": 2, "method": "tools/list"})
+        listed = _recv(proc, 2)
+        done = time.perf_counter()
+    finally:
+        proc.kill()
+        proc.wait()
+    return {
+        "initialize_ms": round(1000 * (initialized - started), 1),
+        "tools_list_ms": round(1000 * (done - started), 1),
+        "tools": len(listed.get("result", {}).get("tools", [])),
+        "payload_bytes": len(json.dumps(listed.get("result", {}))),
+    }
+
+
+def measure_phases(cwd: Path) -> dict:
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [str(ROOT), os.environ.get("PYTHONPATH")])))
+    out = subprocess.run([sys.executable, "-c", _PHASES], cwd=str(cwd), env=env,
+                         stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, check=True).stdout
+    return {k: round(v, 1) for k, v in json.loads(out).items()}
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--runs", type=int, default=5)
+    ap.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS)
+    ap.add_argument("--build-budget-ms", type=float, default=DEFAULT_BUILD_BUDGET_MS)
+    ap.add_argument("--cwd", default=str(ROOT), help="directory holding config.ini and binaries.json")
+    ap.add_argument("--json", action="store_true", help="print the raw per-run results as JSON")
+    args = ap.parse_args(argv)
+
+    runs = [measure_once(ROOT / "server_mcp.py", Path(args.cwd)) for _ in range(max(1, args.runs))]
+    phases = [measure_phases(Path(args.cwd)) for _ in range(max(1, args.runs))]
+    median = statistics.median(r["tools_list_ms"] for r in runs)
+    build = statistics.median(p["build_ms"] for p in phases)
+    summary = {
+        "runs": runs,
+        "phases": phases,
+        "median_tools_list_ms": median,
+        "median_import_ms": statistics.median(p["import_ms"] for p in phases),
+        "median_build_ms": build,
+        "budget_ms": args.budget_ms,
+        "build_budget_ms": args.build_budget_ms,
+        "within_budget": median <= args.budget_ms and build <= args.build_budget_ms,
+    }
+    if args.json:
+        print(json.dumps(summary, indent=2))
+    else:
+        for r in runs:
+            print(f"initialize {r['initialize_ms']:8.1f} ms  tools/list {r['tools_list_ms']:8.1f} ms  "
+                  f"({r['tools']} tools, {r['payload_bytes']} bytes)")
+        print(f"median tools/list {median:.1f} ms (budget {args.budget_ms:.0f} ms)")
+        print(f"median import {summary['median_import_ms']:.1f} ms, "
+              f"build_mcp {build:.1f} ms (budget {args.build_budget_ms:.0f} ms)")
+    return 0 if summary["within_budget"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
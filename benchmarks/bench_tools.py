@@ -0,0 +1,272 @@
+"""Throughput, latency and memory benchmarks for tool execution.
+
+Builds the stand-in executables from `fake_tools.py` and measures, at several
+concurrency levels:
+
+  * `runner.run_command` on its own (spawn, pipe reading, head/tail buffering,
+    timeout kill path),
+  * `server.run_tool_by_name` end to end (sanitizing, scheduler, spooling,
+    NirSoft /stext read-back),
+  * an MCP stdio round trip: `tools/call` against a freshly started
+    `server_mcp.py`.
+
+Every scenario runs in its own worker process, so the reported peak RSS
+(`ru_maxrss` of the worker and of its largest child) belongs to that
+scenario alone. Results are written as JSON; compare two runs with
+
+    python benchmarks/bench_tools.py                     # full matrix
+    python benchmarks/bench_tools.py --quick             # smaller matrix
+    python benchmarks/bench_tools.py --compare old.json new.json
+
+`--compare` exits non-zero when a scenario's p99 latency or throughput is
+worse than the baseline by more than `--threshold` (default 20%).
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import List
+
+HERE = Path(__file__).resolve().parent
+ROOT = HERE.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(HERE))
+
+import fake_tools  # noqa: E402
+
+RESULTS_DIR = HERE / "results"
+
+
+def scenarios(quick: bool = False) -> List[dict]:
+    levels = [1, 8] if quick else [1, 8, 32]
+    small = [1, 4]
+    out = []
+
+    def add(target, tool, args, calls, conc, timeout=30):
+        for c in conc:
+            out.append({"target": target, "tool": tool, "args": args, "calls": max(calls, c),
+                        "concurrency": c, "timeout": timeout})
+
+    add("run_command", "quick", [], 32 if quick else 128, levels)
+    add("run_command", "sleeper", ["0.2"], 16 if quick else 64, levels)
+    add("run_command", "trickle", ["50", "0.005"], 8 if quick else 32, small)
+    add("run_command", "bigout", ["16" if quick else "64"], 4 if quick else 8, small)
+    add("run_command", "stubborn", [], 2 if quick else 4, small, timeout=0.5)
+    add("run_tool", "quick", [], 32 if quick else 128, levels)
+    add("run_tool", "bigout", ["16" if quick else "64"], 4 if quick else 8, small)
+    add("run_tool", "stext", ["1024" if quick else "8192"], 4 if quick else 8, small)
+    for s in out:
+        s["id"] = f"{s['target']}:{s['tool']}:{'x'.join(s['args']) or '-'}:c{s['concurrency']}"
+    return out
+
+
+def _pct(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    idx = min(len(values) - 1, max(0, int(round(q * (len(values) - 1)))))
+    return values[idx]
+
+
+def _peak_rss_kb() -> dict:
+    try:
+        import resource
+    except ImportError:
+        return {}
+    scale = 1024 if sys.platform == "darwin" else 1  # macOS reports bytes
+    return {
+        "self": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss // scale,
+        "children": resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss // scale,
+    }
+
+
+async def _drive(call, calls: int, concurrency: int) -> dict:
+    sem = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    failures = 0
+
+    async def one():
+        nonlocal failures
+        async with sem:
+            t = time.perf_counter()
+            res = await call()
+            latencies.append(time.perf_counter() - t)
+            if "error" in res or not (res.get("success") or res.get("timeout")):
+                failures += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(calls)))
+    wall = time.perf_counter() - started
+    return {
+        "calls": calls,
+        "failures": failures,
+        "wall_s": round(wall, 4),
+        "throughput_per_s": round(calls / wall, 2) if wall else 0.0,
+        "p50_ms": round(1000 * _pct(latencies, 0.5), 2),
+        "p99_ms": round(1000 * _pct(latencies, 0.99), 2),
+        "mean_ms": round(1000 * statistics.mean(latencies), 2) if latencies else 0.0,
+    }
+
+
+def run_worker(spec: dict, workdir: Path) -> dict:
+    """Run one scenario in this process (called in a fresh interpreter)."""
+    paths = fake_tools.build(workdir / "bin")
+    os.chdir(workdir)
+    if spec["target"] == "run_command":
+        from runner import run_command
+
+        exe = paths[spec["tool"]]
+        args = list(spec["args"])
+        if spec["tool"] == "stext":
+            args = ["/stext", str(workdir / "out.txt")] + args
+
+        def call():
+            return run_command(exe, args, timeout=spec["timeout"], head_bytes=1024 * 1024,
+                               tail_bytes=256 * 1024, kill_grace=0.2)
+    else:
+        from server import load_config, run_tool_by_name
+
+        (workdir / "binaries.json").write_text(json.dumps(fake_tools.catalog(paths)), encoding="utf-8")
+        cfg = load_config(str(ROOT / "config.ini"))
+        cfg.update({"BINARIES_PATH": "binaries.json", "TIMEOUT": str(spec["timeout"]), "KILL_GRACE": "0.2",
+                    "RESULTS_DIR": str(workdir / "spool"), "MAX_QUEUE": "100000", "CACHE_ENABLED": "false"})
+        cfg.pop("METRICS_TEXTFILE", None)
+        name = f"fake_{spec['tool']}"
+        args = " ".join(spec["args"])
+
+        def call():
+            return run_tool_by_name(name, args, cfg)
+
+    result = asyncio.run(_drive(call, spec["calls"], spec["concurrency"]))
+    result["peak_rss_kb"] = _peak_rss_kb()
+    return result
+
+
+def measure_mcp_roundtrip(calls: int = 30) -> dict:
+    """Median/p99 `tools/call` round trip over stdio against a fresh server."""
+    from bench_startup import _recv, _send
+
+    with tempfile.TemporaryDirectory(prefix="bench-mcp-") as tmp:
+        tmp = Path(tmp)
+        paths = fake_tools.build(tmp / "bin")
+        (tmp / "binaries.json").write_text(json.dumps(fake_tools.catalog(paths)), encoding="utf-8")
+        shutil.copy(ROOT / "config.ini", tmp / "config.ini")
+        proc = subprocess.Popen([sys.executable, str(ROOT / "server_mcp.py")], cwd=str(tmp),
+                                stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+        try:
+            _send(proc, {"jsonrpc": "2.0", "id": 1, "method": "initialize", "params": {
+                "protocolVersion": "2025-06-18", "capabilities": {},
+                "clientInfo": {"name": "bench_tools", "version": "1"}}})
+            _recv(proc, 1)
+            _send(proc, {"jsonrpc": "2.0", "method": "notifications/initialized"})
+            latencies = []
+            for i in range(calls):
+                t = time.perf_counter()
+                _send(proc, {"jsonrpc": "2.0", "id": 100 + i, "method": "tools/call",
+                             "params": {"name": "fake_quick", "arguments": {"args": ""}}})
+                _recv(proc, 100 + i)
+                latencies.append(time.perf_counter() - t)
+        finally:
+            proc.kill()
+            proc.wait()
+    return {
+        "id": "mcp_stdio:tools/call:fake_quick",
+        "calls": calls,
+        "p50_ms": round(1000 * _pct(latencies, 0.5), 2),
+        "p99_ms": round(1000 * _pct(latencies, 0.99), 2),
+        "throughput_per_s": round(calls / sum(latencies), 2),
+    }
+
+
+def _git_head() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=str(ROOT), capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def run_suite(quick: bool, only: str = "") -> dict:
+    results = []
+    for spec in scenarios(quick):
+        if only and only not in spec["id"]:
+            continue
+        with tempfile.TemporaryDirectory(prefix="bench-") as tmp:
+            proc = subprocess.run([sys.executable, __file__, "--worker", json.dumps(spec), "--workdir", tmp],
+                                  capture_output=True, text=True)
+        if proc.returncode != 0:
+            results.append(dict(spec, error=proc.stderr.strip().splitlines()[-1:] or ["worker failed"]))
+            continue
+        results.append(dict(spec, **json.loads(proc.stdout.strip().splitlines()[-1])))
+        r = results[-1]
+        print(f"{spec['id']:<45} {r['throughput_per_s']:>9.1f}/s  p50 {r['p50_ms']:>9.1f} ms  "
+              f"p99 {r['p99_ms']:>9.1f} ms  rss {r['peak_rss_kb'].get('self', 0) // 1024} MiB", file=sys.stderr)
+    if not only or "mcp" in only:
+        results.append(measure_mcp_roundtrip(10 if quick else 30))
+        r = results[-1]
+        print(f"{r['id']:<45} {r['throughput_per_s']:>9.1f}/s  p50 {r['p50_ms']:>9.1f} ms  "
+              f"p99 {r['p99_ms']:>9.1f} ms", file=sys.stderr)
+    return {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "git": _git_head(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "quick": quick,
+        },
+        "results": results,
+    }
+
+
+def compare(base_path: str, new_path: str, threshold: float) -> int:
+    base = {r["id"]: r for r in json.loads(Path(base_path).read_text(encoding="utf-8"))["results"]}
+    new = {r["id"]: r for r in json.loads(Path(new_path).read_text(encoding="utf-8"))["results"]}
+    worse = 0
+    for sid in sorted(set(base) & set(new)):
+        b, n = base[sid], new[sid]
+        if "error" in b or "error" in n:
+            continue
+        p99 = n["p99_ms"] / b["p99_ms"] - 1 if b["p99_ms"] else 0.0
+        tput = n["throughput_per_s"] / b["throughput_per_s"] - 1 if b["throughput_per_s"] else 0.0
+        flag = p99 > threshold or tput < -threshold
+        worse += flag
+        print(f"{'REGRESSION' if flag else 'ok':<10} {sid:<45} p99 {p99:+7.1%}  throughput {tput:+7.1%}")
+    return 1 if worse else 0
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--quick", action="store_true", help="smaller matrix for a fast check")
+    ap.add_argument("--only", default="", help="run only scenarios whose id contains this text")
+    ap.add_argument("--out", help="result file (default benchmarks/results/bench-<timestamp>.json)")
+    ap.add_argument("--compare", nargs=2, metavar=("BASE", "NEW"))
+    ap.add_argument("--threshold", type=float, default=0.2)
+    ap.add_argument("--worker", help=argparse.SUPPRESS)
+    ap.add_argument("--workdir", help=argparse.SUPPRESS)
+    args = ap.parse_args(argv)
+
+    if args.worker:
+        print(json.dumps(run_worker(json.loads(args.worker), Path(args.workdir))))
+        return 0
+    if args.compare:
+        return compare(args.compare[0], args.compare[1], args.threshold)
+
+    report = run_suite(args.quick, args.only)
+    out = Path(args.out) if args.out else RESULTS_DIR / f"bench-{time.strftime('%Y%m%d-%H%M%S')}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(report, indent=2), encoding="utf-8")
+    print(f"wrote {out}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
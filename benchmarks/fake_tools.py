@@ -0,0 +1,121 @@
+"""Stand-in executables for benchmarks.
+
+`build(dest)` writes one small executable Python script per behaviour into
+`dest` and returns {name: path}. Each script just calls `run(mode, argv)`
+below, so they start as fast as the interpreter allows and behave the same
+on every run:
+
+    quick            print one line and exit
+    bigout MB        write MB megabytes of 100-byte lines to stdout
+    sleeper SECONDS  sleep, then print one line
+    trickle N DELAY  print N lines, DELAY seconds apart
+    stubborn         ignore SIGTERM and sleep (exercises the SIGKILL path)
+    stext KB         NirSoft-style: write KB kilobytes of report to the
+                     file after `/stext` (or rows to the file after `/sxml`)
+
+Linux/macOS only: the scripts rely on a shebang and the executable bit.
+"""
+import os
+import signal
+import stat
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List
+
+MODES = ("quick", "bigout", "sleeper", "trickle", "stubborn", "stext")
+
+_LINE = ("x" * 99 + "\n").encode()
+
+
+def _flag_value(argv: List[str], flag: str):
+    low = [a.lower() for a in argv]
+    if flag in low and low.index(flag) + 1 < len(argv):
+        return argv[low.index(flag) + 1]
+    return None
+
+
+def run(mode: str, argv: List[str]) -> int:
+    nums = [a for a in argv if not a.startswith("/")]
+    if mode == "quick":
+        print("ok")
+    elif mode == "bigout":
+        total = int(float(nums[0] if nums else 1) * 1024 * 1024)
+        block = _LINE * 640
+        out = sys.stdout.buffer
+        while total > 0:
+            chunk = block[:total]
+            out.write(chunk)
+            total -= len(chunk)
+        out.flush()
+    elif mode == "sleeper":
+        time.sleep(float(nums[0] if nums else 1))
+        print("done")
+    elif mode == "trickle":
+        count = int(nums[0]) if nums else 20
+        delay = float(nums[1]) if len(nums) > 1 else 0.01
+        for i in range(count):
+            print(f"line {i}", flush=True)
+            time.sleep(delay)
+    elif mode == "stubborn":
+        signal.signal(signal.SIGTERM, signal.SIG_IGN)
+        print("ignoring SIGTERM", flush=True)
+        time.sleep(3600)
+    elif mode == "stext":
+        kb = float(nums[0]) if nums else 64
+        text_path = _flag_value(argv, "/stext")
+        xml_path = _flag_value(argv, "/sxml")
+        rows = max(1, int(kb * 1024 // 200))
+        if xml_path:
+            with open(xml_path, "w", encoding="utf-8") as fh:
+                fh.write("<?xml version=\"1.0\" ?>\n<list>\n")
+                for i in range(rows):
+                    fh.write(f"<item><Process_Name>proc{i % 50}.exe</Process_Name><Process_ID>{i}</Process_ID>"
+                             f"<Remote_Port>{443 if i % 3 else 80}</Remote_Port></item>\n")
+                fh.write("</list>\n")
+        elif text_path:
+            with open(text_path, "w", encoding="utf-8") as fh:
+                for i in range(rows):
+                    fh.write(f"Process Name : proc{i % 50}.exe\nProcess ID   : {i}\n" + "=" * 150 + "\n")
+    else:
+        print(f"unknown mode {mode}", file=sys.stderr)
+        return 2
+    return 0
+
+
+def build(dest) -> Dict[str, str]:
+    """Write one executable per mode into `dest`; returns {mode: absolute path}."""
+    dest = Path(dest)
+    dest.mkdir(parents=True, exist_ok=True)
+    here = Path(__file__).resolve().parent
+    paths = {}
+    for mode in MODES:
+        p = dest / f"fake_{mode}"
+        p.write_text(
+            f"#!{sys.executable}\n"
+            "import sys\n"
+            f"sys.path.insert(0, {str(here)!r})\n"
+            "from fake_tools import run\n"
+            f"sys.exit(run({mode!r}, sys.argv[1:]))\n",
+            encoding="utf-8",
+        )
+        p.chmod(p.stat().st_mode | stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH)
+        paths[mode] = str(p)
+    return paths
+
+
+def catalog(paths: Dict[str, str]) -> List[dict]:
+    """binaries.json entries for the fake tools (`stext` is filed as a NirSoft tool)."""
+    return [
+        {"name": f"fake_{mode}", "exe": path, "category": "nirsoft" if mode == "stext" else "other",
+         "tags": ["benchmark"], "destructive": False, "safe_flags": []}
+        for mode, path in paths.items()
+    ]
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(1)
+    for name, path in build(sys.argv[1]).items():
+        print(f"{name}: {os.path.relpath(path)}")
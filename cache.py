@@ -0,0 +1,199 @@
+"""Opt-in result cache for read-only tools.
+
+Results are keyed by (tool, normalized argv) and kept for the tool's TTL
+(`cache_ttl` in `binaries.json`, else `[cache] default_ttl`). Entries are
+evicted least-recently-used once the cached output exceeds `max_bytes`.
+Concurrent identical requests are coalesced onto a single subprocess
+(single-flight): the first caller runs the tool, the others await its result.
+When the first caller streams output, every waiter that also streams gets
+the chunks from the moment it joined.
+"""
+import asyncio
+import inspect
+import json
+import logging
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from runner import OutputCallback
+
+LOG = logging.getLogger("mcp_server")
+
+CacheKey = Tuple[str, Tuple[str, ...], str]
+# fn(on_output) runs the tool, streaming to `on_output` when it is not None
+RunFn = Callable[[Optional[OutputCallback]], Awaitable[dict]]
+
+
+def make_key(tool: str, argv, options: Optional[dict] = None) -> CacheKey:
+    """Cache key for `argv` as tokenized by `sanitize_args` (quoting/spacing normalized).
+
+    `options` covers request settings that change the result besides argv,
+    such as structured-output columns and filters.
+    """
+    return (tool, tuple(argv), json.dumps(options, sort_keys=True) if options else "")
+
+
+def result_size(res: dict) -> int:
+    size = len(res.get("stdout") or "") + len(res.get("stderr") or "") + 256
+    if res.get("records"):
+        size += len(json.dumps(res["records"]))
+    return size
+
+
+def is_cacheable(res: dict) -> bool:
+    return bool(res.get("success")) and not res.get("timeout") and "error" not in res
+
+
+class _Flight:
+    __slots__ = ("task", "waiters", "listeners")
+
+    def __init__(self, streaming: bool):
+        self.task: Optional[asyncio.Task] = None
+        self.waiters = 0
+        # output callbacks of the waiters that stream; None when the run does not
+        self.listeners: Optional[List[OutputCallback]] = [] if streaming else None
+
+    async def emit(self, stream: str, text: str) -> None:
+        for cb in list(self.listeners):
+            try:
+                r = cb(stream, text)
+                if inspect.isawaitable(r):
+                    await r
+            except Exception:
+                LOG.exception("output callback failed; disabling streaming for this waiter")
+                self.drop(cb)
+
+    def drop(self, cb: Optional[OutputCallback]) -> None:
+        if self.listeners is not None and cb in self.listeners:
+            self.listeners.remove(cb)
+
+
+class ResultCache:
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        # key -> (expires_at, size, result); order is LRU -> MRU
+        self._entries: "OrderedDict[CacheKey, Tuple[float, int, dict]]" = OrderedDict()
+        self._inflight: Dict[CacheKey, _Flight] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+
+    def get(self, key: CacheKey) -> Optional[dict]:
+        item = self._entries.get(key)
+        if item is None:
+            return None
+        expires, size, res = item
+        if expires <= time.monotonic():
+            del self._entries[key]
+            self.bytes -= size
+            return None
+        self._entries.move_to_end(key)
+        return res
+
+    def put(self, key: CacheKey, res: dict, ttl: float) -> None:
+        size = result_size(res)
+        if size > self.max_bytes:
+            return
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self.bytes -= old[1]
+        self._entries[key] = (time.monotonic() + ttl, size, res)
+        self.bytes += size
+        while self.bytes > self.max_bytes and self._entries:
+            _k, (_e, evicted, _r) = self._entries.popitem(last=False)
+            self.bytes -= evicted
+            self.evictions += 1
+
+    def invalidate(self, tool: Optional[str] = None) -> None:
+        for key in [k for k in self._entries if tool is None or k[0] == tool]:
+            self.bytes -= self._entries.pop(key)[1]
+
+    async def get_or_run(self, key: CacheKey, ttl: float, fn: RunFn,
+                         on_output: Optional[OutputCallback] = None) -> dict:
+        """Return a cached result for `key`, or run `fn` once for all concurrent callers.
+
+        The returned dict is a copy carrying `cached: True` when it was served
+        from the cache. If every waiter is cancelled the shared run is
+        cancelled too, so an abandoned request still kills its process tree.
+
+        A run started by a caller with `on_output` streams; its chunks go to
+        every streaming waiter. A streaming caller that joins a run started
+        without one only gets the final result.
+        """
+        res = self.get(key)
+        if res is not None:
+            self.hits += 1
+            return dict(res, cached=True)
+
+        flight = self._inflight.get(key)
+        if flight is None:
+            self.misses += 1
+            flight = _Flight(streaming=on_output is not None)
+            flight.task = asyncio.ensure_future(
+                self._run(key, ttl, fn, flight.emit if on_output is not None else None))
+            self._inflight[key] = flight
+        else:
+            self.coalesced += 1
+        flight.waiters += 1
+        if on_output is not None and flight.listeners is not None:
+            flight.listeners.append(on_output)
+        try:
+            return dict(await asyncio.shield(flight.task))
+        except asyncio.CancelledError:
+            if flight.waiters == 1 and not flight.task.done():
+                flight.task.cancel()
+            raise
+        finally:
+            flight.waiters -= 1
+            flight.drop(on_output)
+
+    async def _run(self, key: CacheKey, ttl: float, fn: RunFn, on_output: Optional[OutputCallback]) -> dict:
+        try:
+            res = await fn(on_output)
+            if is_cacheable(res):
+                self.put(key, res, ttl)
+            return res
+        finally:
+            self._inflight.pop(key, None)
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "evictions": self.evictions,
+            "inflight": len(self._inflight),
+        }
+
+
+def cache_ttl(entry: dict, cfg: dict) -> float:
+    """TTL in seconds for `entry`; 0 disables caching. Destructive tools are never cached."""
+    if entry.get("destructive"):
+        return 0.0
+    ttl = entry.get("cache_ttl")
+    if ttl is None:
+        ttl = (cfg or {}).get("CACHE_DEFAULT_TTL", 0)
+    try:
+        return max(0.0, float(ttl))
+    except (TypeError, ValueError):
+        return 0.0
+
+
+_CACHE: Optional[ResultCache] = None
+
+
+def get_result_cache(cfg: Optional[dict] = None) -> Optional[ResultCache]:
+    """Return the shared cache, or None when `[cache] enabled` is off."""
+    global _CACHE
+    cfg = cfg or {}
+    if str(cfg.get("CACHE_ENABLED", "false")).lower() not in ("1", "true", "yes"):
+        return None
+    if _CACHE is None:
+        _CACHE = ResultCache(max_bytes=int(cfg.get("CACHE_MAX_BYTES", 64 * 1024 * 1024)))
+    return _CACHE
@@ -0,0 +1,125 @@
+"""Inverted index over the tool catalog for the `search_tools` meta-tool.
+
+Each entry's name, tags, description and `safe_flags` are tokenized into a
+postings map `token -> {doc: weight}`; a name match outweighs a tag match,
+which outweighs a description or flag match. The vocabulary is kept sorted
+so a query word also matches every token it is a prefix of (`proc` finds
+`procmon` and `procexp`) with a bisect instead of a scan.
+
+The index is plain data: it is built once when the tool manifest is written
+and loaded from there at startup, so a search only touches the postings of
+the query words.
+"""
+import bisect
+import re
+from typing import Dict, Iterable, List, Optional
+
+# field -> weight of a match in that field
+FIELD_WEIGHTS = {"name": 4.0, "tags": 2.0, "description": 1.0, "flags": 1.0}
+# prefix matches count for less than whole-token matches
+PREFIX_FACTOR = 0.5
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+_CAMEL_RE = re.compile(r"[A-Z]+(?![a-z])|[A-Z]?[a-z]+|[0-9]+")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens; CamelCase names also yield their parts
+    (`OpenedFilesView` -> openedfilesview, opened, files, view)."""
+    if not text:
+        return []
+    out = []
+    for word in re.split(r"[^A-Za-z0-9]+", text):
+        if not word:
+            continue
+        out.append(word.lower())
+        parts = _CAMEL_RE.findall(word)
+        if len(parts) > 1:
+            out.extend(p.lower() for p in parts)
+    return out
+
+
+def _fields(entry: dict) -> Dict[str, str]:
+    return {
+        "name": " ".join([entry.get("name") or ""] + list(entry.get("aliases") or [])),
+        "tags": " ".join(entry.get("tags") or []) + " " + (entry.get("category") or ""),
+        "description": entry.get("description") or "",
+        "flags": " ".join(str(f) for f in entry.get("safe_flags") or []),
+    }
+
+
+class CatalogIndex:
+    def __init__(self, docs: List[dict], postings: Dict[str, Dict[int, float]]):
+        # docs[i] = {"name", "category", "description"}: what a search hit returns
+        self.docs = docs
+        self.postings = postings
+        self.vocab = sorted(postings)
+
+    @classmethod
+    def build(cls, entries: Iterable[dict]) -> "CatalogIndex":
+        docs: List[dict] = []
+        postings: Dict[str, Dict[int, float]] = {}
+        for entry in entries:
+            i = len(docs)
+            docs.append({
+                "name": entry.get("name"),
+                "category": entry.get("category"),
+                "description": entry.get("description") or "",
+            })
+            for field, text in _fields(entry).items():
+                weight = FIELD_WEIGHTS[field]
+                for tok in dict.fromkeys(tokenize(text)):
+                    slot = postings.setdefault(tok, {})
+                    slot[i] = max(slot.get(i, 0.0), weight)
+        return cls(docs, postings)
+
+    def to_dict(self) -> dict:
+        return {
+            "docs": self.docs,
+            # JSON object keys must be strings; doc ids go in parallel lists
+            "postings": {tok: [list(p.keys()), list(p.values())] for tok, p in sorted(self.postings.items())},
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "CatalogIndex":
+        postings = {tok: dict(zip(ids, weights)) for tok, (ids, weights) in data["postings"].items()}
+        return cls(data["docs"], postings)
+
+    def _matches(self, word: str) -> Dict[int, float]:
+        hits = dict(self.postings.get(word, {}))
+        i = bisect.bisect_left(self.vocab, word)
+        while i < len(self.vocab) and self.vocab[i].startswith(word):
+            tok = self.vocab[i]
+            if tok != word:
+                for doc, w in self.postings[tok].items():
+                    hits[doc] = max(hits.get(doc, 0.0), w * PREFIX_FACTOR)
+            i += 1
+        return hits
+
+    def search(self, query: str, limit: int = 10, category: Optional[str] = None) -> List[dict]:
+        """Rank tools matching every word of `query` (words may be prefixes)."""
+        words = _WORD_RE.findall((query or "").lower())
+        if not words:
+            return []
+        scores: Optional[Dict[int, float]] = None
+        for word in dict.fromkeys(words):
+            hits = self._matches(word)
+            if scores is None:
+                scores = hits
+            else:
+                scores = {d: s + hits[d] for d, s in scores.items() if d in hits}
+            if not scores:
+                return []
+        ranked = sorted(scores.items(), key=lambda kv: (-kv[1], self.docs[kv[0]]["name"].lower()))
+        out = []
+        for doc, score in ranked:
+            d = self.docs[doc]
+            if category and d.get("category") != category:
+                continue
+            out.append(dict(d, score=round(score, 3)))
+            if limit and len(out) >= limit:
+                break
+        return out
+
+    def __len__(self) -> int:
+        return len(self.docs)
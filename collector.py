@@ -0,0 +1,329 @@
+"""Periodic snapshots of read-only tools, with bounded history and delta queries.
+
+Agents watching a host tend to poll `pslist64`, `cports` or `DriverView`
+over and over, and every poll returns the whole table. The collector runs
+the configured tools itself every `interval` seconds through
+`run_tool_by_name` at low priority, so the scheduler, cache and metrics
+still apply. Each snapshot is parsed into records keyed by their identifying
+columns (PID, connection endpoints, driver name), and the last `history`
+snapshots of each tool are kept in memory.
+
+`diff_since(tool, t)` compares the newest snapshot with the one that was
+current at time `t` and returns only the added, removed and changed rows,
+plus `as_of` to pass back as `t` next time. If `t` is older than the
+history still held, the whole newest snapshot is returned with
+`full: true`.
+
+NirSoft tools are parsed from their CSV export. Other tools need a
+text-table layout in `TEXT_TABLES` (pslist's is built in).
+"""
+import asyncio
+import collections
+import logging
+import time
+from typing import Deque, Dict, List, Optional, Tuple
+
+import tabular
+from registry import get_registry
+from server import run_tool_by_name
+
+LOG = logging.getLogger("mcp_server")
+
+# tool (normalized, without a trailing "64") -> columns that identify a row
+KEY_COLUMNS: Dict[str, List[str]] = {
+    "pslist": ["Pid"],
+    "cports": ["Process ID", "Protocol", "Local Address", "Local Port", "Remote Address", "Remote Port"],
+    "driverview": ["Driver Name"],
+}
+# columns that change on every poll; a row is not "changed" for these alone
+VOLATILE_COLUMNS: Dict[str, List[str]] = {
+    "pslist": ["CPU Time", "Elapsed Time"],
+}
+# whitespace-aligned text output: header columns, the first one may contain spaces
+TEXT_TABLES: Dict[str, List[str]] = {
+    "pslist": ["Name", "Pid", "Pri", "Thd", "Hnd", "Priv", "CPU Time", "Elapsed Time"],
+}
+
+Record = Dict[str, str]
+
+
+def tool_kind(name: str) -> str:
+    key = tabular.norm(name)
+    return key[:-2] if key.endswith("64") else key
+
+
+def parse_text_table(text: str, columns: List[str]) -> List[Record]:
+    """Rows of the table whose header is `columns`, up to the next blank line.
+
+    Values are split on whitespace from the right, so only the first column
+    may contain spaces (process names do, the numbers and times do not).
+    """
+    header = "".join(tabular.norm(c) for c in columns)
+    rows: List[Record] = []
+    in_table = False
+    for line in text.splitlines():
+        if not in_table:
+            in_table = tabular.norm(line) == header
+            continue
+        if not line.strip():
+            if rows:
+                break
+            continue
+        parts = line.rsplit(None, len(columns) - 1)
+        if len(parts) == len(columns):
+            rows.append(dict(zip(columns, (p.strip() for p in parts))))
+    return rows
+
+
+class Target:
+    """One collected tool: how to run it and how to key its rows."""
+
+    def __init__(self, tool: str, interval: float, args: str = "", keys: Optional[List[str]] = None,
+                 volatile: Optional[List[str]] = None, text_columns: Optional[List[str]] = None,
+                 structured: bool = False):
+        kind = tool_kind(tool)
+        self.tool = tool
+        self.interval = max(1.0, float(interval))
+        self.args = args
+        self.keys = list(keys if keys is not None else KEY_COLUMNS.get(kind, []))
+        self.volatile = frozenset(tabular.norm(c) for c in (volatile if volatile is not None
+                                                           else VOLATILE_COLUMNS.get(kind, [])))
+        self.text_columns = text_columns if text_columns is not None else TEXT_TABLES.get(kind)
+        self.structured = structured
+
+
+class Snapshot:
+    __slots__ = ("seq", "taken", "rows", "duration_s")
+
+    def __init__(self, seq: int, taken: float, rows: Dict[str, Record], duration_s: float):
+        self.seq = seq
+        self.taken = taken
+        self.rows = rows
+        self.duration_s = duration_s
+
+
+def _row_key(row: Record, keys: List[str]) -> str:
+    if not keys:
+        # no identifying columns: the whole row is the identity
+        return "|".join(row.values())
+    by_norm = {tabular.norm(k): v for k, v in row.items()}
+    return "|".join(by_norm.get(tabular.norm(k), "") for k in keys)
+
+
+def _changed_fields(old: Record, new: Record, volatile: frozenset) -> Dict[str, list]:
+    out = {}
+    for col, value in new.items():
+        if old.get(col) != value and tabular.norm(col) not in volatile:
+            out[col] = [old.get(col), value]
+    return out
+
+
+class History:
+    """Ring buffer of one target's snapshots plus its polling state."""
+
+    def __init__(self, target: Target, size: int):
+        self.target = target
+        self.snapshots: Deque[Snapshot] = collections.deque(maxlen=max(2, size))
+        self.seq = 0
+        self.polls = 0
+        self.last_error: Optional[dict] = None
+
+    def add(self, records: List[Record], taken: float, duration_s: float) -> Snapshot:
+        prev = self.snapshots[-1].rows if self.snapshots else {}
+        rows: Dict[str, Record] = {}
+        for rec in records:
+            key = _row_key(rec, self.target.keys)
+            if key in rows:
+                # duplicate identity (e.g. two identical connections): keep both
+                n = 2
+                while f"{key}#{n}" in rows:
+                    n += 1
+                key = f"{key}#{n}"
+            old = prev.get(key)
+            # unchanged rows share one dict across the whole history
+            rows[key] = old if old == rec else rec
+        self.seq += 1
+        snap = Snapshot(self.seq, taken, rows, duration_s)
+        self.snapshots.append(snap)
+        return snap
+
+    def base_for(self, since: float) -> Tuple[Optional[Snapshot], bool]:
+        """(snapshot current at `since`, whether older history was already dropped)."""
+        base = None
+        for snap in self.snapshots:
+            if snap.taken > since:
+                break
+            base = snap
+        truncated = base is None and self.snapshots[0].seq > 1 and since > 0
+        return base, truncated
+
+    def diff_since(self, since: float) -> dict:
+        if not self.snapshots:
+            out = {"error": "no_snapshot", "tool": self.target.tool,
+                   "detail": "The collector has not taken a snapshot of this tool yet."}
+            if self.last_error:
+                out["last_error"] = self.last_error
+            return out
+        latest = self.snapshots[-1]
+        base, truncated = self.base_for(since)
+        out = {"tool": self.target.tool, "since": since, "as_of": latest.taken, "seq": latest.seq,
+               "base": base.taken if base is not None else None, "full": base is None}
+        if truncated:
+            out["history_truncated"] = True
+        old_rows = base.rows if base is not None else {}
+        added, changed = [], []
+        unchanged = 0
+        for key, row in latest.rows.items():
+            old = old_rows.get(key)
+            if old is None:
+                added.append(row)
+            elif old is row:
+                unchanged += 1
+            else:
+                fields = _changed_fields(old, row, self.target.volatile)
+                if fields:
+                    changed.append({"key": key, "record": row, "fields": fields})
+                else:
+                    unchanged += 1
+        removed = [row for key, row in old_rows.items() if key not in latest.rows]
+        out.update(added=added, removed=removed, changed=changed,
+                   counts={"added": len(added), "removed": len(removed), "changed": len(changed),
+                           "unchanged": unchanged, "total": len(latest.rows)})
+        if self.last_error:
+            out["last_error"] = self.last_error
+        return out
+
+    def stats(self) -> dict:
+        latest = self.snapshots[-1] if self.snapshots else None
+        return {
+            "interval_s": self.target.interval,
+            "polls": self.polls,
+            "snapshots": len(self.snapshots),
+            "oldest": self.snapshots[0].taken if self.snapshots else None,
+            "latest": latest.taken if latest else None,
+            "rows": len(latest.rows) if latest else 0,
+            "last_duration_s": round(latest.duration_s, 3) if latest else None,
+            "last_error": self.last_error,
+        }
+
+
+class Collector:
+    def __init__(self, cfg: Optional[dict] = None, targets: Optional[List[Target]] = None, history: int = 32):
+        self.cfg = cfg or {}
+        self.history: Dict[str, History] = {t.tool: History(t, history) for t in (targets or [])}
+        self._tasks: List[asyncio.Task] = []
+        self._users = 0
+
+    @property
+    def targets(self) -> List[Target]:
+        return [h.target for h in self.history.values()]
+
+    async def poll(self, tool: str) -> Optional[Snapshot]:
+        """Run `tool` once and record its snapshot; None if the run failed."""
+        hist = self.history[tool]
+        target = hist.target
+        hist.polls += 1
+        started = time.time()
+        t0 = time.perf_counter()
+        res = await run_tool_by_name(target.tool, target.args, self.cfg, priority=-1, spool=False, index=False,
+                                     structured={"format": "csv"} if target.structured else None)
+        duration = time.perf_counter() - t0
+        if "error" in res or res.get("timeout"):
+            hist.last_error = {"at": started, "error": res.get("error") or "timeout",
+                               "detail": res.get("detail") or res.get("stderr")}
+            LOG.warning("collector: %s failed: %s", tool, hist.last_error)
+            return None
+        if target.structured:
+            records = res.get("records") or []
+        else:
+            records = await asyncio.to_thread(parse_text_table, res.get("stdout") or "", target.text_columns)
+        hist.last_error = None
+        return hist.add(records, started, duration)
+
+    async def _loop(self, tool: str) -> None:
+        interval = self.history[tool].target.interval
+        while True:
+            t0 = time.monotonic()
+            try:
+                await self.poll(tool)
+            except asyncio.CancelledError:
+                raise
+            except Exception as ex:
+                LOG.exception("collector: polling %s failed", tool)
+                self.history[tool].last_error = {"at": time.time(), "error": "internal_error", "detail": str(ex)}
+            await asyncio.sleep(max(0.0, interval - (time.monotonic() - t0)))
+
+    def start(self) -> None:
+        """Start polling (idempotent; must be called on the server's event loop)."""
+        self._users += 1
+        if self._tasks:
+            return
+        self._tasks = [asyncio.ensure_future(self._loop(tool)) for tool in self.history]
+        if self._tasks:
+            LOG.info("collector polling %s", ", ".join(f"{t.tool}/{t.interval:g}s" for t in self.targets))
+
+    async def stop(self, force: bool = False) -> None:
+        """Release one `start`; the polling stops with the last one (or at once with `force`)."""
+        self._users = 0 if force else max(0, self._users - 1)
+        if self._users or not self._tasks:
+            return
+        tasks, self._tasks = self._tasks, []
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def diff_since(self, tool: str, since: float = 0.0) -> dict:
+        hist = self.history.get(tool)
+        if hist is None:
+            return {"error": "not_collected", "tool": tool, "collected": sorted(self.history)}
+        return hist.diff_since(float(since or 0))
+
+    def stats(self) -> dict:
+        return {"running": bool(self._tasks), "targets": {tool: h.stats() for tool, h in self.history.items()}}
+
+
+def parse_targets(cfg: dict) -> List[Target]:
+    """Targets from `[collector] targets` (`tool:interval` pairs) and `keys` overrides."""
+    keys: Dict[str, List[str]] = {}
+    for part in str(cfg.get("COLLECTOR_KEYS") or "").split(";"):
+        if "=" in part:
+            tool, cols = part.split("=", 1)
+            keys[tool.strip()] = [c.strip() for c in cols.split("+") if c.strip()]
+    catalog = get_registry(cfg.get("BINARIES_PATH", "binaries.json")).catalog()
+    targets = []
+    for part in str(cfg.get("COLLECTOR_TARGETS") or "").split(","):
+        if not part.strip():
+            continue
+        tool, _, interval = part.strip().partition(":")
+        tool = tool.strip()
+        entry = catalog.get(tool)
+        if not entry:
+            LOG.warning("collector: %s is not in the catalog; skipped", tool)
+            continue
+        if catalog.policy(tool).destructive:
+            LOG.warning("collector: %s is destructive; skipped", tool)
+            continue
+        try:
+            seconds = float(interval or 60)
+        except ValueError:
+            LOG.warning("collector: bad interval for %s: %r; skipped", tool, interval)
+            continue
+        target = Target(tool, seconds, keys=keys.get(tool), structured=entry.get("category") == "nirsoft")
+        if not target.structured and not target.text_columns:
+            LOG.warning("collector: no table layout known for %s; skipped", tool)
+            continue
+        targets.append(target)
+    return targets
+
+
+_COLLECTOR: Optional[Collector] = None
+
+
+def get_collector(cfg: Optional[dict] = None) -> Collector:
+    global _COLLECTOR
+    if _COLLECTOR is None:
+        cfg = cfg or {}
+        enabled = str(cfg.get("COLLECTOR_ENABLED", "false")).lower() in ("1", "true", "yes")
+        _COLLECTOR = Collector(cfg, parse_targets(cfg) if enabled else [],
+                               history=int(cfg.get("COLLECTOR_HISTORY", 32)))
+    return _COLLECTOR
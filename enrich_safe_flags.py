@@ -3,19 +3,35 @@ per-tool JSON Schemas in `schemas/`.
 
 This script is conservative: it skips tools marked destructive in `binaries.json`
 unless you set `PROBE_DESTRUCTIVE=1` environment variable.
+
+Probes run in parallel on a bounded thread pool (`--workers`). Results are
+cached in `.probe_cache.json` by executable content: a binary whose size and
+mtime are unchanged is not even re-hashed, and one whose SHA-256 matches a
+cached probe (copied or touched) is not re-run, so only new or changed
+binaries are probed. `binaries.json` and the schema files are written once,
+atomically, after all probes finish. `--report` writes per-binary probe times.
 """
+import argparse
+import hashlib
 import json
+import logging
+import os
 import re
 import subprocess
 import sys
-import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from typing import Dict, Optional
 
 LOG = logging.getLogger("enrich_safe_flags")
 
-HELP_FLAGS = ["/?," ,"-?","--help","/help","-h","/?"]
+HELP_FLAGS = ["/?", "-?", "--help", "/help", "-h"]
 FLAG_RE = re.compile(r"(?P<flag>(?:/|-{1,2})[A-Za-z0-9][-A-Za-z0-9]*)")
 
+CACHE_PATH = Path(".probe_cache.json")
+CACHE_VERSION = 1
+
 
 def probe_help(exe: Path, timeout: int = 3) -> str:
     """Probe an executable for help output in a conservative, low-risk way.
@@ -28,12 +44,12 @@ def probe_help(exe: Path, timeout: int = 3) -> str:
     Note: For absolute isolation, run this script inside a disposable VM/container.
     """
     # Prepare a minimal environment (preserve PATH so exe can be found)
-    safe_env = {"PATH": subprocess.os.environ.get("PATH", "")}
+    safe_env = {"PATH": os.environ.get("PATH", "")}
 
     # Windows: hide the window when spawning
     creationflags = 0
     startupinfo = None
-    if subprocess.os.name == "nt":
+    if os.name == "nt":
         try:
             startupinfo = subprocess.STARTUPINFO()
             startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
@@ -41,11 +57,10 @@ def probe_help(exe: Path, timeout: int = 3) -> str:
         except Exception:
             startupinfo = None
 
-    help_flags = ["/?", "-?", "--help", "/help", "-h"]
-    for hf in help_flags:
+    for hf in HELP_FLAGS:
         try:
             res = subprocess.run([str(exe), hf], capture_output=True, text=True, timeout=timeout,
-                                 env=safe_env, cwd=subprocess.os.getcwd(), startupinfo=startupinfo,
+                                 env=safe_env, cwd=os.getcwd(), startupinfo=startupinfo,
                                  creationflags=creationflags)
         except Exception:
             continue
@@ -75,7 +90,91 @@ def make_schema(tool_name: str, flags, allow_free: bool):
     return schema
 
 
-def main():
+def sha256_file(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for block in iter(lambda: fh.read(1024 * 1024), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+class ProbeCache:
+    """Probe results keyed by SHA-256, with a path -> (size, mtime_ns, sha256) stat index."""
+
+    def __init__(self, path: Path = CACHE_PATH):
+        self.path = Path(path)
+        self.files: Dict[str, dict] = {}
+        self.probes: Dict[str, dict] = {}
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+            if data.get("version") == CACHE_VERSION:
+                self.files = data.get("files", {})
+                self.probes = data.get("probes", {})
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as ex:
+            LOG.warning("ignoring unreadable probe cache %s: %s", self.path, ex)
+
+    def digest(self, exe: Path) -> str:
+        """SHA-256 of `exe`, reusing the cached one while size and mtime are unchanged."""
+        st = exe.stat()
+        key = str(exe)
+        known = self.files.get(key)
+        if known and known["size"] == st.st_size and known["mtime_ns"] == st.st_mtime_ns:
+            return known["sha256"]
+        sha = sha256_file(exe)
+        self.files[key] = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "sha256": sha}
+        return sha
+
+    def get(self, sha: str) -> Optional[dict]:
+        return self.probes.get(sha)
+
+    def put(self, sha: str, result: dict) -> None:
+        self.probes[sha] = result
+
+    def save(self) -> None:
+        atomic_write(self.path, json.dumps({"version": CACHE_VERSION, "files": self.files,
+                                            "probes": self.probes}, indent=1))
+
+
+def atomic_write(path: Path, text: str) -> None:
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(text, encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def resolve_exe(exe: str) -> Optional[Path]:
+    exe_path = Path(exe)
+    if not exe_path.exists():
+        # try relative
+        exe_path = Path.cwd() / exe
+    return exe_path if exe_path.exists() else None
+
+
+def probe_entry(name: str, exe_path: Path, cache: ProbeCache, timeout: int, force: bool) -> dict:
+    """Probe one binary (or reuse its cached probe); returns a report row."""
+    started = time.perf_counter()
+    sha = cache.digest(exe_path)
+    cached = None if force else cache.get(sha)
+    if cached is not None:
+        return {"name": name, "exe": str(exe_path), "sha256": sha, "cached": True,
+                "flags": cached["flags"], "probe_s": round(time.perf_counter() - started, 4)}
+    flags = extract_flags(probe_help(exe_path, timeout=timeout))
+    elapsed = round(time.perf_counter() - started, 4)
+    cache.put(sha, {"flags": flags, "probe_s": elapsed, "probed_at": time.time()})
+    return {"name": name, "exe": str(exe_path), "sha256": sha, "cached": False, "flags": flags, "probe_s": elapsed}
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Probe binaries for help flags and write schemas.")
+    ap.add_argument("--workers", type=int, default=min(8, (os.cpu_count() or 2) * 2),
+                    help="parallel probes")
+    ap.add_argument("--timeout", type=int, default=3, help="seconds per help-flag attempt")
+    ap.add_argument("--cache", default=str(CACHE_PATH), help="probe cache file")
+    ap.add_argument("--force", action="store_true", help="re-probe every binary, ignoring the cache")
+    ap.add_argument("--report", help="write per-binary probe results and timings to this JSON file")
+    args = ap.parse_args(argv)
+
     base = Path("binaries.json")
     if not base.exists():
         LOG.error("binaries.json not found; run generate_binaries.py first")
@@ -86,33 +185,54 @@ def main():
     schemas_dir.mkdir(exist_ok=True)
 
     probe_destructive = (os.getenv("PROBE_DESTRUCTIVE", "0") in ("1", "true", "yes"))
-    count = 0
+    todo = []
     for e in entries:
-        name = e.get("name")
-        exe = e.get("exe")
         destructive = bool(e.get("destructive", False))
         if destructive and not probe_destructive:
             continue
-        exe_path = Path(exe)
-        if not exe_path.exists():
-            # try relative
-            exe_path = Path.cwd() / exe
-        if not exe_path.exists():
+        exe_path = resolve_exe(e.get("exe") or "")
+        if exe_path is None:
             continue
-
-        help_text = probe_help(exe_path)
-        flags = extract_flags(help_text)
-        # heurstic: allow free args unless help indicates only flags
-        allow_free = True
-        schema = make_schema(name, flags, allow_free)
-        (schemas_dir / f"{name}.schema.json").write_text(json.dumps(schema, indent=2), encoding="utf-8")
-        e["safe_flags"] = flags
-        count += 1
-
-    base.write_text(json.dumps(entries, indent=2), encoding="utf-8")
-    LOG.info("Updated binaries.json and generated %d schemas", count)
+        todo.append((e, exe_path))
+
+    cache = ProbeCache(Path(args.cache))
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, args.workers)) as pool:
+        futures = [(e, pool.submit(probe_entry, e.get("name"), p, cache, args.timeout, args.force))
+                   for e, p in todo]
+        report = []
+        for e, fut in futures:
+            try:
+                row = fut.result()
+            except OSError as ex:
+                LOG.warning("could not probe %s: %s", e.get("name"), ex)
+                continue
+            report.append(row)
+            # heurstic: allow free args unless help indicates only flags
+            allow_free = True
+            e["safe_flags"] = row["flags"]
+            e["_schema"] = make_schema(e.get("name"), row["flags"], allow_free)
+
+    # everything was probed: now write the results in one go
+    for e in entries:
+        schema = e.pop("_schema", None)
+        if schema is not None:
+            atomic_write(schemas_dir / f"{e.get('name')}.schema.json", json.dumps(schema, indent=2))
+    atomic_write(base, json.dumps(entries, indent=2))
+    cache.save()
+
+    probed = [r for r in report if not r["cached"]]
+    total = round(time.perf_counter() - started, 3)
+    LOG.info("Updated binaries.json and generated %d schemas (%d probed, %d from cache) in %.2fs",
+             len(report), len(probed), len(report) - len(probed), total)
+    for r in sorted(probed, key=lambda r: -r["probe_s"])[:10]:
+        LOG.info("  %-24s %6.2fs  %d flags", r["name"], r["probe_s"], len(r["flags"]))
+    if args.report:
+        atomic_write(Path(args.report), json.dumps({"elapsed_s": total, "workers": args.workers,
+                                                    "binaries": report}, indent=2))
+    return report
 
 
 if __name__ == "__main__":
-    import os
+    logging.basicConfig(level=logging.INFO, stream=sys.stderr)
     main()
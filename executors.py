@@ -0,0 +1,274 @@
+"""Where tools run: the local machine, or a persistent worker on another host.
+
+`run_tool_by_name` hands every run to an `Executor` picked by its `target`:
+
+  * `LocalExecutor` (no target, or `local`) spawns the tool here with
+    `runner.run_command`, as before.
+  * `WorkerExecutor` keeps one long-lived worker agent per target (see
+    worker.py), started with the command configured under `[targets]`, e.g.
+    `ssh -T host1 python C:\\sysmcp\\worker.py --root C:\\sysmcp`. Runs are
+    framed requests over that one reused pipe, several in flight at once, so
+    a run costs a round trip rather than a new connection. At most the
+    worker's `--max-concurrent` runs are sent at once; the rest wait here,
+    before their reply deadline starts. A worker that exits is restarted on
+    the next run. Runs still in flight at that point return `worker_lost`.
+
+Fan-out of one invocation over many targets lives in batch.py
+(`run_fanout`), so each target's run gets the usual checks.
+"""
+import asyncio
+import inspect
+import itertools
+import logging
+import os
+import shlex
+from asyncio.subprocess import PIPE
+from typing import Dict, List, Optional
+
+from runner import run_command
+from worker import FrameError, encode_frame, read_frame_async
+
+LOG = logging.getLogger("mcp_server")
+
+LOCAL = "local"
+
+
+class Executor:
+    """Runs one tool invocation and returns a `run_command`-shaped result."""
+
+    name = LOCAL
+    remote = False
+
+    async def run(self, exe: str, argv: List[str], timeout: float = 30, **run_opts) -> dict:
+        raise NotImplementedError
+
+    async def close(self) -> None:
+        pass
+
+    def stats(self) -> dict:
+        return {"remote": self.remote}
+
+
+class LocalExecutor(Executor):
+    async def run(self, exe: str, argv: List[str], timeout: float = 30, **run_opts) -> dict:
+        return await run_command(exe, argv, timeout=timeout, **run_opts)
+
+
+class _Call:
+    __slots__ = ("future", "on_output", "sink")
+
+    def __init__(self, future: asyncio.Future, on_output, sink):
+        self.future = future
+        self.on_output = on_output
+        self.sink = sink
+
+
+def _failed(error: str, detail: str) -> dict:
+    return {"error": error, "detail": detail, "exit_code": None, "stdout": "", "stderr": detail,
+            "timeout": False, "success": False}
+
+
+class WorkerExecutor(Executor):
+    remote = True
+
+    def __init__(self, name: str, command: List[str], start_timeout: float = 15.0, reply_slack: float = 15.0):
+        self.name = name
+        self.command = command
+        self.start_timeout = start_timeout
+        # extra seconds past the run's own timeout before the worker counts as hung
+        self.reply_slack = reply_slack
+        self._proc: Optional[asyncio.subprocess.Process] = None
+        self._reader: Optional[asyncio.Task] = None
+        self._calls: Dict[int, _Call] = {}
+        self._ids = itertools.count(1)
+        self._start_lock: Optional[asyncio.Lock] = None
+        # sized from the worker's first pong; the reply deadline starts once a slot is held
+        self._slots: Optional[asyncio.Semaphore] = None
+        self.slots = 0
+        self.queued = 0
+        self.starts = 0
+        self.requests = 0
+        self.lost = 0
+
+    def _alive(self) -> bool:
+        return self._proc is not None and self._proc.returncode is None and self._reader is not None \
+            and not self._reader.done()
+
+    async def _ensure(self) -> None:
+        if self._alive():
+            return
+        if self._start_lock is None:
+            self._start_lock = asyncio.Lock()
+        async with self._start_lock:
+            if self._alive():
+                return
+            LOG.info("starting worker for %s: %s", self.name, " ".join(self.command))
+            self._proc = await asyncio.create_subprocess_exec(*self.command, stdin=PIPE, stdout=PIPE)
+            self.starts += 1
+            self._reader = asyncio.ensure_future(self._read(self._proc))
+            # a worker that cannot start (ssh refused, no python) fails here, not on every run
+            try:
+                reply = await asyncio.wait_for(self._request({"op": "ping"}), self.start_timeout)
+                if not reply.get("pong"):
+                    raise OSError("worker exited before answering")
+                if self._slots is None:
+                    self.slots = max(1, int(reply.get("slots") or 1))
+                    self._slots = asyncio.Semaphore(self.slots)
+            except BaseException:
+                if self._proc.returncode is None:
+                    self._proc.kill()
+                raise
+
+    async def _request(self, msg: dict, on_output=None, sink=None, rid: Optional[int] = None) -> dict:
+        rid = rid or next(self._ids)
+        fut = asyncio.get_running_loop().create_future()
+        self._calls[rid] = _Call(fut, on_output, sink)
+        if self._reader.done():
+            # the worker died after `_ensure`; nothing would ever answer
+            self._calls.pop(rid, None)
+            return {"result": _failed("worker_lost", f"worker for {self.name} exited")}
+        try:
+            self._proc.stdin.write(encode_frame(dict(msg, id=rid)))
+            await self._proc.stdin.drain()
+            return await fut
+        finally:
+            self._calls.pop(rid, None)
+
+    async def _read(self, proc: asyncio.subprocess.Process) -> None:
+        try:
+            while True:
+                msg = await read_frame_async(proc.stdout)
+                if msg is None:
+                    break
+                call = self._calls.get(msg.get("id"))
+                if call is None:
+                    continue
+                if "stream" in msg:
+                    await self._forward(call, msg["stream"], msg.get("data") or "")
+                elif not call.future.done():
+                    call.future.set_result(msg)
+        except (FrameError, OSError) as ex:
+            LOG.error("worker for %s sent a bad frame: %s", self.name, ex)
+        finally:
+            self.lost += bool(self._calls)
+            for call in list(self._calls.values()):
+                if not call.future.done():
+                    call.future.set_result({"result": _failed("worker_lost", f"worker for {self.name} exited")})
+            if proc.returncode is None:
+                proc.kill()
+
+    @staticmethod
+    async def _forward(call: _Call, stream: str, text: str) -> None:
+        if stream == "stdout" and call.sink is not None:
+            call.sink.write(text.encode("utf-8"))
+        if call.on_output is None:
+            return
+        try:
+            r = call.on_output(stream, text)
+            if inspect.isawaitable(r):
+                await r
+        except Exception:
+            LOG.exception("output callback failed; disabling streaming for this call")
+            call.on_output = None
+
+    async def run(self, exe: str, argv: List[str], timeout: float = 30, on_output=None,
+                  head_bytes: Optional[int] = None, tail_bytes: Optional[int] = None, kill_grace: float = 2.0,
+                  stdout_sink=None, metrics: Optional[dict] = None) -> dict:
+        try:
+            await self._ensure()
+        except (OSError, asyncio.TimeoutError) as ex:
+            return _failed("worker_unavailable", f"could not start worker for {self.name}: {ex!r}")
+        self.queued += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self.queued -= 1
+        try:
+            self.requests += 1
+            rid = next(self._ids)
+            req = {"op": "run", "exe": exe, "argv": list(argv), "timeout": timeout, "head_bytes": head_bytes,
+                   "tail_bytes": tail_bytes, "kill_grace": kill_grace,
+                   "stream": on_output is not None or stdout_sink is not None}
+            task = asyncio.ensure_future(self._request(req, on_output, stdout_sink, rid))
+            try:
+                done, _ = await asyncio.wait({task}, timeout=timeout + kill_grace + self.reply_slack)
+            except asyncio.CancelledError:
+                task.cancel()
+                self._cancel_remote(rid)
+                raise
+            if not done:
+                task.cancel()
+                self._cancel_remote(rid)
+                return _failed("worker_timeout", f"no reply from worker for {self.name}")
+            try:
+                reply = task.result()
+            except OSError as ex:
+                # the pipe broke while the request was being written
+                return _failed("worker_lost", f"worker for {self.name} went away: {ex!r}")
+            if metrics is not None:
+                metrics.update(reply.get("metrics") or {})
+            return reply.get("result") or _failed("worker_error", "reply without a result")
+        finally:
+            self._slots.release()
+
+    def _cancel_remote(self, rid: int) -> None:
+        # the worker kills the run's process tree; its late reply is dropped
+        if self._alive():
+            try:
+                self._proc.stdin.write(encode_frame({"op": "cancel", "id": rid}))
+            except (OSError, RuntimeError):
+                pass
+
+    async def close(self) -> None:
+        proc, self._proc = self._proc, None
+        if proc is None or proc.returncode is not None:
+            return
+        try:
+            # EOF on stdin: the worker cancels its runs and exits
+            proc.stdin.close()
+            await asyncio.wait_for(proc.wait(), 5)
+        except (OSError, asyncio.TimeoutError):
+            proc.kill()
+            await proc.wait()
+
+    def stats(self) -> dict:
+        return {"remote": True, "alive": self._alive(), "starts": self.starts, "requests": self.requests,
+                "slots": self.slots, "in_flight": len(self._calls), "queued": self.queued, "lost": self.lost}
+
+
+class Executors:
+    """The local executor plus one worker executor per configured target."""
+
+    def __init__(self, targets: Optional[Dict[str, str]] = None):
+        self.local = LocalExecutor()
+        self._targets: Dict[str, Executor] = {}
+        for name, command in (targets or {}).items():
+            argv = shlex.split(command, posix=os.name != "nt")
+            if name.lower() == LOCAL or not argv:
+                continue
+            self._targets[name] = WorkerExecutor(name, argv)
+
+    def get(self, target: Optional[str] = None) -> Optional[Executor]:
+        """Executor for `target`; None when no such target is configured."""
+        if not target or target.lower() == LOCAL:
+            return self.local
+        return self._targets.get(target)
+
+    def names(self) -> List[str]:
+        return sorted(self._targets)
+
+    async def close(self) -> None:
+        await asyncio.gather(*(e.close() for e in self._targets.values()), return_exceptions=True)
+
+    def stats(self) -> dict:
+        return {name: e.stats() for name, e in sorted(self._targets.items())}
+
+
+_EXECUTORS: Optional[Executors] = None
+
+
+def get_executors(cfg: Optional[dict] = None) -> Executors:
+    global _EXECUTORS
+    if _EXECUTORS is None:
+        _EXECUTORS = Executors((cfg or {}).get("TARGETS") or {})
+    return _EXECUTORS
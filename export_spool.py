@@ -0,0 +1,180 @@
+"""Pooled files for NirSoft exports (`/stext`, `/sxml`, `/scomma`).
+
+NirSoft tools write their report to a file named on the command line. Rather
+than creating, reading and deleting a temp file per call, each server process
+owns a directory under `[results] export_dir` with one preallocated slot file
+per scheduler slot. A call borrows a slot, the tool writes into it, the report
+is read back in a worker thread (at most `export_max_bytes`) and the slot is
+truncated for the next call. Point `export_dir` at a tmpfs (e.g. /dev/shm) to
+keep exports off the disk entirely.
+
+The process directory holds a locked `lock` file. At startup every other
+process directory whose lock can be taken belonged to a server that has died,
+so it is removed along with whatever exports the killed runs left behind.
+"""
+import asyncio
+import atexit
+import logging
+import os
+import shutil
+import time
+import uuid
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+LOG = logging.getLogger("mcp_server")
+
+# a directory without a lock file this old was not left by a starting server
+_UNLOCKED_GRACE_S = 60.0
+
+
+def _try_lock(fh) -> bool:
+    try:
+        if os.name == "nt":
+            import msvcrt
+
+            msvcrt.locking(fh.fileno(), msvcrt.LK_NBLCK, 1)
+        else:
+            import fcntl
+
+            fcntl.flock(fh.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        return True
+    except OSError:
+        return False
+
+
+def cleanup_stale(root: Path, keep: Optional[Path] = None) -> int:
+    """Remove process directories under `root` whose owner is gone; returns how many."""
+    removed = 0
+    try:
+        dirs = [Path(de.path) for de in os.scandir(root) if de.is_dir() and de.name.startswith("p")]
+    except OSError:
+        return 0
+    for d in dirs:
+        if keep is not None and d == keep:
+            continue
+        lock = d / "lock"
+        try:
+            with open(lock, "rb+") as fh:
+                if not _try_lock(fh):
+                    continue  # owner still running
+        except FileNotFoundError:
+            try:
+                if time.time() - d.stat().st_mtime < _UNLOCKED_GRACE_S:
+                    continue
+            except OSError:
+                continue
+        except OSError:
+            continue
+        shutil.rmtree(d, ignore_errors=True)
+        removed += 1
+    if removed:
+        LOG.info("removed %d stale export director%s from %s", removed, "y" if removed == 1 else "ies", root)
+    return removed
+
+
+def _read_and_reset(path: str, max_bytes: int, keep: bool) -> Tuple[str, int]:
+    try:
+        with open(path, "rb") as fh:
+            data = fh.read(max_bytes + 1 if max_bytes else -1)
+            size = os.fstat(fh.fileno()).st_size
+    except OSError:
+        # no report (the tool failed or was killed before writing one)
+        return "", 0
+    _reset(path, keep)
+    if max_bytes and len(data) > max_bytes:
+        data = data[:max_bytes]
+    # same text the old `open(..., "r", errors="ignore")` read produced
+    text = data.decode("utf-8", "ignore").replace("\r\n", "\n").replace("\r", "\n")
+    return text, size
+
+
+def _reset(path: str, keep: bool) -> None:
+    try:
+        if keep:
+            os.truncate(path, 0)
+        else:
+            os.unlink(path)
+    except OSError:
+        pass
+
+
+class ExportSpool:
+    def __init__(self, root: str = "spool/exports", slots: int = 8, max_read_bytes: int = 64 * 1024 * 1024):
+        # absolute: the slot paths are handed to tools, which may resolve them elsewhere
+        self.root = Path(root).resolve()
+        self.max_read_bytes = max_read_bytes
+        self.dir = self.root / f"p{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self._lock = open(self.dir / "lock", "wb+")
+        if not _try_lock(self._lock):
+            LOG.warning("could not lock %s; it may be removed by another server", self.dir)
+        cleanup_stale(self.root, keep=self.dir)
+        self._free: List[int] = list(range(max(1, slots)))
+        self._busy: Dict[str, int] = {}
+        for i in self._free:
+            # preallocate the common case so a call never creates a file
+            open(self._path(i, ".txt"), "wb").close()
+        self.overflow = 0
+        atexit.register(self.close)
+
+    def _path(self, slot: int, suffix: str) -> str:
+        return str(self.dir / f"slot-{slot:03d}{suffix}")
+
+    def acquire(self, suffix: str = ".txt") -> str:
+        """Borrow an export file; pass it to `read` or `release` when the run is done."""
+        if self._free:
+            slot = self._free.pop()
+            path = self._path(slot, suffix)
+            self._busy[path] = slot
+            return path
+        # more concurrent exports than slots (jobs, batch): a one-off file
+        self.overflow += 1
+        return str(self.dir / f"x-{uuid.uuid4().hex}{suffix}")
+
+    def _give_back(self, path: str) -> bool:
+        slot = self._busy.pop(path, None)
+        if slot is None:
+            return False
+        self._free.append(slot)
+        return True
+
+    async def read(self, path: str) -> Tuple[str, int]:
+        """(text, size on disk) of the export, capped at `max_read_bytes`; releases the file."""
+        keep = path in self._busy
+        try:
+            return await asyncio.to_thread(_read_and_reset, path, self.max_read_bytes, keep)
+        finally:
+            self._give_back(path)
+
+    async def release(self, path: str) -> None:
+        keep = path in self._busy
+        try:
+            await asyncio.to_thread(_reset, path, keep)
+        finally:
+            self._give_back(path)
+
+    def stats(self) -> dict:
+        return {"dir": str(self.dir), "slots": len(self._free) + len(self._busy), "busy": len(self._busy),
+                "overflow": self.overflow}
+
+    def close(self) -> None:
+        if self._lock.closed:
+            return
+        self._lock.close()
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+
+_SPOOL: Optional[ExportSpool] = None
+
+
+def get_export_spool(cfg: Optional[dict] = None) -> ExportSpool:
+    global _SPOOL
+    if _SPOOL is None:
+        cfg = cfg or {}
+        _SPOOL = ExportSpool(
+            root=cfg.get("EXPORT_DIR") or "spool/exports",
+            slots=int(cfg.get("MAX_CONCURRENT", 8)),
+            max_read_bytes=int(cfg.get("EXPORT_MAX_BYTES", 64 * 1024 * 1024)),
+        )
+    return _SPOOL
@@ -1,18 +1,39 @@
 """Scan the `binaries` folder and generate an enriched `binaries.json`.
 
 This creates entries with: name, exe (relative path), category, description,
-tags, destructive (bool).
+tags, destructive (bool), plus `machine`/`version` read from the PE headers.
+
+The scan is incremental: `.binaries.scan.json` remembers the size, mtime and
+parsed PE metadata of every executable, so only new or changed files are
+opened (`--full` ignores it). `foo.exe`/`foo64.exe` pairs in one folder are
+collapsed into a single `foo` entry that runs the variant best suited to this
+machine; the other name is kept in `aliases` and both files in `variants`.
+Fields not produced by the scan (`cache_ttl`, `safe_flags`, hand-written
+descriptions, ...) are carried over from the existing `binaries.json`.
 """
 from pathlib import Path
+import argparse
 import json
+import os
+import platform
 import sys
 import logging
+from typing import Dict, List, Optional
+
+from pe_info import read_pe_info
 
 LOG = logging.getLogger("generate_binaries")
 
 
 DESTRUCTIVE_KEYWORDS = {"sdelete", "psexec", "pskill", "format", "cipher", "psshutdown"}
 
+SCAN_CACHE = Path(".binaries.scan.json")
+SCAN_VERSION = 1
+
+# fields the scan owns; everything else in an existing entry is preserved
+GENERATED_FIELDS = {"name", "exe", "category", "description", "tags", "destructive", "safe_flags",
+                    "machine", "version", "aliases", "variants"}
+
 
 def categorize(path: Path) -> str:
     low = str(path).lower()
@@ -28,7 +49,11 @@ def is_destructive(name: str) -> bool:
     return any(k in n for k in DESTRUCTIVE_KEYWORDS)
 
 
-def build_entry(p: Path, root: Path) -> dict:
+def placeholder_description(cat: str, name: str) -> str:
+    return f"{cat} utility {name}"
+
+
+def build_entry(p: Path, root: Path, info: Optional[dict] = None) -> dict:
     # store path relative to the project root for portability
     try:
         rel = str(p.relative_to(root))
@@ -36,32 +61,176 @@ def build_entry(p: Path, root: Path) -> dict:
         rel = str(p)
     name = p.stem
     cat = categorize(p)
-    return {
+    info = info or {}
+    entry = {
         "name": name,
         "exe": rel.replace("/", "\\"),
         "category": cat,
-        "description": f"{cat} utility {name}",
+        "description": info.get("description") or placeholder_description(cat, name),
         "tags": [cat],
         "destructive": is_destructive(name),
         "safe_flags": [],
     }
+    for key in ("machine", "version"):
+        if info.get(key):
+            entry[key] = info[key]
+    return entry
+
+
+def host_bits() -> int:
+    return 64 if platform.machine().lower() in ("amd64", "x86_64", "arm64", "aarch64") else 32
+
+
+def scan(base: Path, cache: Dict[str, dict], full: bool = False) -> Dict[str, dict]:
+    """Return {relative exe path: {size, mtime_ns, info}}, re-parsing only changed files."""
+    out: Dict[str, dict] = {}
+    parsed = 0
+    stack = [str(base)]
+    while stack:
+        try:
+            it = os.scandir(stack.pop())
+        except OSError as ex:
+            LOG.warning("cannot scan %s: %s", ex.filename, ex)
+            continue
+        with it:
+            for de in it:
+                if de.is_dir(follow_symlinks=False):
+                    stack.append(de.path)
+                    continue
+                if not de.name.lower().endswith(".exe"):
+                    continue
+                st = de.stat()
+                key = de.path
+                known = None if full else cache.get(key)
+                if known and known["size"] == st.st_size and known["mtime_ns"] == st.st_mtime_ns:
+                    out[key] = known
+                    continue
+                parsed += 1
+                out[key] = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "info": read_pe_info(de.path) or {}}
+    LOG.info("scanned %d executables (%d new or changed)", len(out), parsed)
+    return out
+
+
+def _variant_base(stem: str) -> str:
+    return stem[:-2] if stem.lower().endswith("64") and len(stem) > 2 else stem
+
+
+def _is_64(path: Path, info: dict) -> bool:
+    if info.get("bits"):
+        return info["bits"] == 64
+    return path.stem.lower().endswith("64")
+
+
+def collapse_pairs(files: Dict[str, dict], root: Path) -> List[dict]:
+    """One entry per tool; `foo`/`foo64` in the same folder become a single entry."""
+    groups: Dict[tuple, List[Path]] = {}
+    for path in sorted(files, key=str.lower):
+        p = Path(path)
+        groups.setdefault((str(p.parent).lower(), _variant_base(p.stem).lower()), []).append(p)
+
+    want64 = host_bits() == 64
+    out = []
+    for paths in groups.values():
+        if len(paths) == 1:
+            out.append(build_entry(paths[0], root, files[str(paths[0])]["info"]))
+            continue
+        # the unsuffixed file names the entry; the exe is the best variant for this host
+        primary = min(paths, key=lambda p: (p.stem.lower().endswith("64"), p.stem.lower()))
+        best = max(paths, key=lambda p: (_is_64(p, files[str(p)]["info"]) == want64, p == primary))
+        entry = build_entry(best, root, files[str(best)]["info"])
+        entry["name"] = primary.stem
+        entry["description"] = (files[str(primary)]["info"].get("description")
+                                or files[str(best)]["info"].get("description")
+                                or placeholder_description(entry["category"], primary.stem))
+        entry["destructive"] = any(is_destructive(p.stem) for p in paths)
+        entry["aliases"] = [p.stem for p in paths if p != primary]
+        entry["variants"] = {}
+        for p in paths:
+            info = files[str(p)]["info"]
+            arch = info.get("machine") or ("x64" if _is_64(p, info) else "x86")
+            entry["variants"].setdefault(arch, build_entry(p, root)["exe"])
+        out.append(entry)
+    out.sort(key=lambda e: e["exe"].lower())
+    return out
+
+
+def merge_existing(entries: List[dict], existing: List[dict]) -> List[dict]:
+    """Carry hand-maintained metadata over from the previous catalog."""
+    by_name = {}
+    for e in existing:
+        if isinstance(e, dict) and e.get("name"):
+            by_name.setdefault(e["name"].lower(), e)
+    for entry in entries:
+        olds = [by_name[n.lower()] for n in [entry["name"]] + entry.get("aliases", []) if n.lower() in by_name]
+        for old in reversed(olds):  # the primary name wins over aliases
+            for key, value in old.items():
+                if key not in GENERATED_FIELDS:
+                    entry[key] = value
+        for old in olds:
+            desc = old.get("description")
+            if desc and desc != placeholder_description(old.get("category", entry["category"]), old["name"]):
+                entry["description"] = desc
+                break
+        for old in olds:
+            if old.get("safe_flags"):
+                entry["safe_flags"] = old["safe_flags"]
+                break
+        for old in olds:
+            entry["tags"] += [t for t in old.get("tags") or () if t not in entry["tags"]]
+            entry["destructive"] = entry["destructive"] or bool(old.get("destructive"))
+    return entries
+
+
+def _load_json(path: Path, default):
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        return default
+    except (OSError, ValueError) as ex:
+        LOG.warning("ignoring unreadable %s: %s", path, ex)
+        return default
 
 
-def main():
+def _write_atomic(path: Path, text: str) -> None:
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(text, encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Scan `binaries/` and write binaries.json.")
+    ap.add_argument("--full", action="store_true", help="re-parse every executable, ignoring the scan cache")
+    args = ap.parse_args(argv)
+
     base = Path("binaries")
     if not base.exists() or not base.is_dir():
         LOG.error("No `binaries` directory found.")
         sys.exit(1)
 
-    out = []
     root = Path.cwd()
-    for f in sorted(base.rglob("*.exe"), key=lambda p: str(p).lower()):
-        out.append(build_entry(f, root))
-
-    with open("binaries.json", "w", encoding="utf-8") as fh:
-        json.dump(out, fh, indent=2)
-    LOG.info("Wrote binaries.json (%d entries)", len(out))
+    cache = _load_json(SCAN_CACHE, {})
+    files = scan(base, cache.get("files", {}) if cache.get("version") == SCAN_VERSION else {}, args.full)
+    out_path = Path("binaries.json")
+    existing = _load_json(out_path, [])
+    out = merge_existing(collapse_pairs(files, root), existing if isinstance(existing, list) else [])
+
+    text = json.dumps(out, indent=2)
+    if out_path.exists() and out_path.read_text(encoding="utf-8") == text:
+        LOG.info("binaries.json unchanged (%d entries)", len(out))
+    else:
+        _write_atomic(out_path, text)
+        LOG.info("Wrote binaries.json (%d entries from %d executables)", len(out), len(files))
+    _write_atomic(SCAN_CACHE, json.dumps({"version": SCAN_VERSION, "files": files}))
+
+    # keep the server's startup manifest in step with the catalog
+    try:
+        import manifest
+        if manifest.load_manifest(str(out_path)) is None:
+            LOG.info("Wrote %s", manifest.regenerate(str(out_path)))
+    except ImportError as ex:
+        LOG.warning("tool manifest not rebuilt (%s); run `python manifest.py`", ex)
 
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, stream=sys.stderr)
     main()
@@ -0,0 +1,196 @@
+"""Background jobs for long-running capture tools.
+
+`start_job` launches a tool through `run_tool_by_name` as an asyncio task and
+returns immediately with a job id. Output is appended to the job as it
+streams in and read back incrementally with `read_output(offset)`. Only the
+last `max_output_bytes` are kept; reading an offset that has already been
+dropped returns the oldest data still held and reports the skipped bytes.
+"""
+import asyncio
+import logging
+import time
+import uuid
+from typing import Dict, Optional
+
+from server import run_tool_by_name
+
+LOG = logging.getLogger("mcp_server")
+
+FINISHED = ("completed", "failed", "timeout", "cancelled")
+
+
+class Job:
+    def __init__(self, job_id: str, tool: str, args: str, timeout: int, max_output_bytes: int):
+        self.id = job_id
+        self.tool = tool
+        self.args = args
+        self.timeout = timeout
+        self.status = "running"
+        self.created = time.time()
+        self.finished: Optional[float] = None
+        self.result: Optional[dict] = None
+        self.task: Optional[asyncio.Task] = None
+        self.max_output_bytes = max_output_bytes
+        self._out = bytearray()
+        # absolute offset of self._out[0]; grows as old output is dropped
+        self._base = 0
+        self.streamed = False
+
+    @property
+    def output_bytes(self) -> int:
+        return self._base + len(self._out)
+
+    def append(self, text: str) -> None:
+        self._out += text.encode("utf-8", errors="replace")
+        excess = len(self._out) - self.max_output_bytes
+        if excess > 0:
+            del self._out[:excess]
+            self._base += excess
+
+    def read_output(self, offset: int = 0, max_bytes: int = 65536) -> dict:
+        skipped = max(0, self._base - offset)
+        start = max(offset, self._base) - self._base
+        start = min(start, len(self._out))
+        data = bytes(self._out[start:start + max(0, max_bytes)])
+        next_offset = self._base + start + len(data)
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "offset": self._base + start,
+            "next_offset": next_offset,
+            "skipped": skipped,
+            "data": data.decode("utf-8", errors="ignore"),
+            "eof": self.status in FINISHED and next_offset >= self.output_bytes,
+        }
+
+    def describe(self) -> dict:
+        out = {
+            "job_id": self.id,
+            "tool": self.tool,
+            "args": self.args,
+            "status": self.status,
+            "created": self.created,
+            "finished": self.finished,
+            "elapsed_s": round((self.finished or time.time()) - self.created, 3),
+            "output_bytes": self.output_bytes,
+        }
+        if self.result is not None:
+            out["exit_code"] = self.result.get("exit_code")
+            if "error" in self.result:
+                out["error"] = self.result["error"]
+                out["detail"] = self.result.get("detail") or self.result.get("stderr")
+        return out
+
+
+class JobManager:
+    def __init__(self, cfg: Optional[dict] = None, max_running: int = 4, max_finished: int = 50,
+                 default_timeout: int = 600, max_timeout: int = 3600,
+                 max_output_bytes: int = 8 * 1024 * 1024):
+        self.cfg = cfg or {}
+        self.max_running = max_running
+        self.max_finished = max_finished
+        self.default_timeout = default_timeout
+        self.max_timeout = max_timeout
+        self.max_output_bytes = max_output_bytes
+        self._jobs: Dict[str, Job] = {}
+
+    def running(self) -> int:
+        return sum(1 for j in self._jobs.values() if j.status not in FINISHED)
+
+    def start(self, tool: str, args: str = "", timeout: Optional[int] = None) -> dict:
+        if self.running() >= self.max_running:
+            return {"error": "too_many_jobs", "detail": f"at most {self.max_running} jobs may run at once"}
+        timeout = min(int(timeout or self.default_timeout), self.max_timeout)
+        job = Job(uuid.uuid4().hex[:16], tool, args, timeout, self.max_output_bytes)
+        job.task = asyncio.ensure_future(self._run(job))
+        self._jobs[job.id] = job
+        self._prune()
+        return {"job_id": job.id, "status": job.status, "timeout": timeout}
+
+    async def _run(self, job: Job) -> None:
+        def _on_output(stream: str, text: str):
+            job.streamed = True
+            job.append(text if stream == "stdout" else f"[stderr] {text}")
+
+        try:
+            res = await run_tool_by_name(job.tool, job.args, self.cfg, on_output=_on_output, timeout=job.timeout,
+                                         spool=False)
+        except asyncio.CancelledError:
+            job.status = "cancelled"
+            job.finished = time.time()
+            raise
+        except Exception as ex:
+            LOG.exception("job %s (%s) failed", job.id, job.tool)
+            res = {"error": "internal_error", "detail": str(ex)}
+        if not job.streamed and res.get("stdout"):
+            # NirSoft captures arrive in one piece from their /stext file
+            job.append(res["stdout"])
+        # the output already lives in the job buffer; keep only the metadata
+        job.result = {k: v for k, v in res.items() if k != "stdout"}
+        if res.get("timeout"):
+            job.status = "timeout"
+        elif "error" in res or not res.get("success", False):
+            job.status = "failed"
+        else:
+            job.status = "completed"
+        job.finished = time.time()
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self._jobs.get(job_id)
+
+    def status(self, job_id: str) -> dict:
+        job = self._jobs.get(job_id)
+        if job is None:
+            return {"error": "job_not_found", "job_id": job_id}
+        return job.describe()
+
+    def output(self, job_id: str, offset: int = 0, max_bytes: int = 65536) -> dict:
+        job = self._jobs.get(job_id)
+        if job is None:
+            return {"error": "job_not_found", "job_id": job_id}
+        return job.read_output(offset, max_bytes)
+
+    async def cancel(self, job_id: str) -> dict:
+        job = self._jobs.get(job_id)
+        if job is None:
+            return {"error": "job_not_found", "job_id": job_id}
+        if job.task is not None and not job.task.done():
+            job.task.cancel()
+            try:
+                await job.task
+            except asyncio.CancelledError:
+                pass
+        return job.describe()
+
+    async def cancel_all(self) -> int:
+        """Cancel every running job (server shutdown); returns how many were running."""
+        running = [j.id for j in self._jobs.values() if j.task is not None and not j.task.done()]
+        for job_id in running:
+            await self.cancel(job_id)
+        return len(running)
+
+    def list(self) -> list:
+        return [j.describe() for j in self._jobs.values()]
+
+    def _prune(self) -> None:
+        finished = sorted((j for j in self._jobs.values() if j.status in FINISHED), key=lambda j: j.finished or 0)
+        for job in finished[:max(0, len(finished) - self.max_finished)]:
+            del self._jobs[job.id]
+
+
+_MANAGER: Optional[JobManager] = None
+
+
+def get_job_manager(cfg: Optional[dict] = None) -> JobManager:
+    global _MANAGER
+    if _MANAGER is None:
+        cfg = cfg or {}
+        _MANAGER = JobManager(
+            cfg,
+            max_running=int(cfg.get("JOBS_MAX_RUNNING", 4)),
+            max_finished=int(cfg.get("JOBS_MAX_FINISHED", 50)),
+            default_timeout=int(cfg.get("JOBS_DEFAULT_TIMEOUT", 600)),
+            max_timeout=int(cfg.get("JOBS_MAX_TIMEOUT", 3600)),
+            max_output_bytes=int(cfg.get("JOBS_MAX_OUTPUT_BYTES", 8 * 1024 * 1024)),
+        )
+    return _MANAGER
@@ -0,0 +1,114 @@
+"""Prebuilt tool manifest for fast MCP server startup.
+
+The manifest holds everything `tools/list` needs for each catalog entry
+(name, description, input schema) so the server can register tools without
+building a handler per entry or deriving schemas from function signatures.
+It also carries the prebuilt `search_tools` index (see `catalog_index`).
+It is written next to `binaries.json` as `binaries.manifest.json` and is
+only trusted while the SHA-256 of `binaries.json` matches the one recorded
+in it; a stale or missing manifest makes the server fall back to deriving
+the specs from the catalog at startup.
+
+Regenerate after editing `binaries.json`:
+
+    python manifest.py [binaries.json]
+
+(`generate_binaries.py` does this automatically.)
+"""
+import hashlib
+import json
+import logging
+import os
+import sys
+from pathlib import Path
+from typing import Callable, Iterable, List, Optional
+
+from catalog_index import CatalogIndex
+
+LOG = logging.getLogger("mcp_server")
+
+MANIFEST_VERSION = 2
+
+
+def manifest_path_for(bins_path: str = "binaries.json") -> Path:
+    p = Path(bins_path)
+    return p.with_name(f"{p.stem}.manifest.json")
+
+
+def source_digest(bins_path: str = "binaries.json") -> Optional[str]:
+    try:
+        return hashlib.sha256(Path(bins_path).read_bytes()).hexdigest()
+    except OSError:
+        return None
+
+
+def build_manifest(entries: Iterable[dict], spec_fn: Callable[[dict], dict], digest: Optional[str]) -> dict:
+    entries = list(entries)
+    return {
+        "version": MANIFEST_VERSION,
+        "source_sha256": digest,
+        "tools": [spec_fn(e) for e in entries],
+        "index": CatalogIndex.build(entries).to_dict(),
+    }
+
+
+def write_manifest(bins_path: str, entries: Iterable[dict], spec_fn: Callable[[dict], dict],
+                   path: Optional[Path] = None) -> Path:
+    """Write the manifest for `entries` atomically and return its path."""
+    path = Path(path) if path else manifest_path_for(bins_path)
+    data = build_manifest(entries, spec_fn, source_digest(bins_path))
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(json.dumps(data, indent=1), encoding="utf-8")
+    os.replace(tmp, path)
+    return path
+
+
+def _load_fresh(bins_path: str, path: Optional[Path]) -> Optional[dict]:
+    path = Path(path) if path else manifest_path_for(bins_path)
+    try:
+        data = json.loads(path.read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as ex:
+        LOG.warning("ignoring unreadable tool manifest %s: %s", path, ex)
+        return None
+    if data.get("version") != MANIFEST_VERSION:
+        return None
+    if data.get("source_sha256") != source_digest(bins_path):
+        LOG.info("tool manifest %s is stale; run `python manifest.py` to rebuild it", path)
+        return None
+    return data
+
+
+def load_manifest(bins_path: str = "binaries.json", path: Optional[Path] = None) -> Optional[List[dict]]:
+    """Return the tool specs from a fresh manifest, or None if missing or stale."""
+    data = _load_fresh(bins_path, path)
+    return None if data is None else data.get("tools") or []
+
+
+def load_index(bins_path: str = "binaries.json", path: Optional[Path] = None) -> Optional[CatalogIndex]:
+    """Return the search index from a fresh manifest, or None if missing or stale."""
+    data = _load_fresh(bins_path, path)
+    if data is None or not data.get("index"):
+        return None
+    return CatalogIndex.from_dict(data["index"])
+
+
+def regenerate(bins_path: str = "binaries.json") -> Path:
+    """Rebuild the manifest for `bins_path` from the current catalog."""
+    from registry import ToolRegistry
+    from server_mcp import tool_spec
+
+    return write_manifest(bins_path, ToolRegistry(bins_path).entries(), tool_spec)
+
+
+def main(argv=None) -> None:
+    argv = sys.argv[1:] if argv is None else argv
+    bins_path = argv[0] if argv else "binaries.json"
+    path = regenerate(bins_path)
+    LOG.info("wrote %s", path)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, stream=sys.stderr)
+    main()
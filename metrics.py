@@ -0,0 +1,183 @@
+"""Per-tool latency and resource metrics.
+
+`run_tool_by_name` records one sample per call: time spent queued in the
+scheduler, process spawn latency, run (wall) time, child CPU time where it
+can be attributed, total call time, and stdout/stderr byte counts, plus
+call/timeout/error/cache-hit counters. Timings and sizes go into fixed-bucket
+histograms per tool, so memory does not grow with traffic.
+
+The numbers are served as JSON through the `metrics://tools` MCP resource
+and, when `[metrics] textfile` is set, periodically written in Prometheus
+text format for node_exporter's textfile collector.
+"""
+import bisect
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+LOG = logging.getLogger("mcp_server")
+
+TIME_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+BYTE_BUCKETS = (1024, 16 * 1024, 64 * 1024, 256 * 1024, 1024 ** 2, 4 * 1024 ** 2, 16 * 1024 ** 2, 64 * 1024 ** 2)
+
+# sample key -> (metric name, buckets, help)
+HISTOGRAMS = {
+    "queue_s": ("queue_seconds", TIME_BUCKETS, "Time spent waiting for a scheduler slot"),
+    "spawn_s": ("spawn_seconds", TIME_BUCKETS, "Time to create the tool process"),
+    "wall_s": ("run_seconds", TIME_BUCKETS, "Wall time from spawn to exit (or kill)"),
+    "cpu_s": ("cpu_seconds", TIME_BUCKETS, "User+system CPU time of the tool's processes"),
+    "total_s": ("call_seconds", TIME_BUCKETS, "Total time of the tool call, including queueing and post-processing"),
+    "stdout_bytes": ("stdout_bytes", BYTE_BUCKETS, "Bytes the tool wrote to stdout"),
+    "stderr_bytes": ("stderr_bytes", BYTE_BUCKETS, "Bytes the tool wrote to stderr"),
+}
+COUNTERS = {
+    "calls": "Tool calls",
+    "timeouts": "Calls that hit the timeout",
+    "errors": "Calls that failed or returned an error",
+    "cache_hits": "Calls served from the result cache",
+}
+
+
+class Histogram:
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds: Sequence[float]):
+        self.bounds = tuple(bounds)
+        # counts[i] = samples <= bounds[i] (non-cumulative); last slot is +Inf
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Upper bound of the bucket holding the q-quantile (None once it is past the last bound)."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for bound, n in zip(self.bounds, self.counts):
+            seen += n
+            if seen >= rank:
+                return bound
+        return None
+
+    def as_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 6),
+            "avg": round(self.sum / self.count, 6) if self.count else 0.0,
+            "p50_le": self.quantile(0.5),
+            "p99_le": self.quantile(0.99),
+        }
+
+
+class _ToolMetrics:
+    def __init__(self):
+        self.counters = dict.fromkeys(COUNTERS, 0)
+        self.histograms = {key: Histogram(buckets) for key, (_n, buckets, _h) in HISTOGRAMS.items()}
+
+
+class Metrics:
+    def __init__(self):
+        self._tools: Dict[str, _ToolMetrics] = {}
+        # the textfile writer reads from another thread
+        self._lock = threading.Lock()
+        self._writer: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def record(self, tool: str, sample: dict, res: dict) -> None:
+        """Record one call of `tool`: timing/size `sample` plus counters derived from `res`."""
+        with self._lock:
+            tm = self._tools.get(tool)
+            if tm is None:
+                tm = self._tools[tool] = _ToolMetrics()
+            tm.counters["calls"] += 1
+            if res.get("timeout"):
+                tm.counters["timeouts"] += 1
+            if "error" in res or not res.get("success", False):
+                tm.counters["errors"] += 1
+            if res.get("cached"):
+                tm.counters["cache_hits"] += 1
+            for key, hist in tm.histograms.items():
+                value = sample.get(key)
+                if value is not None:
+                    hist.observe(value)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                name: dict(tm.counters, **{HISTOGRAMS[k][0]: h.as_dict() for k, h in tm.histograms.items() if h.count})
+                for name, tm in sorted(self._tools.items())
+            }
+
+    def prometheus(self, prefix: str = "sysmcp_tool") -> str:
+        lines: List[str] = []
+        with self._lock:
+            tools = sorted(self._tools.items())
+            for key, help_text in COUNTERS.items():
+                metric = f"{prefix}_{key}_total"
+                lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} counter"]
+                lines += [f'{metric}{{tool="{_label(name)}"}} {tm.counters[key]}' for name, tm in tools]
+            for key, (suffix, _buckets, help_text) in HISTOGRAMS.items():
+                metric = f"{prefix}_{suffix}"
+                lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} histogram"]
+                for name, tm in tools:
+                    hist = tm.histograms[key]
+                    label = _label(name)
+                    cumulative = 0
+                    for bound, n in zip(hist.bounds, hist.counts):
+                        cumulative += n
+                        lines.append(f'{metric}_bucket{{tool="{label}",le="{bound:g}"}} {cumulative}')
+                    lines.append(f'{metric}_bucket{{tool="{label}",le="+Inf"}} {hist.count}')
+                    lines.append(f'{metric}_sum{{tool="{label}"}} {hist.sum:.6f}')
+                    lines.append(f'{metric}_count{{tool="{label}"}} {hist.count}')
+        return "\n".join(lines) + "\n"
+
+    def write_textfile(self, path: str) -> None:
+        p = Path(path)
+        p.parent.mkdir(parents=True, exist_ok=True)
+        # node_exporter may read at any time: write a temp file and swap it in
+        tmp = p.with_name(p.name + ".tmp")
+        tmp.write_text(self.prometheus(), encoding="utf-8")
+        os.replace(tmp, p)
+
+    def start_textfile_writer(self, path: str, interval: float = 15.0) -> None:
+        if self._writer is not None:
+            return
+
+        def _loop():
+            while not self._stop.wait(interval):
+                try:
+                    self.write_textfile(path)
+                except OSError as ex:
+                    LOG.warning("could not write metrics textfile %s: %s", path, ex)
+
+        self._writer = threading.Thread(target=_loop, name="metrics-textfile", daemon=True)
+        self._writer.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+
+def _label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+_METRICS: Optional[Metrics] = None
+
+
+def get_metrics(cfg: Optional[dict] = None) -> Metrics:
+    """Return the process-wide metrics; starts the textfile writer if configured."""
+    global _METRICS
+    if _METRICS is None:
+        cfg = cfg or {}
+        _METRICS = Metrics()
+        if cfg.get("METRICS_TEXTFILE"):
+            _METRICS.start_textfile_writer(cfg["METRICS_TEXTFILE"], float(cfg.get("METRICS_INTERVAL", 15)))
+    return _METRICS
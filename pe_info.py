@@ -0,0 +1,163 @@
+"""Pure-Python reader for the PE metadata the catalog builder needs.
+
+`read_pe_info(path)` memory-maps an executable and returns its machine type
+and, when the file has a VERSIONINFO resource, the FileDescription,
+ProductName and file version. Only the headers, the section table and the
+resource tree are touched, so large binaries cost a few page faults rather
+than a full read. Anything that is not a well-formed PE yields None (or the
+fields parsed before the damage), never an exception.
+"""
+import mmap
+import struct
+from typing import List, Optional, Tuple
+
+MACHINES = {
+    0x014C: ("x86", 32),
+    0x8664: ("x64", 64),
+    0xAA64: ("arm64", 64),
+    0x01C4: ("arm", 32),
+    0x0200: ("ia64", 64),
+}
+
+RT_VERSION = 16
+_RESOURCE_DIR = 2
+_FIXED_SIGNATURE = 0xFEEF04BD
+STRING_FIELDS = {"FileDescription": "description", "ProductName": "product", "FileVersion": "file_version"}
+
+
+def read_pe_info(path) -> Optional[dict]:
+    """Return {"machine", "bits", "description"?, "product"?, "version"?} for a PE file, else None."""
+    try:
+        with open(path, "rb") as fh, mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            return parse_pe(mm)
+    except (OSError, ValueError):
+        # ValueError: mmap of an empty file
+        return None
+
+
+def parse_pe(buf) -> Optional[dict]:
+    try:
+        if buf[:2] != b"MZ":
+            return None
+        pe = struct.unpack_from("<I", buf, 0x3C)[0]
+        if buf[pe:pe + 4] != b"PE\0\0":
+            return None
+        machine, nsections = struct.unpack_from("<HH", buf, pe + 4)
+        opt_size = struct.unpack_from("<H", buf, pe + 20)[0]
+        opt = pe + 24
+        magic = struct.unpack_from("<H", buf, opt)[0]
+        arch, bits = MACHINES.get(machine, (f"0x{machine:04x}", 64 if magic == 0x20B else 32))
+        info = {"machine": arch, "bits": bits}
+
+        dirs = opt + (112 if magic == 0x20B else 96)
+        ndirs = struct.unpack_from("<I", buf, dirs - 4)[0]
+        if ndirs <= _RESOURCE_DIR:
+            return info
+        rsrc_rva = struct.unpack_from("<I", buf, dirs + 8 * _RESOURCE_DIR)[0]
+        sections = _sections(buf, opt + opt_size, nsections)
+        rsrc = _rva_to_offset(sections, rsrc_rva)
+        if not rsrc_rva or rsrc is None:
+            return info
+        data = _version_resource(buf, rsrc, sections)
+        if data:
+            info.update(parse_version_info(data))
+        return info
+    except (struct.error, IndexError, ValueError):
+        return None
+
+
+def _sections(buf, off: int, count: int) -> List[Tuple[int, int, int]]:
+    out = []
+    for i in range(count):
+        vsize, vaddr, raw_size, raw_ptr = struct.unpack_from("<IIII", buf, off + 40 * i + 8)
+        out.append((vaddr, max(vsize, raw_size), raw_ptr))
+    return out
+
+
+def _rva_to_offset(sections, rva: int) -> Optional[int]:
+    for vaddr, size, raw_ptr in sections:
+        if vaddr <= rva < vaddr + size:
+            return raw_ptr + rva - vaddr
+    return None
+
+
+def _first_entry(buf, base: int, directory: int, type_id: Optional[int] = None) -> Optional[int]:
+    """Offset field of the first (or the `type_id`) entry of a resource directory."""
+    named, ids = struct.unpack_from("<HH", buf, base + directory + 12)
+    for i in range(named + ids):
+        name, target = struct.unpack_from("<II", buf, base + directory + 16 + 8 * i)
+        if type_id is None or (not name & 0x80000000 and name == type_id):
+            return target
+    return None
+
+
+def _version_resource(buf, rsrc: int, sections) -> Optional[bytes]:
+    # type (RT_VERSION) -> name -> language -> data entry
+    target = _first_entry(buf, rsrc, 0, RT_VERSION)
+    for _level in range(2):
+        if target is None or not target & 0x80000000:
+            return None
+        target = _first_entry(buf, rsrc, target & 0x7FFFFFFF)
+    if target is None or target & 0x80000000:
+        return None
+    data_rva, size = struct.unpack_from("<II", buf, rsrc + target)
+    off = _rva_to_offset(sections, data_rva)
+    if off is None:
+        return None
+    return bytes(buf[off:off + size])
+
+
+def _align4(n: int) -> int:
+    return (n + 3) & ~3
+
+
+def _block(data: bytes, off: int):
+    """Split one VERSIONINFO block: (key, value bytes, value type, children offset, end offset)."""
+    length, value_len, value_type = struct.unpack_from("<HHH", data, off)
+    if length < 6:
+        raise ValueError("truncated VERSIONINFO block")
+    end = min(off + length, len(data))
+    key_end = off + 6
+    while key_end + 1 < end and data[key_end:key_end + 2] != b"\0\0":
+        key_end += 2
+    key = data[off + 6:key_end].decode("utf-16-le", "replace")
+    value_off = _align4(key_end + 2)
+    value_size = value_len * 2 if value_type == 1 else value_len
+    value = data[value_off:min(value_off + value_size, end)]
+    return key, value, value_type, _align4(value_off + value_size), end
+
+
+def _children(data: bytes, off: int, end: int):
+    while off + 6 <= end:
+        block = _block(data, off)
+        yield block
+        off = _align4(block[4])
+
+
+def parse_version_info(data: bytes) -> dict:
+    """Fields of a VS_VERSIONINFO resource: description, product, version."""
+    out = {}
+    try:
+        key, value, _t, children, end = _block(data, 0)
+        if key != "VS_VERSION_INFO":
+            return out
+        if len(value) >= 52 and struct.unpack_from("<I", value, 0)[0] == _FIXED_SIGNATURE:
+            ms, ls = struct.unpack_from("<II", value, 8)
+            out["version"] = f"{ms >> 16}.{ms & 0xFFFF}.{ls >> 16}.{ls & 0xFFFF}"
+        for key, _v, _t, tables, file_info_end in _children(data, children, end):
+            if key != "StringFileInfo":
+                continue
+            for _lang, _v, _t, strings, table_end in _children(data, tables, file_info_end):
+                for name, text, _t, _c, _e in _children(data, strings, table_end):
+                    field = STRING_FIELDS.get(name)
+                    if field and field not in out:
+                        text = text.decode("utf-16-le", "replace").split("\0", 1)[0].strip()
+                        if text:
+                            out[field] = text
+                break  # first language is enough
+    except (struct.error, ValueError):
+        pass
+    if "version" not in out and "file_version" in out:
+        out["version"] = out["file_version"]
+    out.pop("file_version", None)
+    return out
@@ -0,0 +1,216 @@
+"""Chain tools inside the server: run a stage, extract values, fan out the next one.
+
+A pipeline is a list of stages. The first stage runs once. Every later stage
+runs once per value extracted from the stage before it, with the value put
+into its `args` template at `{}`:
+
+    [{"tool": "pslist64", "filter": "Name~chrome", "field": "Pid"},
+     {"tool": "handle64", "args": "-p {}"}]
+
+Values are extracted with one of:
+    field    a column of the stage's records: structured NirSoft output, or
+             the text table of a tool the collector knows (pslist)
+    regex    a pattern run over each output line; the value is `group`
+             (default: the first group, or the whole match without groups)
+`filter` (a `where` expression, see tabular.py) selects records before
+`field` is read. Values are de-duplicated in order and capped by
+`max_items`.
+
+Each generated invocation goes through `run_tool_by_name`, so `sanitize_args`,
+the tool's argument policy, the destructive-tool gate, the scheduler and
+the cache apply to it as to any other call. An extracted value is inserted
+as one quoted positional argument. Values that look like flags or server
+control tokens are dropped. Only the last stage's results are returned.
+"""
+import asyncio
+import inspect
+import logging
+import re
+import shlex
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Union
+
+import tabular
+from batch import structured_opts
+from collector import TEXT_TABLES, parse_text_table, tool_kind
+from policy import CONFIRM_TOKENS
+from registry import get_registry
+from server import run_tool_by_name
+
+LOG = logging.getLogger("mcp_server")
+
+MAX_STAGES = 6
+MAX_FANOUT = 256
+DEFAULT_MAX_ITEMS = 32
+DEFAULT_PARALLEL = 4
+
+PLACEHOLDER = "{}"
+
+# on_stage(index, summary) -> None | awaitable
+StageCallback = Callable[[int, dict], Union[None, Awaitable[None]]]
+
+
+class PipelineError(ValueError):
+    """The pipeline spec is invalid."""
+
+
+class Stage:
+    def __init__(self, index: int, spec: dict, last: bool):
+        if not isinstance(spec, dict):
+            raise PipelineError(f"stage {index}: stages must be objects")
+        self.index = index
+        self.tool = spec.get("tool")
+        if not self.tool or not isinstance(self.tool, str):
+            raise PipelineError(f"stage {index}: needs a `tool` name")
+        self.args = str(spec.get("args") or "")
+        if index > 0 and PLACEHOLDER not in self.args:
+            raise PipelineError(f"stage {index} ({self.tool}): `args` needs a {PLACEHOLDER} for the value")
+        if index == 0 and PLACEHOLDER in self.args:
+            raise PipelineError(f"stage 0 ({self.tool}): the first stage has no input value")
+        self.structured = structured_opts(spec)
+        self.field = str(spec.get("field") or "")
+        self.filter = str(spec.get("filter") or "")
+        self.regex = None
+        self.group: Union[int, str] = 0
+        try:
+            self.max_items = int(spec.get("max_items") or DEFAULT_MAX_ITEMS)
+            if spec.get("regex"):
+                self.regex = re.compile(str(spec["regex"]), re.MULTILINE)
+            self.predicate = tabular.compile_where(self.filter)
+            if self.regex is not None:
+                self.group = self._group(spec.get("group"))
+        except re.error as ex:
+            raise PipelineError(f"stage {index} ({self.tool}): bad regex: {ex}")
+        except ValueError as ex:
+            raise PipelineError(f"stage {index} ({self.tool}): {ex}")
+        if not 0 < self.max_items <= MAX_FANOUT:
+            raise PipelineError(f"stage {index} ({self.tool}): `max_items` must be 1..{MAX_FANOUT}")
+        if not last and not (self.field or self.regex):
+            raise PipelineError(f"stage {index} ({self.tool}): needs `field` or `regex` to feed the next stage")
+        if self.field and not self.structured and not TEXT_TABLES.get(tool_kind(self.tool)):
+            raise PipelineError(f"stage {index} ({self.tool}): `field` needs structured output or a known "
+                                f"table layout; use `regex`")
+
+    def _group(self, group) -> Union[int, str]:
+        if group is None:
+            return 1 if self.regex.groups else 0
+        if isinstance(group, str) and not group.isdigit():
+            if group not in self.regex.groupindex:
+                raise ValueError(f"no group {group!r} in regex")
+            return group
+        if not 0 <= int(group) <= self.regex.groups:
+            raise ValueError(f"no group {group!r} in regex")
+        return int(group)
+
+    def command(self, value: Optional[str]) -> str:
+        return self.args if value is None else self.args.replace(PLACEHOLDER, shlex.quote(value))
+
+    def records(self, res: dict) -> List[dict]:
+        if self.structured:
+            rows = res.get("records") or []
+        else:
+            rows = parse_text_table(res.get("stdout") or "", TEXT_TABLES[tool_kind(self.tool)])
+        if self.predicate is None:
+            return rows
+        return [r for r in rows if self.predicate({tabular.norm(k): v for k, v in r.items()})]
+
+    def extract(self, res: dict) -> List[str]:
+        values: List[str] = []
+        if self.field:
+            key = tabular.norm(self.field)
+            for row in self.records(res):
+                by_norm = {tabular.norm(k): v for k, v in row.items()}
+                if by_norm.get(key):
+                    values.append(by_norm[key].strip())
+        elif self.regex is not None:
+            for m in self.regex.finditer(res.get("stdout") or ""):
+                value = m.group(self.group)
+                if value:
+                    values.append(value.strip())
+        return values
+
+
+def _safe_value(value: str) -> bool:
+    # a value must stay one positional argument: no flags, no `confirm=yes`
+    return bool(value) and not value.startswith(("-", "/")) and value.lower() not in CONFIRM_TOKENS
+
+
+def parse_stages(stages: List[Dict[str, Any]]) -> List[Stage]:
+    if not isinstance(stages, list) or not stages:
+        raise PipelineError("stages must be a non-empty list")
+    if len(stages) > MAX_STAGES:
+        raise PipelineError(f"at most {MAX_STAGES} stages per pipeline")
+    return [Stage(i, spec, i == len(stages) - 1) for i, spec in enumerate(stages)]
+
+
+async def run_pipeline(stages: List[Dict[str, Any]], cfg: dict, parallel: int = DEFAULT_PARALLEL,
+                       on_stage: Optional[StageCallback] = None) -> dict:
+    """Run `stages` and return the results of the last one, keyed by input value.
+
+    Returns {"results": [{"input": value, "result": res}], "stages": [summary]}.
+    """
+    try:
+        parsed = parse_stages(stages)
+    except PipelineError as ex:
+        return {"error": "invalid_pipeline", "detail": str(ex)}
+    catalog = get_registry((cfg or {}).get("BINARIES_PATH", "binaries.json")).catalog()
+    missing = [s.tool for s in parsed if not catalog.get(s.tool)]
+    if missing:
+        return {"error": "tool_not_found", "name": missing[0]}
+    sem = asyncio.Semaphore(max(1, min(int(parallel or DEFAULT_PARALLEL), 16)))
+
+    async def _run(stage: Stage, value: Optional[str]) -> dict:
+        async with sem:
+            try:
+                return await run_tool_by_name(stage.tool, stage.command(value), cfg, structured=stage.structured)
+            except Exception as ex:
+                LOG.exception("pipeline stage %d (%s) failed", stage.index, stage.tool)
+                return {"error": "internal_error", "detail": str(ex)}
+
+    started = time.monotonic()
+    inputs: List[Optional[str]] = [None]
+    summaries: List[dict] = []
+    results: List[dict] = []
+    for stage in parsed:
+        t0 = time.monotonic()
+        outs = await asyncio.gather(*(_run(stage, v) for v in inputs))
+        summary = {"stage": stage.index, "tool": stage.tool, "runs": len(outs),
+                   "errors": sum(1 for r in outs if "error" in r or not r.get("success", False))}
+        if stage.index == 0 and stage is not parsed[-1] and "error" in outs[0]:
+            # nothing to fan out from; return why the first stage failed
+            summary["elapsed_ms"] = round(1000 * (time.monotonic() - t0), 3)
+            return {"error": "stage_failed", "stage": 0, "result": outs[0], "stages": [summary]}
+        if stage is parsed[-1]:
+            results = [{"input": v, "result": r} for v, r in zip(inputs, outs)]
+        else:
+            values: List[str] = []
+            seen = set()
+            dropped = 0
+            for r in outs:
+                for v in stage.extract(r):
+                    if v in seen:
+                        continue
+                    seen.add(v)
+                    if not _safe_value(v):
+                        dropped += 1
+                        continue
+                    values.append(v)
+            summary["values"] = len(values)
+            if dropped:
+                summary["unsafe_values_dropped"] = dropped
+            if len(values) > stage.max_items:
+                summary["values_truncated"] = len(values) - stage.max_items
+                values = values[:stage.max_items]
+            inputs = values
+        summary["elapsed_ms"] = round(1000 * (time.monotonic() - t0), 3)
+        summaries.append(summary)
+        if on_stage is not None:
+            try:
+                r = on_stage(stage.index, summary)
+                if inspect.isawaitable(r):
+                    await r
+            except Exception:
+                LOG.exception("pipeline progress callback failed")
+        if not inputs:
+            break
+    return {"results": results, "stages": summaries, "elapsed_ms": round(1000 * (time.monotonic() - started), 3)}
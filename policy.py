@@ -0,0 +1,197 @@
+"""Per-tool argument policy, compiled once per catalog load.
+
+A tool's policy combines everything that restricts how it may be called:
+
+  * `schemas/<name>.schema.json`: JSON Schema over {flags, positional}, as
+    written by `enrich_safe_flags.py`. Schemas in the generated shape become
+    a flag set and a positional limit; richer ones keep a jsonschema validator.
+  * `schemas/<name>.json`: the older {allowed_flags, allow_free_args,
+    destructive} format. Flags here match case-insensitively, like the
+    Windows tools they describe.
+  * `destructive` and `safe_flags` from the tool's `binaries.json` entry.
+    `safe_flags` only restricts flags when no schema file does.
+  * a name-based safety net for well-known destructive tools.
+
+Files are looked up under the entry's name and its aliases, in that order,
+and a `.schema.json` wins over a `.json`. `ToolPolicy.check` walks the
+tokenized argv once and returns a `Decision` with the argv to run (server
+control tokens such as `--confirm` removed) or the reason it was refused.
+"""
+import json
+import logging
+import ntpath
+import os
+from pathlib import Path
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+import sanitize
+
+LOG = logging.getLogger("mcp_server")
+
+# matched as substrings of the tool name and executable name
+DESTRUCTIVE_NAMES = frozenset({"sdelete", "psexec", "pskill", "psservice", "psshutdown", "format", "cipher"})
+# consumed by the server, never passed to the tool
+CONFIRM_TOKENS = frozenset({"--confirm", "confirm=yes"})
+
+
+class Decision(NamedTuple):
+    allowed: bool
+    argv: List[str]
+    error: Optional[str] = None
+    reason: str = ""
+
+    @property
+    def needs_confirmation(self) -> bool:
+        return self.error == "destructive_tool_blocked"
+
+
+def _is_flag(token: str) -> bool:
+    return token.startswith("-") or token.startswith("/")
+
+
+class ToolPolicy:
+    """Compiled restrictions for one tool."""
+
+    __slots__ = ("name", "destructive", "allowed_flags", "folded_flags", "max_positional", "schema", "source")
+
+    def __init__(self, name: str, destructive: bool = False, allowed_flags: Optional[frozenset] = None,
+                 folded_flags: Optional[frozenset] = None, max_positional: Optional[int] = None,
+                 schema: Optional["sanitize.CompiledSchema"] = None, source: str = ""):
+        self.name = name
+        self.destructive = destructive
+        self.allowed_flags = allowed_flags
+        self.folded_flags = folded_flags
+        self.max_positional = max_positional
+        self.schema = schema
+        self.source = source or "policy"
+
+    def check(self, argv: Iterable[str], allow_destructive: bool = False) -> Decision:
+        argv = list(argv)
+        run_argv: List[str] = []
+        flags: List[str] = []
+        positional: List[str] = []
+        confirmed = False
+        for tok in argv:
+            if tok in CONFIRM_TOKENS:
+                confirmed = True
+                continue
+            if _is_flag(tok):
+                if self.allowed_flags is not None and tok not in self.allowed_flags and not (
+                        self.folded_flags is not None and tok.lower() in self.folded_flags):
+                    return Decision(False, argv, "args_schema_violation",
+                                    f"flag {tok!r} is not allowed for {self.name} ({self.source})")
+                flags.append(tok)
+            else:
+                positional.append(tok)
+                if self.max_positional is not None and len(positional) > self.max_positional:
+                    return Decision(False, argv, "args_schema_violation",
+                                    f"{self.name} takes at most {self.max_positional} positional "
+                                    f"argument(s) ({self.source})")
+            run_argv.append(tok)
+        if self.schema is not None:
+            try:
+                self.schema.validate(flags, positional)
+            except ValueError as ex:
+                return Decision(False, run_argv, "args_schema_violation", f"{ex} ({self.source})")
+        if self.destructive and not (allow_destructive or confirmed):
+            return Decision(False, run_argv, "destructive_tool_blocked", f"{self.name} is destructive")
+        return Decision(True, run_argv)
+
+
+def _load(path: Path) -> Optional[dict]:
+    try:
+        data = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError) as ex:
+        LOG.warning("ignoring unusable policy %s: %s", path, ex)
+        return None
+    if not isinstance(data, dict):
+        LOG.warning("ignoring unusable policy %s: not a JSON object", path)
+        return None
+    return data
+
+
+def _name_is_destructive(entry: dict) -> bool:
+    names = (str(entry.get("name") or "").lower(), ntpath.basename(str(entry.get("exe") or "")).lower())
+    return any(d in n for n in names for d in DESTRUCTIVE_NAMES)
+
+
+def compile_policy(entry: dict, schema_dir: Path, files: frozenset) -> Tuple[ToolPolicy, List[Path]]:
+    """Build the policy for one catalog entry; also returns the files it was built from."""
+    name = entry["name"]
+    policy = ToolPolicy(name, destructive=bool(entry.get("destructive")) or _name_is_destructive(entry))
+    used: List[Path] = []
+    names = [name] + [a for a in entry.get("aliases") or () if isinstance(a, str)]
+
+    schema_file = next((f"{n}.schema.json" for n in names if f"{n}.schema.json" in files), None)
+    legacy_file = next((f"{n}.json" for n in names if f"{n}.json" in files), None)
+    if legacy_file:
+        data = _load(schema_dir / legacy_file)
+        if data is not None:
+            used.append(schema_dir / legacy_file)
+            policy.destructive = policy.destructive or bool(data.get("destructive"))
+            if not schema_file:
+                if data.get("allowed_flags") is not None:
+                    flags = [str(f) for f in data["allowed_flags"]]
+                    policy.allowed_flags = frozenset(flags)
+                    policy.folded_flags = frozenset(f.lower() for f in flags)
+                if data.get("allow_free_args") is False:
+                    policy.max_positional = 0
+                policy.source = f"schemas/{legacy_file}"
+    if schema_file:
+        data = _load(schema_dir / schema_file)
+        if data is not None:
+            used.append(schema_dir / schema_file)
+            rules = sanitize.fast_path_rules(data)
+            if rules is not None:
+                policy.allowed_flags, policy.max_positional = rules
+                policy.source = f"schemas/{schema_file}"
+            else:
+                try:
+                    policy.schema = sanitize.CompiledSchema(data)
+                    policy.source = f"schemas/{schema_file}"
+                except Exception as ex:  # jsonschema.SchemaError, or jsonschema missing
+                    LOG.warning("ignoring unusable schema %s: %s", schema_dir / schema_file, ex)
+    if policy.allowed_flags is None and policy.schema is None and entry.get("safe_flags"):
+        policy.allowed_flags = frozenset(str(f) for f in entry["safe_flags"])
+        policy.source = "safe_flags in binaries.json"
+    return policy, used
+
+
+def _stamp(paths: Iterable[Path]) -> tuple:
+    out = []
+    for p in paths:
+        try:
+            st = p.stat()
+            out.append((st.st_mtime_ns, st.st_size))
+        except OSError:
+            out.append(None)
+    return tuple(out)
+
+
+class PolicySet:
+    """Policies for every entry of a catalog snapshot."""
+
+    def __init__(self, entries: Iterable[dict], schema_dir: Optional[Path] = None):
+        self.schema_dir = Path(schema_dir if schema_dir is not None else sanitize.SCHEMA_DIR)
+        try:
+            files = frozenset(de.name for de in os.scandir(self.schema_dir) if de.name.endswith(".json"))
+        except OSError:
+            files = frozenset()
+        self.policies: Dict[str, ToolPolicy] = {}
+        watched = [self.schema_dir]
+        for e in entries:
+            policy, used = compile_policy(e, self.schema_dir, files)
+            self.policies[e["name"]] = policy
+            watched += used
+        self._watched = tuple(watched)
+        self.stamp = _stamp(self._watched)
+
+    def is_current(self) -> bool:
+        """False once a schema file was added, removed or edited since compiling."""
+        return _stamp(self._watched) == self.stamp
+
+    def get(self, name: str) -> ToolPolicy:
+        policy = self.policies.get(name)
+        if policy is None:
+            policy = ToolPolicy(name, destructive=_name_is_destructive({"name": name}))
+        return policy
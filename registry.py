@@ -0,0 +1,213 @@
+"""Shared in-memory tool catalog with O(1) lookups and mtime-based hot reload.
+
+`binaries.json` (or a scan of the `binaries/` directory) is parsed once into an
+immutable `Catalog` snapshot. `ToolRegistry` re-stats the source at most every
+`check_interval` seconds and rebuilds only when its mtime/size changes; the new
+snapshot replaces the old one with a single reference assignment, so callers
+holding a snapshot never observe a half-loaded catalog. Each snapshot also
+carries the tools' compiled argument policies (see `policy.py`); editing a
+schema file triggers a rebuild as well.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from policy import PolicySet, ToolPolicy
+
+LOG = logging.getLogger("mcp_server")
+
+
+def categorize(path) -> str:
+    low = str(path).lower()
+    if "systeminternals" in low:
+        return "sysinternals"
+    if "nirsoft" in low:
+        return "nirsoft"
+    return "other"
+
+
+def resolve_source(path: str = "binaries.json") -> Optional[Path]:
+    """Return the file or directory `load_binaries` would actually read."""
+    p = Path(path)
+    if p.exists():
+        return p
+    fallback = Path("binaries")
+    if fallback.exists() and fallback.is_dir():
+        return fallback
+    return None
+
+
+def load_binaries(path: str = "binaries.json") -> list:
+    p = Path(path)
+    # If path is a directory, scan recursively for executables
+    if p.exists() and p.is_dir():
+        out = []
+        for f in p.rglob("*.exe"):
+            out.append({"name": f.stem, "exe": str(f), "category": categorize(f)})
+        return out
+
+    # If file exists and is JSON, load it
+    if p.exists() and p.is_file():
+        try:
+            return json.loads(p.read_text(encoding="utf-8"))
+        except Exception:
+            LOG.warning("failed to parse binaries.json; no tools registered")
+            return []
+
+    # fallback: look for a `binaries` directory next to the script
+    fallback = Path("binaries")
+    if fallback.exists() and fallback.is_dir():
+        return load_binaries(str(fallback))
+
+    LOG.warning("binaries.json not found and no binaries directory; no tools registered")
+    return []
+
+
+def _stamp(source: Optional[Path]) -> tuple:
+    """Cheap change detector for the catalog source.
+
+    For a JSON file this is (mtime_ns, size). For a directory scan the mtimes
+    of the directory tree are used, since adding or removing an executable
+    updates the mtime of the folder containing it.
+    """
+    if source is None:
+        return ()
+    try:
+        st = source.stat()
+    except OSError:
+        return ()
+    if not source.is_dir():
+        return (st.st_mtime_ns, st.st_size)
+    stamps = [(str(source), st.st_mtime_ns)]
+    for root, dirs, _files in os.walk(source):
+        for d in dirs:
+            try:
+                stamps.append((os.path.join(root, d), os.stat(os.path.join(root, d)).st_mtime_ns))
+            except OSError:
+                pass
+    return tuple(stamps)
+
+
+class Catalog:
+    """Immutable snapshot of the tool catalog and its lookup indexes."""
+
+    def __init__(self, entries: List[dict], stamp: tuple = ()):
+        self.stamp = stamp
+        self.loaded_at = time.time()
+        self.entries: Tuple[dict, ...] = tuple(e for e in entries if isinstance(e, dict) and e.get("name"))
+        by_name: Dict[str, dict] = {}
+        by_category: Dict[str, List[dict]] = {}
+        by_tag: Dict[str, List[dict]] = {}
+        aliases: Dict[str, dict] = {}
+        for e in self.entries:
+            name = e["name"]
+            # first entry wins, matching the historical linear `next(...)` scan
+            if name in by_name:
+                LOG.debug("duplicate catalog entry %s ignored", name)
+                continue
+            by_name[name] = e
+            by_category.setdefault(e.get("category", "other"), []).append(e)
+            for tag in e.get("tags") or ():
+                by_tag.setdefault(str(tag).lower(), []).append(e)
+            # e.g. `pslist64` for a collapsed pslist/pslist64 pair
+            for alias in e.get("aliases") or ():
+                aliases.setdefault(alias, e)
+        self.by_name = by_name
+        self.aliases = {k: v for k, v in aliases.items() if k not in by_name}
+        self.policies = PolicySet(by_name.values())
+        self.by_category = {k: tuple(v) for k, v in by_category.items()}
+        self.by_tag = {k: tuple(v) for k, v in by_tag.items()}
+
+    def __len__(self) -> int:
+        return len(self.by_name)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.by_name or name in self.aliases
+
+    def get(self, name: str) -> Optional[dict]:
+        return self.by_name.get(name) or self.aliases.get(name)
+
+    def policy(self, name: str) -> ToolPolicy:
+        entry = self.get(name)
+        return self.policies.get(entry["name"] if entry else name)
+
+    def unique_entries(self) -> Tuple[dict, ...]:
+        """Entries with duplicates removed, in catalog order."""
+        return tuple(self.by_name.values())
+
+    def in_category(self, category: str) -> Tuple[dict, ...]:
+        return self.by_category.get(category, ())
+
+    def with_tag(self, tag: str) -> Tuple[dict, ...]:
+        return self.by_tag.get(tag.lower(), ())
+
+
+class ToolRegistry:
+    """Hot-reloading holder of the current `Catalog` for one catalog path."""
+
+    def __init__(self, path: str = "binaries.json", check_interval: float = 1.0):
+        self.path = path
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._catalog: Optional[Catalog] = None
+        self._checked_at = 0.0
+
+    def catalog(self) -> Catalog:
+        """Return the current snapshot, rebuilding it if the source changed.
+
+        Hold on to the returned object for the duration of a call rather than
+        calling back into the registry, so a concurrent reload cannot change
+        the view mid-request.
+        """
+        cat = self._catalog
+        now = time.monotonic()
+        if cat is not None and now - self._checked_at < self.check_interval:
+            return cat
+        with self._lock:
+            cat = self._catalog
+            if cat is not None and now - self._checked_at < self.check_interval:
+                return cat
+            source = resolve_source(self.path)
+            stamp = _stamp(source)
+            self._checked_at = now
+            if cat is not None and stamp == cat.stamp and cat.policies.is_current():
+                return cat
+            new = Catalog(load_binaries(self.path), stamp)
+            if cat is not None:
+                LOG.info("tool catalog reloaded (%d tools)", len(new))
+            # single reference swap: readers see either the old or new snapshot
+            self._catalog = new
+            return new
+
+    def reload(self) -> Catalog:
+        """Force a rebuild on the next access and return the fresh snapshot."""
+        with self._lock:
+            self._catalog = None
+            self._checked_at = 0.0
+        return self.catalog()
+
+    def get(self, name: str) -> Optional[dict]:
+        return self.catalog().get(name)
+
+    def entries(self) -> Tuple[dict, ...]:
+        return self.catalog().unique_entries()
+
+
+_REGISTRIES: Dict[str, ToolRegistry] = {}
+_REGISTRIES_LOCK = threading.Lock()
+
+
+def get_registry(path: str = "binaries.json") -> ToolRegistry:
+    """Return the process-wide registry for `path`, creating it on first use."""
+    reg = _REGISTRIES.get(path)
+    if reg is None:
+        with _REGISTRIES_LOCK:
+            reg = _REGISTRIES.get(path)
+            if reg is None:
+                reg = ToolRegistry(path)
+                _REGISTRIES[path] = reg
+    return reg
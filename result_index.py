@@ -0,0 +1,217 @@
+"""Full-text index over recent tool results, for `search_results`.
+
+Every result that passes through `run_tool_by_name` is split into lines and
+added to an in-memory inverted index: word -> result -> line numbers.
+Structured (NirSoft) results are indexed one record per line. Each value
+is also indexed under its column, so `LocalPort:443` only matches that
+column. Questions like "which process owns port 443" or "where did I see
+foo.dll" are then answered from results the agent already has, without
+spawning anything.
+
+Queries are whitespace-separated terms that must all occur on the same
+line. Words match whole words, case-insensitively. A term such as
+`foo.dll` must also appear as written. `Column:value` restricts a term to
+one column of structured results; column names are matched loosely, as in
+`where` filters.
+
+The index holds at most `max_results` results and `max_bytes` of text.
+The least recently added or matched results are evicted first. Indexing
+runs on one background thread so tool calls never wait for it.
+"""
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, Optional, Set, Tuple
+
+import tabular
+from result_store import get_result_store
+
+_WORD_RE = re.compile(r"[0-9a-z_]+")
+# `Column:value`; a single letter before the colon is a drive (c:\...), not a column
+_COLUMN_TERM_RE = re.compile(r"^([A-Za-z][A-Za-z0-9_ ]+):(.+)$")
+
+
+def words(text: str) -> List[str]:
+    return _WORD_RE.findall(text.lower())
+
+
+class _Doc:
+    __slots__ = ("id", "tool", "args", "ts_ms", "lines", "tokens", "nbytes", "handle")
+
+    def __init__(self, doc_id: int, tool: str, args: str, ts_ms: int, handle: Optional[str] = None):
+        self.id = doc_id
+        self.tool = tool
+        self.args = args
+        self.ts_ms = ts_ms
+        self.lines: List[str] = []
+        self.tokens: Set[str] = set()
+        self.nbytes = 0
+        self.handle = handle
+
+
+class ResultIndex:
+    def __init__(self, max_results: int = 200, max_bytes: int = 64 * 1024 * 1024,
+                 max_result_bytes: int = 4 * 1024 * 1024, store=None):
+        self.max_results = max(1, max_results)
+        self.max_bytes = max_bytes
+        self.max_result_bytes = max_result_bytes
+        # spooled results are read back from here
+        self.store = store
+        self.bytes = 0
+        self.evictions = 0
+        self._docs: "OrderedDict[int, _Doc]" = OrderedDict()
+        # word (or `column:word`) -> doc id -> line numbers
+        self._postings: Dict[str, Dict[int, List[int]]] = {}
+        self._next_id = 1
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="result-index")
+
+    def submit(self, tool: str, args: str, res: dict) -> Future:
+        """Index `res` on the background thread."""
+        return self._executor.submit(self.add, tool, args, res, int(time.time() * 1000))
+
+    def _lines(self, res: dict) -> Tuple[List[Tuple[str, List[str]]], Optional[str]]:
+        budget = self.max_result_bytes or None
+        out: List[Tuple[str, List[str]]] = []
+        if res.get("records"):
+            used = 0
+            for rec in res["records"]:
+                line = " | ".join(f"{k}: {v}" for k, v in rec.items() if v)
+                toks = []
+                for k, v in rec.items():
+                    col = tabular.norm(k)
+                    for w in words(v):
+                        toks += (w, f"{col}:{w}")
+                out.append((line, toks))
+                used += len(line)
+                if budget and used >= budget:
+                    break
+            return out, None
+        text = res.get("stdout") or ""
+        handle = None
+        spooled = res.get("spooled")
+        if spooled and self.store is not None:
+            handle = spooled.get("handle")
+            text = self.store.read_range(handle, 0, budget or spooled.get("size") or 0).get("data") or ""
+        elif budget:
+            text = text[:budget]
+        out = [(line, words(line)) for line in text.splitlines() if line.strip()]
+        return out, handle
+
+    def add(self, tool: str, args: str, res: dict, ts_ms: Optional[int] = None) -> Optional[int]:
+        """Index one result; returns its id, or None when it has no text."""
+        lines, handle = self._lines(res)
+        if not lines:
+            return None
+        with self._lock:
+            doc = _Doc(self._next_id, tool, args, ts_ms if ts_ms is not None else int(time.time() * 1000), handle)
+            self._next_id += 1
+            for n, (line, toks) in enumerate(lines):
+                doc.lines.append(line)
+                doc.nbytes += len(line)
+                for tok in toks:
+                    hits = self._postings.setdefault(tok, {}).setdefault(doc.id, [])
+                    if not hits or hits[-1] != n:
+                        hits.append(n)
+                    doc.tokens.add(tok)
+            self._docs[doc.id] = doc
+            self.bytes += doc.nbytes
+            while len(self._docs) > 1 and (len(self._docs) > self.max_results or
+                                           (self.max_bytes and self.bytes > self.max_bytes)):
+                self._evict()
+            return doc.id
+
+    def _evict(self) -> None:
+        _, doc = self._docs.popitem(last=False)
+        self.bytes -= doc.nbytes
+        self.evictions += 1
+        for tok in doc.tokens:
+            docs = self._postings.get(tok)
+            if docs is not None:
+                docs.pop(doc.id, None)
+                if not docs:
+                    del self._postings[tok]
+
+    @staticmethod
+    def _parse(query: str) -> Tuple[List[str], List[str]]:
+        """(tokens that must be on the line, literal terms the line must contain)."""
+        tokens: List[str] = []
+        literals: List[str] = []
+        for term in query.split():
+            m = _COLUMN_TERM_RE.match(term)
+            if m:
+                col = tabular.norm(m.group(1))
+                tokens += [f"{col}:{w}" for w in words(m.group(2))]
+                continue
+            ws = words(term)
+            tokens += ws
+            if len(ws) != 1 or ws[0] != term.lower():
+                literals.append(term.lower())
+        return tokens, literals
+
+    def search(self, query: str, tool: Optional[str] = None, limit: int = 50) -> dict:
+        """Lines matching every term of `query`, newest results first."""
+        tokens, literals = self._parse(query or "")
+        if not tokens:
+            return {"error": "invalid_query", "detail": "The query has no searchable words."}
+        hits: List[dict] = []
+        matched = 0
+        with self._lock:
+            postings = [self._postings.get(tok) for tok in set(tokens)]
+            if any(p is None for p in postings):
+                return {"query": query, "hits": [], "matched": 0, "indexed_results": len(self._docs)}
+            postings.sort(key=len)
+            docs = [d for d in postings[0] if all(d in p for p in postings[1:])]
+            touched = []
+            for doc_id in sorted(docs, reverse=True):
+                doc = self._docs[doc_id]
+                if tool and doc.tool.lower() != tool.lower():
+                    continue
+                lines = set(postings[0][doc_id])
+                for p in postings[1:]:
+                    lines.intersection_update(p[doc_id])
+                found = False
+                for n in sorted(lines):
+                    line = doc.lines[n]
+                    if literals and not all(lit in line.lower() for lit in literals):
+                        continue
+                    found = True
+                    matched += 1
+                    if len(hits) < limit:
+                        hit = {"tool": doc.tool, "args": doc.args, "ts_ms": doc.ts_ms, "line_no": n + 1, "line": line}
+                        if doc.handle:
+                            hit["handle"] = doc.handle
+                        hits.append(hit)
+                if found:
+                    touched.append(doc_id)
+            for doc_id in touched:
+                # a result that answers questions stays around longer
+                self._docs.move_to_end(doc_id)
+            return {"query": query, "hits": hits, "matched": matched, "truncated": matched > len(hits),
+                    "indexed_results": len(self._docs)}
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"results": len(self._docs), "bytes": self.bytes, "words": len(self._postings),
+                    "evictions": self.evictions}
+
+
+_INDEX: Optional[ResultIndex] = None
+
+
+def get_result_index(cfg: Optional[dict] = None) -> Optional[ResultIndex]:
+    """Return the shared index, or None when `[index] enabled` is off."""
+    global _INDEX
+    cfg = cfg or {}
+    if str(cfg.get("INDEX_ENABLED", "false")).lower() not in ("1", "true", "yes"):
+        return None
+    if _INDEX is None:
+        _INDEX = ResultIndex(
+            max_results=int(cfg.get("INDEX_MAX_RESULTS", 200)),
+            max_bytes=int(cfg.get("INDEX_MAX_BYTES", 64 * 1024 * 1024)),
+            max_result_bytes=int(cfg.get("INDEX_MAX_RESULT_BYTES", 4 * 1024 * 1024)),
+            store=get_result_store(cfg),
+        )
+    return _INDEX
@@ -0,0 +1,218 @@
+"""Spool large tool outputs to disk and hand back a compact handle.
+
+Results whose stdout exceeds `inline_max_bytes` are written to the spool
+directory. The tool result then carries a handle plus the byte size and line
+count, and clients page through the output with `read_range`. Ranged reads
+use `mmap`, so only the requested window is read into memory. Spooled files
+expire by age and by a total disk quota, oldest first.
+
+`open_writer` gives a file that a run can stream stdout into while it is
+read, so the spooled copy is complete even when the in-memory copy was cut
+down to its head and tail.
+"""
+import logging
+import mmap
+import os
+import re
+import time
+import uuid
+from pathlib import Path
+from typing import Optional
+
+LOG = logging.getLogger("mcp_server")
+
+_HANDLE_RE = re.compile(r"^[0-9a-f]{32}$")
+
+
+class SpoolWriter:
+    """Binary sink for one result; becomes visible only once committed."""
+
+    def __init__(self, root: Path):
+        self.handle = uuid.uuid4().hex
+        self.tmp = root / f"{self.handle}.tmp"
+        self.path = root / f"{self.handle}.txt"
+        self.size = 0
+        self.newlines = 0
+        self._last = b""
+        self._fh = open(self.tmp, "wb")
+
+    def write(self, data: bytes) -> None:
+        self._fh.write(data)
+        self.size += len(data)
+        self.newlines += data.count(b"\n")
+        if data:
+            self._last = data[-1:]
+
+    @property
+    def lines(self) -> int:
+        return self.newlines + (1 if self.size and self._last != b"\n" else 0)
+
+    def commit(self) -> None:
+        self._fh.close()
+        os.replace(self.tmp, self.path)
+
+    def discard(self) -> None:
+        self._fh.close()
+        try:
+            self.tmp.unlink()
+        except OSError:
+            pass
+
+
+class ResultStore:
+    def __init__(self, root: str = "spool/results", inline_max_bytes: int = 256 * 1024,
+                 max_age: float = 3600.0, max_total_bytes: int = 512 * 1024 * 1024):
+        self.root = Path(root)
+        self.inline_max_bytes = inline_max_bytes
+        self.max_age = max_age
+        self.max_total_bytes = max_total_bytes
+
+    def _path(self, handle: str) -> Optional[Path]:
+        if not _HANDLE_RE.match(handle or ""):
+            return None
+        return self.root / f"{handle}.txt"
+
+    def should_spool(self, res: dict) -> bool:
+        return len(res.get("stdout") or "") > self.inline_max_bytes
+
+    def put(self, tool: str, text: str) -> dict:
+        """Write `text` to the spool and return its handle metadata."""
+        self.root.mkdir(parents=True, exist_ok=True)
+        handle = uuid.uuid4().hex
+        data = text.encode("utf-8", errors="replace")
+        tmp = self.root / f"{handle}.tmp"
+        tmp.write_bytes(data)
+        os.replace(tmp, self.root / f"{handle}.txt")
+        lines = data.count(b"\n") + (1 if data and not data.endswith(b"\n") else 0)
+        self.expire()
+        return {"handle": handle, "tool": tool, "size": len(data), "lines": lines}
+
+    def open_writer(self) -> SpoolWriter:
+        self.root.mkdir(parents=True, exist_ok=True)
+        return SpoolWriter(self.root)
+
+    def commit_writer(self, writer: SpoolWriter, tool: str, res: dict) -> dict:
+        """Publish `writer` as the spooled stdout of `res` and return the updated result."""
+        writer.commit()
+        self.expire()
+        out = dict(res)
+        out["stdout"] = ""
+        out["spooled"] = {"handle": writer.handle, "tool": tool, "size": writer.size, "lines": writer.lines}
+        return out
+
+    def spool_result(self, tool: str, res: dict) -> dict:
+        """Replace a large `stdout` with a handle; small results pass through unchanged."""
+        if not self.should_spool(res):
+            return res
+        meta = self.put(tool, res["stdout"])
+        out = dict(res)
+        out["stdout"] = ""
+        out["spooled"] = meta
+        return out
+
+    def read_range(self, handle: str, offset: int = 0, length: int = 65536,
+                   start_line: Optional[int] = None, num_lines: Optional[int] = None) -> dict:
+        """Read a byte range, or a line range when `start_line` is given (0-based)."""
+        p = self._path(handle)
+        if p is None or not p.exists():
+            return {"error": "result_not_found", "handle": handle}
+        size = p.stat().st_size
+        if size == 0:
+            return {"handle": handle, "size": 0, "offset": 0, "data": "", "eof": True}
+        with open(p, "rb") as fh, mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            if start_line is not None:
+                return self._read_lines(mm, handle, size, max(0, start_line), max(0, num_lines or 100))
+            offset = min(max(0, offset), size)
+            end = min(size, offset + max(0, length))
+            data = mm[offset:end]
+        return {
+            "handle": handle,
+            "size": size,
+            "offset": offset,
+            "next_offset": end,
+            "data": data.decode("utf-8", errors="ignore"),
+            "eof": end >= size,
+        }
+
+    @staticmethod
+    def _read_lines(mm: mmap.mmap, handle: str, size: int, start_line: int, num_lines: int) -> dict:
+        pos = 0
+        for _ in range(start_line):
+            nl = mm.find(b"\n", pos)
+            if nl < 0:
+                pos = size
+                break
+            pos = nl + 1
+        begin = pos
+        for _ in range(num_lines):
+            if pos >= size:
+                break
+            nl = mm.find(b"\n", pos)
+            pos = size if nl < 0 else nl + 1
+        return {
+            "handle": handle,
+            "size": size,
+            "start_line": start_line,
+            "offset": begin,
+            "next_offset": pos,
+            "data": mm[begin:pos].decode("utf-8", errors="ignore"),
+            "eof": pos >= size,
+        }
+
+    def delete(self, handle: str) -> bool:
+        p = self._path(handle)
+        if p is None:
+            return False
+        try:
+            p.unlink()
+            return True
+        except FileNotFoundError:
+            return False
+
+    def expire(self) -> int:
+        """Remove files older than `max_age`, then oldest files until under quota."""
+        if not self.root.exists():
+            return 0
+        now = time.time()
+        files = []
+        removed = 0
+        for f in self.root.iterdir():
+            try:
+                st = f.stat()
+            except OSError:
+                continue
+            if now - st.st_mtime > self.max_age:
+                removed += self._unlink(f)
+            elif f.suffix == ".txt":
+                files.append((st.st_mtime_ns, st.st_size, f))
+        total = sum(s for _m, s, _f in files)
+        for _mtime, size, f in sorted(files, key=lambda t: t[0]):
+            if total <= self.max_total_bytes:
+                break
+            removed += self._unlink(f)
+            total -= size
+        return removed
+
+    @staticmethod
+    def _unlink(f: Path) -> int:
+        try:
+            f.unlink()
+            return 1
+        except OSError:
+            return 0
+
+
+_STORE: Optional[ResultStore] = None
+
+
+def get_result_store(cfg: Optional[dict] = None) -> ResultStore:
+    global _STORE
+    if _STORE is None:
+        cfg = cfg or {}
+        _STORE = ResultStore(
+            root=cfg.get("RESULTS_DIR", "spool/results"),
+            inline_max_bytes=int(cfg.get("RESULTS_INLINE_MAX_BYTES", 256 * 1024)),
+            max_age=float(cfg.get("RESULTS_MAX_AGE", 3600)),
+            max_total_bytes=int(cfg.get("RESULTS_MAX_TOTAL_BYTES", 512 * 1024 * 1024)),
+        )
+    return _STORE
@@ -1,26 +1,239 @@
 import asyncio
-from asyncio.subprocess import PIPE
-from typing import List
+import codecs
+import inspect
+import logging
+import os
+import signal
+import subprocess
+import time
+from asyncio.subprocess import DEVNULL, PIPE
+from typing import Awaitable, BinaryIO, Callable, List, Optional, Union
 
+LOG = logging.getLogger("mcp_server")
 
-async def run_command(exe: str, args: List[str], timeout: int = 30) -> dict:
+CHUNK_SIZE = 64 * 1024
+
+# on_output(stream_name, text) -> None | awaitable; stream_name is "stdout" or "stderr"
+OutputCallback = Callable[[str, str], Union[None, Awaitable[None]]]
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Children's CPU time is only reported process-wide (RUSAGE_CHILDREN), so a
+# run's CPU time is attributed only if no other run overlapped with it.
+_ACTIVE = 0
+_STARTS = 0
+
+
+def _children_cpu() -> Optional[float]:
+    if resource is None:
+        return None
+    ru = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return ru.ru_utime + ru.ru_stime
+
+
+class OutputBuffer:
+    """Keeps the first `head` and last `tail` bytes written to it.
+
+    With both limits unset everything is kept. Memory stays bounded by
+    head + tail no matter how much the process prints; `total` still counts
+    every byte seen.
+    """
+
+    def __init__(self, head: Optional[int] = None, tail: Optional[int] = None):
+        self.head_limit = head
+        self.tail_limit = tail or 0
+        self.total = 0
+        self._head = bytearray()
+        self._tail = bytearray()
+
+    def write(self, data: bytes) -> None:
+        self.total += len(data)
+        if self.head_limit is None:
+            self._head += data
+            return
+        room = self.head_limit - len(self._head)
+        if room > 0:
+            self._head += data[:room]
+            data = data[room:]
+        if data and self.tail_limit:
+            self._tail += data
+            excess = len(self._tail) - self.tail_limit
+            if excess > 0:
+                del self._tail[:excess]
+
+    @property
+    def truncated(self) -> bool:
+        return self.total > len(self._head) + len(self._tail)
+
+    def getvalue(self) -> str:
+        head = self._head.decode(errors="ignore")
+        if not self.truncated:
+            return head + self._tail.decode(errors="ignore")
+        omitted = self.total - len(self._head) - len(self._tail)
+        return f"{head}\n...[{omitted} bytes omitted]...\n{self._tail.decode(errors='ignore')}"
+
+
+async def _pump(stream: Optional[asyncio.StreamReader], buf: OutputBuffer, name: str,
+                on_output: Optional[OutputCallback], sink: Optional[BinaryIO] = None) -> None:
+    if stream is None:
+        return
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="ignore")
+    while True:
+        chunk = await stream.read(CHUNK_SIZE)
+        if not chunk:
+            break
+        buf.write(chunk)
+        if sink is not None:
+            sink.write(chunk)
+        if on_output is None:
+            continue
+        text = decoder.decode(chunk)
+        if not text:
+            continue
+        try:
+            r = on_output(name, text)
+            if inspect.isawaitable(r):
+                await r
+        except Exception:
+            # a broken consumer must not stall the pipe; keep draining without it
+            LOG.exception("output callback failed; disabling streaming for this call")
+            on_output = None
+
+
+def _spawn_options() -> dict:
+    # Put the child in its own process group/session so the whole tree
+    # (including PsExec-style grandchildren) can be signalled at once.
+    if os.name == "nt":
+        return {"creationflags": getattr(subprocess, "CREATE_NEW_PROCESS_GROUP", 0)}
+    return {"start_new_session": True}
+
+
+def _signal_group(pid: int, sig: int) -> None:
     try:
-        proc = await asyncio.create_subprocess_exec(exe, *args, stdout=PIPE, stderr=PIPE)
+        os.killpg(pid, sig)
+    except (ProcessLookupError, PermissionError):
+        pass
+
+
+async def kill_process_tree(proc: asyncio.subprocess.Process, grace: float = 2.0) -> None:
+    """Terminate `proc` and every process in its group.
+
+    POSIX: SIGTERM to the group, then SIGKILL after `grace` seconds. The
+    SIGKILL is sent even if the leader exited, so descendants that ignore
+    SIGTERM do not outlive it. Windows: `taskkill /T /F` on the tree.
+    """
+    if os.name == "nt":
+        try:
+            killer = await asyncio.create_subprocess_exec(
+                "taskkill", "/T", "/F", "/PID", str(proc.pid), stdout=DEVNULL, stderr=DEVNULL)
+            await killer.wait()
+        except Exception:
+            pass
+        if proc.returncode is None:
+            try:
+                proc.kill()
+            except ProcessLookupError:
+                pass
+    else:
+        _signal_group(proc.pid, signal.SIGTERM)
+        try:
+            await asyncio.wait_for(proc.wait(), timeout=grace)
+        except asyncio.TimeoutError:
+            LOG.warning("process group %s ignored SIGTERM; sending SIGKILL", proc.pid)
+        _signal_group(proc.pid, signal.SIGKILL)
+    await proc.wait()
+
+
+async def run_command(exe: str, args: List[str], timeout: int = 30,
+                      on_output: Optional[OutputCallback] = None,
+                      head_bytes: Optional[int] = None, tail_bytes: Optional[int] = None,
+                      kill_grace: float = 2.0, stdout_sink: Optional[BinaryIO] = None,
+                      metrics: Optional[dict] = None) -> dict:
+    """Run `exe` with `args`, reading stdout/stderr incrementally.
+
+    Chunks are forwarded to `on_output` as they arrive. When `head_bytes` is
+    set only the first `head_bytes` and last `tail_bytes` of each stream are
+    kept in memory and the result is flagged `truncated`. Every stdout byte is
+    also written to `stdout_sink` when given, so the complete output can be
+    kept on disk while memory stays bounded.
+
+    When `metrics` is a dict it receives `spawn_s`, `wall_s`, `stdout_bytes`,
+    `stderr_bytes` and, where it can be attributed, `cpu_s`.
+
+    On timeout the whole process tree is killed and the output captured so
+    far is returned with `timeout` and `truncated` set. If the calling task is
+    cancelled the tree is killed before the cancellation propagates.
+    """
+    global _ACTIVE, _STARTS
+    started = time.perf_counter()
+    cpu_before = _children_cpu() if _ACTIVE == 0 else None
+    starts_before = _STARTS
+    try:
+        proc = await asyncio.create_subprocess_exec(exe, *args, stdout=PIPE, stderr=PIPE, **_spawn_options())
     except FileNotFoundError as e:
         return {"exit_code": None, "stdout": "", "stderr": str(e), "error": "not_found", "timeout": False, "success": False}
+    spawned = time.perf_counter()
+    _ACTIVE += 1
+    _STARTS += 1
+    try:
+        res = await _collect(proc, timeout, on_output, head_bytes, tail_bytes, kill_grace, stdout_sink)
+    finally:
+        _ACTIVE -= 1
+    if metrics is not None:
+        metrics["spawn_s"] = spawned - started
+        metrics["wall_s"] = time.perf_counter() - started
+        metrics["stdout_bytes"] = res["stdout_bytes"]
+        metrics["stderr_bytes"] = res["stderr_bytes"]
+        if cpu_before is not None and _ACTIVE == 0 and _STARTS == starts_before + 1:
+            metrics["cpu_s"] = _children_cpu() - cpu_before
+    return res
+
 
+async def _collect(proc: asyncio.subprocess.Process, timeout: int, on_output: Optional[OutputCallback],
+                   head_bytes: Optional[int], tail_bytes: Optional[int], kill_grace: float,
+                   stdout_sink: Optional[BinaryIO]) -> dict:
+    out_buf = OutputBuffer(head_bytes, tail_bytes)
+    err_buf = OutputBuffer(head_bytes, tail_bytes)
+    pumps = [
+        asyncio.ensure_future(_pump(proc.stdout, out_buf, "stdout", on_output, stdout_sink)),
+        asyncio.ensure_future(_pump(proc.stderr, err_buf, "stderr", on_output)),
+    ]
     try:
-        stdout, stderr = await asyncio.wait_for(proc.communicate(), timeout=timeout)
-    except asyncio.TimeoutError:
-        proc.kill()
-        await proc.wait()
-        return {"exit_code": None, "stdout": "", "stderr": "Timed out", "timeout": True, "success": False}
-    out = stdout.decode(errors="ignore") if stdout else ""
-    err = stderr.decode(errors="ignore") if stderr else ""
+        # pipes reach EOF only once every process holding them has exited
+        _done, pending = await asyncio.wait([*pumps, asyncio.ensure_future(proc.wait())], timeout=timeout)
+    except asyncio.CancelledError:
+        await kill_process_tree(proc, kill_grace)
+        for p in pumps:
+            p.cancel()
+        raise
+
+    if pending:
+        await kill_process_tree(proc, kill_grace)
+        # collect whatever was still sitting in the pipes when the tree died
+        _done, stuck = await asyncio.wait(pumps, timeout=1.0)
+        for p in stuck:
+            p.cancel()
+        captured = err_buf.getvalue()
+        return {
+            "exit_code": None,
+            "stdout": out_buf.getvalue(),
+            "stderr": f"{captured}\nTimed out" if captured else "Timed out",
+            "timeout": True,
+            "success": False,
+            "truncated": True,
+            "stdout_bytes": out_buf.total,
+            "stderr_bytes": err_buf.total,
+        }
     return {
         "exit_code": proc.returncode,
-        "stdout": out,
-        "stderr": err,
+        "stdout": out_buf.getvalue(),
+        "stderr": err_buf.getvalue(),
         "timeout": False,
         "success": (proc.returncode == 0),
+        "truncated": out_buf.truncated or err_buf.truncated,
+        "stdout_bytes": out_buf.total,
+        "stderr_bytes": err_buf.total,
     }
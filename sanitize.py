@@ -1,11 +1,17 @@
 import re
 import shlex
 import json
+import logging
 from pathlib import Path
-from jsonschema import validate, ValidationError
+from typing import List, Optional, Sequence, Tuple, Union
+
+
+LOG = logging.getLogger("mcp_server")
 
 _UNSAFE = re.compile(r"[;&|<>`$]")
 
+SCHEMA_DIR = Path("schemas")
+
 
 def sanitize_args(args: str):
     if not args or args.strip() == "":
@@ -15,27 +21,109 @@ def sanitize_args(args: str):
     return shlex.split(args)
 
 
-def validate_args_with_schema(tool_name: str, args: str) -> None:
+def split_flags(tokens: Sequence[str]) -> Tuple[List[str], List[str]]:
+    """Split tokens into (flags, positional) the way tool schemas expect."""
+    flags = [t for t in tokens if t.startswith("-") or t.startswith("/")]
+    positional = [t for t in tokens if not (t.startswith("-") or t.startswith("/"))]
+    return flags, positional
+
+
+def fast_path_rules(schema: dict) -> Optional[Tuple[Optional[frozenset], Optional[int]]]:
+    """(allowed flags, max positional) for a schema of the `make_schema` shape, else None.
+
+    None for either value means "unrestricted"; None overall means the schema
+    uses more of JSON Schema than a flag enum and a positional `maxItems`.
+    """
+    if set(schema) - {"$schema", "type", "properties", "additionalProperties", "description", "title"}:
+        return None
+    if schema.get("type") != "object" or schema.get("additionalProperties") is not False:
+        return None
+    props = schema.get("properties") or {}
+    if set(props) - {"flags", "positional"}:
+        return None
+    flags = props.get("flags", {})
+    positional = props.get("positional", {})
+    if set(flags) - {"type", "items"} or flags.get("type", "array") != "array":
+        return None
+    if set(flags.get("items", {})) - {"enum"}:
+        return None
+    if set(positional) - {"type", "items", "maxItems"} or positional.get("type", "array") != "array":
+        return None
+    if positional.get("items", {"type": "string"}) != {"type": "string"}:
+        return None
+    allowed = None
+    enum = flags.get("items", {}).get("enum")
+    if enum is not None:
+        if not all(isinstance(v, str) for v in enum):
+            return None
+        allowed = frozenset(enum)
+    max_items = positional.get("maxItems")
+    if max_items is not None and not isinstance(max_items, int):
+        return None
+    return allowed, max_items
+
+
+class CompiledSchema:
+    """A parsed `*.schema.json` with its validator built once.
+
+    Schemas in the shape written by `enrich_safe_flags.make_schema` (a flag
+    enum plus an optional positional `maxItems`) also get a fast path that
+    checks flags with a frozenset lookup instead of running jsonschema.
+    """
+
+    def __init__(self, schema: dict):
+        # imported here: jsonschema is only needed once a tool has a schema file
+        from jsonschema import Draft7Validator, validators
+
+        cls = validators.validator_for(schema, default=Draft7Validator)
+        cls.check_schema(schema)
+        self.validator = cls(schema)
+        self.allowed_flags: Optional[frozenset] = None
+        self.max_positional: Optional[int] = None
+        self.fast = self._compile_fast_path(schema)
+
+    def _compile_fast_path(self, schema: dict) -> bool:
+        rules = fast_path_rules(schema)
+        if rules is None:
+            return False
+        self.allowed_flags, self.max_positional = rules
+        return True
+
+    def is_valid_fast(self, flags: List[str], positional: List[str]) -> bool:
+        if self.allowed_flags is not None and not self.allowed_flags.issuperset(flags):
+            return False
+        if self.max_positional is not None and len(positional) > self.max_positional:
+            return False
+        return True
+
+    def validate(self, flags: List[str], positional: List[str]) -> None:
+        if self.fast and self.is_valid_fast(flags, positional):
+            return
+        # slow path (or fast-path rejection): let jsonschema produce the message
+        error = next(iter(self.validator.iter_errors({"flags": flags, "positional": positional})), None)
+        if error is not None:
+            raise ValueError(str(error))
+
+
+def validate_args_with_schema(tool_name: str, args: Union[str, Sequence[str]]) -> None:
     """Validate `args` against a full JSON Schema `schemas/{tool_name}.schema.json` if present.
 
-    The schema expects an object {flags: [...], positional: [...]}. We translate
-    the provided `args` into that form and run `jsonschema.validate`.
+    The schema expects an object {flags: [...], positional: [...]}. `args` may be
+    the raw argument string or the token list already produced by
+    `sanitize_args`. Tool runs are checked by the compiled `policy.PolicySet`
+    instead; this reads the schema on every call.
     Raises ValueError on invalid args.
     """
-    p = Path("schemas") / f"{tool_name}.schema.json"
-    if not p.exists():
-        return
+    p = SCHEMA_DIR / f"{tool_name}.schema.json"
     try:
-        schema = json.loads(p.read_text(encoding="utf-8"))
-    except Exception:
+        compiled = CompiledSchema(json.loads(p.read_text(encoding="utf-8")))
+    except FileNotFoundError:
         return
-
-    tokens = shlex.split(args) if args else []
-    flags = [t for t in tokens if t.startswith("-") or t.startswith("/")]
-    positional = [t for t in tokens if not (t.startswith("-") or t.startswith("/"))]
-
-    payload = {"flags": flags, "positional": positional}
-    try:
-        validate(payload, schema)
-    except ValidationError as e:
-        raise ValueError(str(e))
\ No newline at end of file
+    except Exception as ex:  # unreadable JSON, jsonschema.SchemaError
+        LOG.warning("ignoring unusable schema %s: %s", p, ex)
+        return
+    if isinstance(args, str):
+        tokens = shlex.split(args) if args else []
+    else:
+        tokens = list(args)
+    compiled.validate(*split_flags(tokens))
@@ -0,0 +1,220 @@
+"""Concurrency-limited admission control in front of `runner.run_command`.
+
+A single `Scheduler` enforces a global cap on concurrently running tools plus
+optional per-tool and per-category caps. Calls that cannot start immediately
+wait in a bounded priority queue; when the queue is full the call is rejected
+straight away with `SchedulerFull` instead of piling up behind a timeout.
+"""
+import asyncio
+import bisect
+import itertools
+import logging
+import time
+from typing import Awaitable, Callable, Dict, List, Optional
+
+LOG = logging.getLogger("mcp_server")
+
+
+class SchedulerFull(Exception):
+    """Raised when the wait queue is at capacity."""
+
+
+def parse_limits(spec: str) -> Dict[str, int]:
+    """Parse a `name:limit, name:limit` config value into a dict."""
+    out: Dict[str, int] = {}
+    for part in (spec or "").replace("\n", ",").split(","):
+        part = part.strip()
+        if not part or ":" not in part:
+            continue
+        key, _, val = part.rpartition(":")
+        try:
+            out[key.strip()] = max(1, int(val))
+        except ValueError:
+            LOG.warning("ignoring invalid limit %r", part)
+    return out
+
+
+class _ToolStats:
+    __slots__ = ("queued", "running", "started", "completed", "rejected",
+                 "wait_total", "wait_max", "run_total", "run_max")
+
+    def __init__(self):
+        self.queued = 0
+        self.running = 0
+        self.started = 0
+        self.completed = 0
+        self.rejected = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.run_total = 0.0
+        self.run_max = 0.0
+
+    def as_dict(self) -> dict:
+        return {
+            "queued": self.queued,
+            "running": self.running,
+            "started": self.started,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "wait_avg_ms": round(1000 * self.wait_total / self.started, 3) if self.started else 0.0,
+            "wait_max_ms": round(1000 * self.wait_max, 3),
+            "run_avg_ms": round(1000 * self.run_total / self.completed, 3) if self.completed else 0.0,
+            "run_max_ms": round(1000 * self.run_max, 3),
+        }
+
+
+class _Waiter:
+    __slots__ = ("key", "tool", "category", "future", "enqueued")
+
+    def __init__(self, key, tool, category, future):
+        self.key = key
+        self.tool = tool
+        self.category = category
+        self.future = future
+        self.enqueued = time.monotonic()
+
+    def __lt__(self, other):
+        return self.key < other.key
+
+
+class Scheduler:
+    def __init__(self, max_concurrent: int = 8, max_queue: int = 64,
+                 tool_limits: Optional[Dict[str, int]] = None,
+                 category_limits: Optional[Dict[str, int]] = None):
+        self.max_concurrent = max(1, int(max_concurrent))
+        self.max_queue = max(0, int(max_queue))
+        self.tool_limits = dict(tool_limits or {})
+        self.category_limits = dict(category_limits or {})
+        self._running = 0
+        self._running_tool: Dict[str, int] = {}
+        self._running_category: Dict[str, int] = {}
+        # kept sorted by (-priority, seq): highest priority first, FIFO within a priority
+        self._waiting: List[_Waiter] = []
+        self._seq = itertools.count()
+        self._stats: Dict[str, _ToolStats] = {}
+
+    def _tool_stats(self, tool: str) -> _ToolStats:
+        st = self._stats.get(tool)
+        if st is None:
+            st = self._stats[tool] = _ToolStats()
+        return st
+
+    def _can_start(self, tool: str, category: str) -> bool:
+        if self._running >= self.max_concurrent:
+            return False
+        limit = self.tool_limits.get(tool)
+        if limit is not None and self._running_tool.get(tool, 0) >= limit:
+            return False
+        limit = self.category_limits.get(category)
+        if limit is not None and self._running_category.get(category, 0) >= limit:
+            return False
+        return True
+
+    def _acquire(self, tool: str, category: str) -> None:
+        self._running += 1
+        self._running_tool[tool] = self._running_tool.get(tool, 0) + 1
+        self._running_category[category] = self._running_category.get(category, 0) + 1
+        self._tool_stats(tool).running += 1
+
+    def _release(self, tool: str, category: str) -> None:
+        self._running -= 1
+        self._running_tool[tool] -= 1
+        self._running_category[category] -= 1
+        self._tool_stats(tool).running -= 1
+        self._wake()
+
+    def _wake(self) -> None:
+        # Hand freed slots to the best-ranked waiter that fits its caps; a
+        # waiter blocked on a per-tool cap does not hold up other tools.
+        i = 0
+        while i < len(self._waiting) and self._running < self.max_concurrent:
+            w = self._waiting[i]
+            if w.future.done():
+                del self._waiting[i]
+                continue
+            if self._can_start(w.tool, w.category):
+                del self._waiting[i]
+                self._acquire(w.tool, w.category)
+                w.future.set_result(None)
+                continue
+            i += 1
+
+    async def run(self, tool: str, category: str, fn: Callable[[], Awaitable],
+                  priority: int = 0):
+        """Run `fn()` once a slot for (tool, category) is free.
+
+        Higher `priority` values are admitted first. Raises `SchedulerFull`
+        if the call would have to wait and the queue is already full.
+        """
+        category = category or "other"
+        st = self._tool_stats(tool)
+        queued_at = time.monotonic()
+        # _release hands freed slots to waiters straight away, so anyone still
+        # queued is blocked by its own caps and a free slot here is ours to take
+        if self._can_start(tool, category):
+            self._acquire(tool, category)
+        else:
+            if len(self._waiting) >= self.max_queue:
+                st.rejected += 1
+                raise SchedulerFull(f"scheduler queue full ({self.max_queue} waiting)")
+            fut = asyncio.get_running_loop().create_future()
+            waiter = _Waiter((-priority, next(self._seq)), tool, category, fut)
+            bisect.insort(self._waiting, waiter)
+            st.queued += 1
+            try:
+                await fut
+            except asyncio.CancelledError:
+                if fut.done() and not fut.cancelled():
+                    # slot was granted just as we were cancelled: give it back
+                    self._release(tool, category)
+                else:
+                    try:
+                        self._waiting.remove(waiter)
+                    except ValueError:
+                        pass
+                raise
+            finally:
+                st.queued -= 1
+
+        waited = time.monotonic() - queued_at
+        st.started += 1
+        st.wait_total += waited
+        st.wait_max = max(st.wait_max, waited)
+        started = time.monotonic()
+        try:
+            return await fn()
+        finally:
+            ran = time.monotonic() - started
+            st.completed += 1
+            st.run_total += ran
+            st.run_max = max(st.run_max, ran)
+            self._release(tool, category)
+
+    def queue_depth(self) -> int:
+        return len(self._waiting)
+
+    def stats(self) -> dict:
+        return {
+            "max_concurrent": self.max_concurrent,
+            "max_queue": self.max_queue,
+            "running": self._running,
+            "queue_depth": len(self._waiting),
+            "tools": {name: st.as_dict() for name, st in sorted(self._stats.items())},
+        }
+
+
+_SCHEDULER: Optional[Scheduler] = None
+
+
+def get_scheduler(cfg: Optional[dict] = None) -> Scheduler:
+    """Return the process-wide scheduler, building it from `cfg` on first use."""
+    global _SCHEDULER
+    if _SCHEDULER is None:
+        cfg = cfg or {}
+        _SCHEDULER = Scheduler(
+            max_concurrent=int(cfg.get("MAX_CONCURRENT", 8)),
+            max_queue=int(cfg.get("MAX_QUEUE", 64)),
+            tool_limits=parse_limits(cfg.get("TOOL_LIMITS", "")),
+            category_limits=parse_limits(cfg.get("CATEGORY_LIMITS", "")),
+        )
+    return _SCHEDULER
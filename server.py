@@ -3,25 +3,42 @@ import json
 import logging
 import logging.config
 import os
-import tempfile
 import sys
+import time
 
 from pathlib import Path
+from typing import Optional
 
-from runner import run_command
+import tabular
+from cache import cache_ttl, get_result_cache, make_key
+from executors import Executor, get_executors
+from export_spool import get_export_spool
+from registry import get_registry, load_binaries  # noqa: F401 (re-exported)
+from metrics import get_metrics
+from result_index import get_result_index
+from result_store import get_result_store
 from sanitize import sanitize_args
+from scheduler import SchedulerFull, get_scheduler
+from tool_health import get_tool_health
 
 LOG = logging.getLogger("mcp_server")
-conf_path = Path("logging.conf")
-if conf_path.exists():
-    try:
-        logging.config.fileConfig(conf_path, disable_existing_loggers=False)
-    except Exception:
-        import sys as _sys
-        logging.basicConfig(level=logging.INFO, stream=_sys.stderr)
-else:
-    import sys as _sys
-    logging.basicConfig(level=logging.INFO, stream=_sys.stderr)
+
+
+def configure_logging(conf_path: str = "logging.conf") -> None:
+    """Apply `logging.conf` if present, else log INFO to stderr.
+
+    Called from the entry points rather than at import time, so importing
+    this module (tests, tools.py, the MCP server) does not touch handlers
+    or open the audit log.
+    """
+    p = Path(conf_path)
+    if p.exists():
+        try:
+            logging.config.fileConfig(p, disable_existing_loggers=False)
+            return
+        except Exception:
+            pass
+    logging.basicConfig(level=logging.INFO, stream=sys.stderr)
 
 
 def load_config(path: str = "config.ini") -> dict:
@@ -39,47 +56,168 @@ def load_config(path: str = "config.ini") -> dict:
         cfg["LOG_LEVEL"] = parser.get("server", "log_level", fallback="INFO")
         cfg["TIMEOUT"] = parser.get("server", "timeout", fallback="30")
         cfg["ALLOW_DESTRUCTIVE"] = parser.get("server", "allow_destructive", fallback="false")
+        cfg["KILL_GRACE"] = parser.get("server", "kill_grace", fallback="2")
+        cfg["STREAM_OUTPUT"] = parser.get("server", "stream_output", fallback="true")
+        cfg["TOOL_MODE"] = parser.get("server", "tool_mode", fallback="tools")
+        cfg["TRANSPORT"] = parser.get("server", "transport", fallback="stdio").lower()
+        cfg["HTTP_HOST"] = parser.get("server", "host", fallback="127.0.0.1")
+        cfg["HTTP_PORT"] = parser.get("server", "port", fallback="8765")
+        cfg["HTTP_PATH"] = parser.get("server", "http_path", fallback="")
+        cfg["DRAIN_TIMEOUT"] = parser.get("server", "drain_timeout", fallback="30")
+        cfg["OUTPUT_HEAD_BYTES"] = parser.get("server", "output_head_bytes", fallback="")
+        cfg["OUTPUT_TAIL_BYTES"] = parser.get("server", "output_tail_bytes", fallback="")
+    if parser.has_section("cache"):
+        cfg["CACHE_ENABLED"] = parser.get("cache", "enabled", fallback="false")
+        cfg["CACHE_MAX_BYTES"] = parser.get("cache", "max_bytes", fallback=str(64 * 1024 * 1024))
+        cfg["CACHE_DEFAULT_TTL"] = parser.get("cache", "default_ttl", fallback="0")
+    if parser.has_section("results"):
+        cfg["RESULTS_DIR"] = parser.get("results", "spool_dir", fallback="spool/results")
+        cfg["RESULTS_INLINE_MAX_BYTES"] = parser.get("results", "inline_max_bytes", fallback=str(256 * 1024))
+        cfg["RESULTS_MAX_AGE"] = parser.get("results", "max_age", fallback="3600")
+        cfg["RESULTS_MAX_TOTAL_BYTES"] = parser.get("results", "max_total_bytes", fallback=str(512 * 1024 * 1024))
+        cfg["EXPORT_DIR"] = parser.get("results", "export_dir", fallback="spool/exports")
+        cfg["EXPORT_MAX_BYTES"] = parser.get("results", "export_max_bytes", fallback=str(64 * 1024 * 1024))
+    if parser.has_section("metrics"):
+        cfg["METRICS_TEXTFILE"] = parser.get("metrics", "textfile", fallback="")
+        cfg["METRICS_INTERVAL"] = parser.get("metrics", "interval", fallback="15")
+    if parser.has_section("jobs"):
+        cfg["JOBS_MAX_RUNNING"] = parser.get("jobs", "max_running", fallback="4")
+        cfg["JOBS_MAX_FINISHED"] = parser.get("jobs", "max_finished", fallback="50")
+        cfg["JOBS_DEFAULT_TIMEOUT"] = parser.get("jobs", "default_timeout", fallback="600")
+        cfg["JOBS_MAX_TIMEOUT"] = parser.get("jobs", "max_timeout", fallback="3600")
+        cfg["JOBS_MAX_OUTPUT_BYTES"] = parser.get("jobs", "max_output_bytes", fallback=str(8 * 1024 * 1024))
+    if parser.has_section("timeouts"):
+        cfg["TIMEOUT_ADAPTIVE"] = parser.get("timeouts", "adaptive", fallback="false")
+        cfg["TIMEOUT_PERCENTILE"] = parser.get("timeouts", "percentile", fallback="99")
+        cfg["TIMEOUT_HEADROOM"] = parser.get("timeouts", "headroom", fallback="1.5")
+        cfg["TIMEOUT_MIN_HEADROOM"] = parser.get("timeouts", "min_headroom", fallback="2")
+        cfg["TIMEOUT_MIN_SAMPLES"] = parser.get("timeouts", "min_samples", fallback="5")
+        cfg["TIMEOUT_MIN"] = parser.get("timeouts", "min_timeout", fallback="5")
+        cfg["TIMEOUT_MAX"] = parser.get("timeouts", "max_timeout", fallback="600")
+        cfg["TIMEOUT_WINDOW"] = parser.get("timeouts", "window", fallback="100")
+        cfg["TIMEOUT_STATS_FILE"] = parser.get("timeouts", "stats_file", fallback="")
+        cfg["BREAKER_FAILURES"] = parser.get("timeouts", "breaker_failures", fallback="0")
+        cfg["BREAKER_COOLDOWN"] = parser.get("timeouts", "breaker_cooldown", fallback="60")
+    if parser.has_section("targets"):
+        cfg["TARGETS"] = {k: v for k, v in parser.items("targets") if v.strip()}
+    if parser.has_section("index"):
+        cfg["INDEX_ENABLED"] = parser.get("index", "enabled", fallback="false")
+        cfg["INDEX_MAX_RESULTS"] = parser.get("index", "max_results", fallback="200")
+        cfg["INDEX_MAX_BYTES"] = parser.get("index", "max_bytes", fallback=str(64 * 1024 * 1024))
+        cfg["INDEX_MAX_RESULT_BYTES"] = parser.get("index", "max_result_bytes", fallback=str(4 * 1024 * 1024))
+    if parser.has_section("collector"):
+        cfg["COLLECTOR_ENABLED"] = parser.get("collector", "enabled", fallback="false")
+        cfg["COLLECTOR_TARGETS"] = parser.get("collector", "targets", fallback="")
+        cfg["COLLECTOR_HISTORY"] = parser.get("collector", "history", fallback="32")
+        cfg["COLLECTOR_KEYS"] = parser.get("collector", "keys", fallback="")
+    if parser.has_section("scheduler"):
+        cfg["MAX_CONCURRENT"] = parser.get("scheduler", "max_concurrent", fallback="8")
+        cfg["MAX_QUEUE"] = parser.get("scheduler", "max_queue", fallback="64")
+        cfg["TOOL_LIMITS"] = parser.get("scheduler", "tool_limits", fallback="")
+        cfg["CATEGORY_LIMITS"] = parser.get("scheduler", "category_limits", fallback="")
     return cfg
 
 
-def load_binaries(path: str = "binaries.json") -> list:
-    p = Path(path)
-    # If path is a directory, scan recursively for executables
-    if p.exists() and p.is_dir():
-        out = []
-        for f in p.rglob("*.exe"):
-            rel = str(f)
-            name = f.stem
-            low = str(f).lower()
-            if "systeminternals" in low:
-                cat = "sysinternals"
-            elif "nirsoft" in low:
-                cat = "nirsoft"
-            else:
-                cat = "other"
-            out.append({"name": name, "exe": rel, "category": cat})
-        return out
+def output_limits(cfg: dict) -> dict:
+    """head_bytes/tail_bytes for run_command from config; empty or 0 means unbounded."""
+    out = {}
+    for key, opt in (("OUTPUT_HEAD_BYTES", "head_bytes"), ("OUTPUT_TAIL_BYTES", "tail_bytes")):
+        try:
+            val = int((cfg or {}).get(key) or 0)
+        except ValueError:
+            val = 0
+        out[opt] = val or None
+    return out
 
-    # If file exists and is JSON, load it
-    if p.exists() and p.is_file():
+
+async def _execute_structured(executor: Executor, exe_path: str, argv: list, timeout: int, structured: dict,
+                              **run_opts) -> dict:
+    """Run a NirSoft tool with /sxml (or /scomma) and parse the export into records.
+
+    The `where` filter and `columns` projection are applied while the file is
+    parsed, so only matching rows are ever serialized back to the client.
+    """
+    fmt = structured.get("format", "xml")
+    spool = get_export_spool()
+    tf_path = spool.acquire(".csv" if fmt == "csv" else ".xml")
+    try:
+        # /scomma omits the header line unless asked; the parser keys rows by it
+        export = ["/scomma", tf_path, "/AddExportHeaderLine", "1"] if fmt == "csv" else ["/sxml", tf_path]
+        res = await executor.run(exe_path, export + argv, timeout=timeout, **run_opts)
         try:
-            return json.loads(p.read_text(encoding="utf-8"))
-        except Exception:
-            LOG.warning("failed to parse binaries.json; no tools registered")
-            return []
+            parsed = await asyncio.to_thread(
+                _parse_export, tf_path, fmt, structured.get("columns"),
+                structured.get("where"), int(structured.get("limit") or 0),
+            )
+        except tabular.UnknownColumn as ex:
+            return dict(res, error="invalid_query", detail=str(ex))
+        except Exception as ex:
+            # a malformed or truncated export still returns whatever the run produced
+            LOG.warning("failed to parse %s output of %s: %s", fmt, exe_path, ex)
+            res["parse_error"] = str(ex)
+            return res
+        if parsed is not None:
+            res.update(parsed)
+        return res
+    finally:
+        await spool.release(tf_path)
+
+
+def _parse_export(path: str, fmt: str, columns, where, limit: int) -> Optional[dict]:
+    # an empty export (tool failed or was killed) is not an error
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        return None
+    return tabular.parse_file(path, fmt, columns, where, limit)
+
+
+async def _execute(executor: Executor, entry: dict, exe_path: str, argv: list, args: str, timeout: int,
+                   structured: Optional[dict] = None, **run_opts) -> dict:
+    if entry.get("category") == "sysinternals":
+        argv = ["-accepteula", "-nobanner"] + argv
+        return await executor.run(exe_path, argv, timeout=timeout, **run_opts)
+
+    if entry.get("category") == "nirsoft":
+        if structured is not None:
+            return await _execute_structured(executor, exe_path, argv, timeout, structured, **run_opts)
+        # prefer text output into a temp file, then read it back
+        if "/stext" not in args and "/sxml" not in args:
+            spool = get_export_spool()
+            tf_path = spool.acquire(".txt")
+            argv = ["/stext", tf_path] + argv
+            try:
+                res = await executor.run(exe_path, argv, timeout=timeout, **run_opts)
+            except BaseException:
+                await spool.release(tf_path)
+                raise
+            body, size = await spool.read(tf_path)
+            res["stdout"] = (res.get("stdout", "") or "") + body
+            if spool.max_read_bytes and size > spool.max_read_bytes:
+                res["truncated"] = True
+                res["export_bytes"] = size
+            return res
 
-    # fallback: look for a `binaries` directory next to the script
-    fallback = Path("binaries")
-    if fallback.exists() and fallback.is_dir():
-        return load_binaries(str(fallback))
+    return await executor.run(exe_path, argv, timeout=timeout, **run_opts)
 
-    LOG.warning("binaries.json not found and no binaries directory; no tools registered")
-    return []
 
+async def run_tool_by_name(name: str, args: str, cfg: dict, priority: int = 0, on_output=None,
+                           structured: Optional[dict] = None, timeout: Optional[int] = None,
+                           spool: bool = True, index: bool = True, target: Optional[str] = None):
+    """Resolve, validate and run catalog tool `name` with the argument string `args`.
 
-async def run_tool_by_name(name: str, args: str, cfg: dict):
-    bins = load_binaries()
-    entry = next((b for b in bins if b.get("name") == name), None)
+    `timeout` overrides the tool's learned (or configured) timeout, and such runs
+    do not feed the learned timeouts or the circuit breaker. `spool=False` keeps
+    large output inline instead of writing it to the result store. Background
+    jobs use both, since they pick their own deadline and buffer output
+    themselves. `index=False` keeps the result out of the `search_results` index.
+
+    `structured` (NirSoft tools only) requests parsed records instead of raw
+    text: {"format": "xml"|"csv", "columns": [...], "where": "...", "limit": n}.
+
+    `target` runs the tool through that `[targets]` worker instead of locally.
+    Timeouts, the circuit breaker and metrics are then kept per `tool@target`.
+    """
+    catalog = get_registry((cfg or {}).get("BINARIES_PATH", "binaries.json")).catalog()
+    entry = catalog.get(name)
     if not entry:
         return {"error": "tool_not_found", "name": name}
 
@@ -87,26 +225,46 @@ async def run_tool_by_name(name: str, args: str, cfg: dict):
     exe = entry.get("exe")
     exe_path = os.path.join(base, exe) if base else exe
 
+    executor = get_executors(cfg).get(target)
+    if executor is None:
+        return {"error": "target_not_found", "target": target, "targets": get_executors(cfg).names()}
+    label = name
+    if executor.remote:
+        if entry.get("category") == "nirsoft":
+            return {"error": "target_unsupported", "target": target,
+                    "detail": "NirSoft tools write their report to a local file; run them without a target."}
+        label = f"{name}@{executor.name}"
+        # the worker resolves the catalog path against its own --root
+        exe_path = exe
+
     # Sanitize and validate args
     try:
         argv = sanitize_args(args)
     except ValueError as ex:
         return {"error": "unsafe_arguments", "detail": str(ex)}
 
-    try:
-        from sanitize import validate_args_with_schema
-        validate_args_with_schema(entry.get("name"), args)
-    except ValueError as ex:
-        return {"error": "args_schema_violation", "detail": str(ex)}
-    except Exception:
-        LOG.debug("schema validation skipped or failed for %s", entry.get("name"))
+    # one pass over the tokens: flag/positional rules, destructive gate, `--confirm` stripped
+    policy = catalog.policy(name)
+    allow_flag = cfg.get("ALLOW_DESTRUCTIVE", "0").lower() in ("1", "true", "yes")
+    decision = policy.check(argv, allow_destructive=allow_flag)
+    if decision.error == "args_schema_violation":
+        return {"error": "args_schema_violation", "detail": decision.reason}
+    argv = decision.argv
+
+    if structured is not None:
+        if entry.get("category") != "nirsoft":
+            return {"error": "structured_unsupported", "detail": "Structured output is only available for NirSoft tools."}
+        if any(t.lower() in ("/stext", "/sxml", "/scomma", "/stab", "/shtml") for t in argv):
+            return {"error": "unsafe_arguments", "detail": "Do not pass an export flag together with structured output."}
+        structured = dict(structured, columns=tabular.parse_columns(structured.get("columns")))
+        try:
+            tabular.compile_where(structured.get("where") or "")
+        except ValueError as ex:
+            return {"error": "invalid_query", "detail": str(ex)}
 
     # Safety check for destructive tools
-    DESTRUCTIVE = {"sdelete", "sdelete64", "psexec", "psexec64", "pskill", "pskill64", "psservice", "psshutdown", "format", "cipher"}
-    exe_stem = Path(exe_path).stem.lower()
-    is_destructive = any(d in exe_stem for d in DESTRUCTIVE) or name.lower() in DESTRUCTIVE
-    allow_flag = cfg.get("ALLOW_DESTRUCTIVE", "0").lower() in ("1", "true", "yes")
-    if is_destructive and not (allow_flag or "--confirm" in args or "confirm=yes" in args):
+    is_destructive = policy.destructive
+    if decision.needs_confirmation:
         try:
             if sys.stdin and sys.stdin.isatty():
                 prompt = f"Tool '{name}' appears destructive. Type 'yes' to confirm and run: "
@@ -127,57 +285,99 @@ async def run_tool_by_name(name: str, args: str, cfg: dict):
         "exe": exe_path,
         "params": args,
         "category": entry.get("category"),
+        "target": executor.name,
     })
 
-    # Execute with safety boundaries
-    try:
-        timeout = int(cfg.get("TIMEOUT", 30)) if cfg else 30
-
-        if entry.get("category") == "sysinternals":
-            argv = ["-accepteula", "-nobanner"] + argv
-            res = await run_command(exe_path, argv, timeout=timeout)
-
-        elif entry.get("category") == "nirsoft":
-            # prefer text output into a temp file, then read it back
-            if "/stext" not in args and "/sxml" not in args:
-                tf = tempfile.NamedTemporaryFile(delete=False, suffix=".txt")
-                tf_path = tf.name
-                tf.close()
-                argv = ["/stext", tf_path] + argv
-
-                res = await run_command(exe_path, argv, timeout=timeout)
-                try:
-                    with open(tf_path, "r", encoding="utf-8", errors="ignore") as f:
-                        body = f.read()
-                        res["stdout"] = (res.get("stdout", "") or "") + body
-                except Exception:
-                    pass
-                finally:
-                    try:
-                        os.unlink(tf_path)
-                    except Exception:
-                        pass
-            else:
-                res = await run_command(exe_path, argv, timeout=timeout)
+    # Execute with safety boundaries; the scheduler caps how many tools run at once
+    if entry.get("category") == "nirsoft":
+        get_export_spool(cfg)
+    # fail fast while the tool's circuit breaker is open; learned timeout otherwise
+    health = get_tool_health(cfg)
+    blocked = health.check(label)
+    if blocked is not None:
+        get_metrics(cfg).record(label, {}, blocked)
+        return blocked
+    # a caller-chosen timeout (background jobs) says nothing about the tool's usual run
+    # time, and a job ending at its own deadline is no failure: keep it out of the stats
+    learn = timeout is None
+    if learn:
+        timeout = health.timeout_for(label, entry, float(cfg.get("TIMEOUT", 30)) if cfg else 30.0)
+    called = time.perf_counter()
+    sample: dict = {}
+    run_opts = dict(output_limits(cfg), kill_grace=float(cfg.get("KILL_GRACE", 2)),
+                    metrics=sample)
 
-        else:
-            res = await run_command(exe_path, argv, timeout=timeout)
+    def _scheduled(**extra):
+        def _start():
+            sample["queue_s"] = time.perf_counter() - called
+            return _execute(executor, entry, exe_path, argv, args, timeout, structured, **run_opts, **extra)
+
+        if executor.remote:
+            # the scheduler guards this machine; a remote run only holds a pipe request
+            return _start()
+        return get_scheduler(cfg).run(name, entry.get("category"), _start, priority=priority)
 
+    async def _produce(out):
+        store = get_result_store(cfg)
+        if not (spool and store.inline_max_bytes):
+            return await _scheduled(on_output=out)
+        # stdout is written to the spool as it is read, so a spooled result is
+        # complete even when the in-memory copy was cut to head/tail
+        writer = await asyncio.to_thread(store.open_writer)
+        try:
+            res = await _scheduled(on_output=out, stdout_sink=writer)
+        except BaseException:
+            writer.discard()
+            raise
+        if writer.size > store.inline_max_bytes and writer.size == res.get("stdout_bytes"):
+            return await asyncio.to_thread(store.commit_writer, writer, label, res)
+        writer.discard()
+        if store.should_spool(res):
+            # NirSoft /stext output is read back from a file rather than streamed
+            res = await asyncio.to_thread(store.spool_result, label, res)
+        return res
+
+    cache = get_result_cache(cfg)
+    ttl = 0.0 if is_destructive else cache_ttl(entry, cfg)
+    try:
+        if cache is not None and ttl > 0:
+            # identical concurrent requests share one subprocess and its output chunks
+            options = dict(structured or {}, target=executor.name) if executor.remote else structured
+            res = await cache.get_or_run(make_key(name, argv, options), ttl, _produce, on_output=on_output)
+        else:
+            res = await _produce(on_output)
+    except SchedulerFull as ex:
+        LOG.warning("rejected %s: %s", name, ex)
+        res = {"error": "scheduler_busy", "detail": str(ex)}
+        get_metrics(cfg).record(label, {}, res)
+        return res
     except Exception as ex:
         LOG.exception("error running tool %s", name)
-        return {"error": "internal_error", "detail": str(ex)}
+        res = {"error": "internal_error", "detail": str(ex)}
+        get_metrics(cfg).record(label, {}, res)
+        return res
+    sample["total_s"] = time.perf_counter() - called
+    if learn and not res.get("cached") and "wall_s" in sample:
+        health.record(label, res, sample["wall_s"], timeout)
+    get_metrics(cfg).record(label, sample, res)
+    result_index = get_result_index(cfg) if index else None
+    if result_index is not None and not res.get("cached"):
+        result_index.submit(label, args, res)
 
     audit.info("result", extra={
         "tool": name,
         "exit_code": res.get("exit_code"),
         "timeout": res.get("timeout", False),
         "success": res.get("success", False),
+        "cached": res.get("cached", False),
+        "target": executor.name,
     })
 
     return res
 
 
 def main():
+    configure_logging()
     cfg = load_config()
     if len(sys.argv) >= 3 and sys.argv[1] == "--demo":
         name = sys.argv[2]
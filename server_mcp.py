@@ -1,10 +1,11 @@
 import os
 import sys
 import asyncio
+import contextlib
 import json
 import logging
 from pathlib import Path
-from typing import Any
+from typing import Any, Dict, Optional
 
 # Ensure FastMCP does not print banners or log to stdout. Set env vars
 # before importing fastmcp so the library sees them during import/init.
@@ -35,21 +36,87 @@ class _StdoutGuard:
 
 sys.stdout = _StdoutGuard(sys.stderr)
 
-from fastmcp import FastMCP
+from fastmcp import Context, FastMCP
+from fastmcp.tools import Tool
+from fastmcp.tools.base import ToolResult
+from pydantic import PrivateAttr
 import fastmcp as _fastmcp
+import uvicorn
 
-from server import load_config, load_binaries, run_tool_by_name
+from batch import run_batch, run_fanout
+from cache import get_result_cache
+from collector import get_collector
+from executors import get_executors
+from export_spool import get_export_spool
+from jobs import get_job_manager
+from catalog_index import CatalogIndex
+from manifest import load_index, load_manifest
+from metrics import get_metrics
+from pipeline import run_pipeline
+from registry import get_registry
+from result_index import get_result_index
+from result_store import get_result_store
+from scheduler import get_scheduler
+from server import configure_logging, load_config, run_tool_by_name
+from sessions import SessionCloseApp, SessionTracker
+from tool_health import get_tool_health
 
 LOG = logging.getLogger("mcp_server")
 
 
-def make_tool_fn(mcp: FastMCP, entry: dict, cfg: dict):
+STRUCTURED_HELP = (
+    ". Set structured=true to get parsed records instead of text; columns=\"Col A,Col B\" projects"
+    " and where=\"Col~text; Other>5\" filters rows server-side (ops: = != ~ !~ > < >= <=)."
+)
+
+
+def progress_forwarder(ctx):
+    """Return an on_output callback that relays output chunks as MCP progress.
+
+    Progress is the running count of characters sent; the chunk text travels
+    in the notification message. Clients that did not ask for progress simply
+    do not receive the notifications.
+    """
+    if ctx is None:
+        return None
+    sent = 0
+
+    async def _forward(stream: str, text: str):
+        nonlocal sent
+        sent += len(text)
+        await ctx.report_progress(sent, None, text if stream == "stdout" else f"[stderr] {text}")
+
+    return _forward
+
+
+def tool_description(entry: dict) -> str:
+    description = f"{entry.get('category')} tool: {entry.get('exe')}"
+    if entry.get("category") == "nirsoft":
+        description += STRUCTURED_HELP
+    return description
+
+
+def tool_handler(entry: dict, cfg: dict):
+    """Build the async handler that serves catalog entry `entry`."""
     name = entry.get("name")
+    stream = str(cfg.get("STREAM_OUTPUT", "true")).lower() in ("1", "true", "yes")
+
+    if entry.get("category") == "nirsoft":
+        async def _tool(args: str = "", structured: bool = False, columns: str = "", where: str = "",
+                        limit: int = 0, format: str = "xml", ctx: Context = None) -> Any:
+            opts = {"format": format, "columns": columns, "where": where, "limit": limit} if structured else None
+            try:
+                return await run_tool_by_name(name, args, cfg, on_output=progress_forwarder(ctx) if stream else None,
+                                              structured=opts)
+            except Exception as ex:
+                LOG.exception("unhandled exception in tool %s", name)
+                return {"error": "internal_error", "detail": str(ex)}
 
-    @mcp.tool(name=name, description=f"{entry.get('category')} tool: {entry.get('exe')}")
-    async def _tool(args: str = "") -> Any:
+        return _tool
+
+    async def _tool(args: str = "", ctx: Context = None) -> Any:
         try:
-            res = await run_tool_by_name(name, args, cfg)
+            res = await run_tool_by_name(name, args, cfg, on_output=progress_forwarder(ctx) if stream else None)
             return res
         except Exception as ex:
             LOG.exception("unhandled exception in tool %s", name)
@@ -58,24 +125,341 @@ def make_tool_fn(mcp: FastMCP, entry: dict, cfg: dict):
     return _tool
 
 
-def build_mcp(cfg_path: str = "config.ini", bins_path: str = "binaries.json") -> FastMCP:
-    cfg = load_config(cfg_path)
-    bins = load_binaries(bins_path)
+def make_tool_fn(mcp: FastMCP, entry: dict, cfg: dict):
+    """Eagerly register `entry` as a FastMCP function tool."""
+    return mcp.tool(name=entry.get("name"), description=tool_description(entry))(tool_handler(entry, cfg))
+
+
+# handler signatures differ only between NirSoft and everything else
+_PARAMETERS: Dict[bool, dict] = {}
+
+
+def tool_spec(entry: dict) -> dict:
+    """Everything `tools/list` needs for `entry`; this is what the manifest stores."""
+    nirsoft = entry.get("category") == "nirsoft"
+    params = _PARAMETERS.get(nirsoft)
+    if params is None:
+        params = _PARAMETERS[nirsoft] = Tool.from_function(tool_handler(entry, {}), name="spec").parameters
+    return {
+        "name": entry.get("name"),
+        "category": entry.get("category"),
+        "description": tool_description(entry),
+        "parameters": params,
+    }
+
+
+class LazyTool(Tool):
+    """A catalog tool registered from its spec; the handler is built on first call."""
+
+    _cfg: dict = PrivateAttr(default_factory=dict)
+    _category: Optional[str] = PrivateAttr(default=None)
+    _impl: Optional[Tool] = PrivateAttr(default=None)
+
+    @classmethod
+    def from_spec(cls, spec: dict, cfg: dict) -> "LazyTool":
+        tool = cls(name=spec["name"], description=spec.get("description"), parameters=spec["parameters"])
+        tool._cfg = cfg
+        tool._category = spec.get("category")
+        return tool
+
+    async def run(self, arguments: dict) -> ToolResult:
+        if self._impl is None:
+            bins_path = self._cfg.get("BINARIES_PATH", "binaries.json")
+            entry = get_registry(bins_path).get(self.name) or {"name": self.name, "category": self._category}
+            self._impl = Tool.from_function(tool_handler(entry, self._cfg), name=self.name,
+                                            description=self.description)
+        return await self._impl.run(arguments)
 
-    mcp = FastMCP(name="systeminternals-mcp", instructions="Expose Sysinternals and NirSoft utilities")
 
-    for entry in bins:
+def register_catalog_tools(mcp: FastMCP, cfg: dict, bins_path: str) -> CatalogIndex:
+    """Register `search_tools`, `describe_tool` and `run_tool` in place of one tool per entry."""
+    stream = str(cfg.get("STREAM_OUTPUT", "true")).lower() in ("1", "true", "yes")
+    index = load_index(bins_path)
+    if index is None:
+        index = CatalogIndex.build(get_registry(bins_path).entries())
+
+    @mcp.tool(name="search_tools",
+              description="Find catalog tools by name, tag, description or flag. Every query word must match "
+                          "(prefixes allowed); optional category: sysinternals|nirsoft|other.")
+    async def _search_tools(query: str, category: str = "", limit: int = 10) -> Any:
+        return {"results": index.search(query, limit=max(1, min(limit, 50)), category=category or None)}
+
+    @mcp.tool(name="describe_tool", description="Show a catalog tool's details and the arguments run_tool accepts for it")
+    async def _describe_tool(name: str) -> Any:
+        entry = get_registry(bins_path).get(name)
+        if not entry:
+            return {"error": "tool_not_found", "name": name}
+        spec = tool_spec(entry)
+        return {
+            "name": entry.get("name"),
+            "category": entry.get("category"),
+            "description": entry.get("description") or "",
+            "usage": spec["description"],
+            "tags": entry.get("tags") or [],
+            "safe_flags": entry.get("safe_flags") or [],
+            "destructive": bool(entry.get("destructive")),
+            "arguments": spec["parameters"],
+        }
+
+    @mcp.tool(name="run_tool",
+              description="Run a catalog tool by name with an argument string. NirSoft tools also accept "
+                          "structured/columns/where/limit/format (see describe_tool). `target` runs it on a "
+                          "configured remote target instead of locally.")
+    async def _run_tool(name: str, args: str = "", structured: bool = False, columns: str = "", where: str = "",
+                        limit: int = 0, format: str = "xml", target: str = "", ctx: Context = None) -> Any:
+        opts = {"format": format, "columns": columns, "where": where, "limit": limit} if structured else None
         try:
-            make_tool_fn(mcp, entry, cfg)
-            LOG.info("registered tool %s", entry.get("name"))
+            return await run_tool_by_name(name, args, cfg, on_output=progress_forwarder(ctx) if stream else None,
+                                          structured=opts, target=target or None)
         except Exception as ex:
-            LOG.exception("failed to register %s: %s", entry.get("name"), ex)
+            LOG.exception("unhandled exception in tool %s", name)
+            return {"error": "internal_error", "detail": str(ex)}
+
+    return index
+
+
+def build_mcp(cfg_path: str = "config.ini", bins_path: str = "binaries.json",
+              tracker: Optional[SessionTracker] = None) -> FastMCP:
+    cfg = load_config(cfg_path)
+    cfg["BINARIES_PATH"] = bins_path
+    # "tools": one MCP tool per catalog entry; "catalog": search/describe/run
+    # meta-tools only, which keeps tools/list small; "both": all of them
+    mode = str(cfg.get("TOOL_MODE", "tools")).lower()
+
+    collector = get_collector(cfg)
+
+    @contextlib.asynccontextmanager
+    async def _lifespan(_server):
+        # background polling runs while a client is connected (the whole run for stdio/HTTP)
+        collector.start()
+        try:
+            yield
+        finally:
+            await collector.stop()
+
+    mcp = FastMCP(name="systeminternals-mcp", instructions="Expose Sysinternals and NirSoft utilities",
+                  lifespan=_lifespan)
+    if tracker is not None:
+        mcp.add_middleware(tracker)
+
+        @mcp.resource("stats://sessions", name="session_stats", mime_type="application/json",
+                      description="Sessions with running calls, tool calls in flight and drain state")
+        def _session_stats() -> str:
+            return json.dumps(tracker.stats())
+
+    if mode in ("tools", "both"):
+        # Tool specs come from the prebuilt manifest when it matches binaries.json;
+        # otherwise they are derived from the catalog here. Either way handlers
+        # are only built when a tool is first called.
+        specs = load_manifest(bins_path)
+        if specs is None:
+            specs = [tool_spec(e) for e in get_registry(bins_path).entries()]
+        for spec in specs:
+            try:
+                mcp.add_tool(LazyTool.from_spec(spec, cfg))
+            except Exception as ex:
+                LOG.exception("failed to register %s: %s", spec.get("name"), ex)
+        LOG.info("registered %d catalog tools", len(specs))
+    if mode in ("catalog", "both"):
+        register_catalog_tools(mcp, cfg, bins_path)
+
+    @mcp.tool(name="batch",
+              description="Run several tools concurrently. items: [{tool, args, id?, timeout?, priority?, target?}]; "
+                          "NirSoft items also take structured/columns/where/limit/format as on the tool itself. "
+                          "Each finished item is also sent as a progress notification.")
+    async def _batch(items: list[dict[str, Any]], timeout: float = 0, ctx: Context = None) -> Any:
+        done = 0
+
+        async def _on_item(key: str, res: dict):
+            nonlocal done
+            done += 1
+            if ctx is not None:
+                await ctx.report_progress(done, len(items), json.dumps({"id": key, "result": res}))
+
+        return await run_batch(items, cfg, timeout=timeout or None, on_item=_on_item)
+
+    executors = get_executors(cfg)
+    if executors.names():
+        @mcp.tool(name="run_on_targets",
+                  description="Run one tool invocation on several remote targets at once; results are keyed by "
+                              "target and each target gets `timeout` seconds (0 = the tool's own timeout). "
+                              "Targets: " + ", ".join(executors.names()))
+        async def _run_on_targets(tool: str, targets: list[str], args: str = "", timeout: float = 0,
+                                  ctx: Context = None) -> Any:
+            done = 0
+
+            async def _on_item(key: str, res: dict):
+                nonlocal done
+                done += 1
+                if ctx is not None:
+                    await ctx.report_progress(done, len(targets), json.dumps({"target": key, "result": res}))
+
+            return await run_fanout(tool, args, targets, cfg, timeout=timeout or None, on_item=_on_item)
+
+        @mcp.resource("stats://targets", name="target_stats", mime_type="application/json",
+                      description="Remote targets: worker alive, restarts, requests served and in flight")
+        def _target_stats() -> str:
+            return json.dumps(executors.stats())
+
+    @mcp.tool(name="pipeline",
+              description="Chain tools server-side and return only the last stage. stages: [{tool, args, "
+                          "field|regex, filter?, group?, max_items?}]: the first stage runs once, each later "
+                          "stage runs per value extracted from the previous one, inserted at {} in its args. "
+                          "e.g. [{tool: pslist64, filter: \"Name~chrome\", field: Pid}, {tool: handle64, "
+                          "args: \"-p {}\"}]. NirSoft stages take structured/columns/where/format as on batch.")
+    async def _pipeline(stages: list[dict[str, Any]], parallel: int = 4, ctx: Context = None) -> Any:
+        async def _on_stage(index: int, summary: dict):
+            if ctx is not None:
+                await ctx.report_progress(index + 1, len(stages), json.dumps(summary))
+
+        return await run_pipeline(stages, cfg, parallel=parallel, on_stage=_on_stage)
+
+    # claims this process's export slots and clears those of dead servers
+    get_export_spool(cfg)
+    jobs = get_job_manager(cfg)
+
+    @mcp.tool(name="start_job", description="Start a long-running tool in the background and return its job id")
+    async def _start_job(tool: str, args: str = "", timeout: int = 0) -> Any:
+        return jobs.start(tool, args, timeout or None)
+
+    @mcp.tool(name="job_status", description="Status of a background job (omit job_id to list all jobs)")
+    async def _job_status(job_id: str = "") -> Any:
+        return jobs.status(job_id) if job_id else {"jobs": jobs.list()}
+
+    @mcp.tool(name="job_output", description="Read a background job's output from `offset`; pass back next_offset to continue")
+    async def _job_output(job_id: str, offset: int = 0, max_bytes: int = 65536) -> Any:
+        return jobs.output(job_id, offset, max_bytes)
+
+    @mcp.tool(name="cancel_job", description="Cancel a background job and kill its process tree")
+    async def _cancel_job(job_id: str) -> Any:
+        return await jobs.cancel(job_id)
+
+    if collector.targets:
+        @mcp.tool(name="diff_since",
+                  description="Rows added, removed and changed in a collected tool's output since time `since` "
+                              "(unix seconds; 0 = full snapshot). Pass back `as_of` as the next `since`. "
+                              "Collected tools: " + ", ".join(t.tool for t in collector.targets))
+        async def _diff_since(tool: str, since: float = 0) -> Any:
+            return collector.diff_since(tool, since)
+
+    @mcp.resource("stats://collector", name="collector_stats", mime_type="application/json",
+                  description="Collected tools, their snapshot history and last poll")
+    def _collector_stats() -> str:
+        return json.dumps(collector.stats())
+
+    @mcp.tool(name="read_result",
+              description="Read a byte range (offset/length) or line range (start_line/num_lines) of a spooled tool result")
+    async def _read_result(handle: str, offset: int = 0, length: int = 65536,
+                           start_line: int = -1, num_lines: int = 100) -> Any:
+        store = get_result_store(cfg)
+        return await asyncio.to_thread(
+            store.read_range, handle, offset, length,
+            start_line if start_line >= 0 else None, num_lines,
+        )
+
+    result_index = get_result_index(cfg)
+    if result_index is not None:
+        @mcp.tool(name="search_results",
+                  description="Search the text of recent tool results without running anything. Every term must "
+                              "be on the same line (whole words, case-insensitive); `Column:value` matches one "
+                              "column of structured results. Optional tool narrows to one tool's results.")
+        async def _search_results(query: str, tool: str = "", limit: int = 20) -> Any:
+            return await asyncio.to_thread(result_index.search, query, tool or None, max(1, min(limit, 500)))
+
+    @mcp.resource("stats://scheduler", name="scheduler_stats", mime_type="application/json",
+                  description="Queue depth, wait time and run time per tool")
+    def _scheduler_stats() -> str:
+        return json.dumps(get_scheduler(cfg).stats())
+
+    @mcp.resource("stats://cache", name="cache_stats", mime_type="application/json",
+                  description="Result cache size, hit/miss and coalescing counters")
+    def _cache_stats() -> str:
+        cache = get_result_cache(cfg)
+        return json.dumps(cache.stats() if cache is not None else {"enabled": False})
+
+    @mcp.resource("stats://timeouts", name="timeout_stats", mime_type="application/json",
+                  description="Learned timeout, run-time samples and circuit breaker state per tool")
+    def _timeout_stats() -> str:
+        return json.dumps(get_tool_health(cfg).stats())
+
+    metrics = get_metrics(cfg)
+
+    @mcp.resource("metrics://tools", name="tool_metrics", mime_type="application/json",
+                  description="Per-tool call counters and queue/spawn/run/CPU time and output size histograms")
+    def _tool_metrics() -> str:
+        return json.dumps(metrics.snapshot())
 
     return mcp
 
 
+def serve_http(mcp: FastMCP, cfg: dict, tracker: SessionTracker) -> None:
+    """Serve streamable HTTP (or SSE) until SIGTERM/SIGINT, then drain and exit.
+
+    Every client session shares this process's registry, caches and
+    scheduler. A second signal skips the drain.
+    """
+    transport = "sse" if cfg.get("TRANSPORT") == "sse" else "http"
+    app = SessionCloseApp(mcp.http_app(path=cfg.get("HTTP_PATH") or None, transport=transport), tracker)
+    config = uvicorn.Config(app, host=cfg.get("HTTP_HOST", "127.0.0.1"), port=int(cfg.get("HTTP_PORT", 8765)),
+                            log_level=str(cfg.get("LOG_LEVEL", "info")).lower(), lifespan="on",
+                            # open SSE streams never finish on their own
+                            timeout_graceful_shutdown=5)
+    server = DrainingServer(config, lambda: shutdown(tracker, cfg))
+    LOG.info("serving MCP over %s on http://%s:%s%s", transport, config.host, config.port,
+             cfg.get("HTTP_PATH") or ("/sse" if transport == "sse" else "/mcp"))
+    asyncio.run(server.serve())
+
+
+class DrainingServer(uvicorn.Server):
+    """uvicorn server whose first exit signal drains tool calls before stopping."""
+
+    def __init__(self, config: uvicorn.Config, on_shutdown):
+        super().__init__(config)
+        self.on_shutdown = on_shutdown
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._stopping = False
+
+    async def serve(self, sockets=None):
+        self._loop = asyncio.get_running_loop()
+        await super().serve(sockets)
+
+    def handle_exit(self, sig, frame):
+        if self._stopping or self._loop is None:
+            self.force_exit = self.should_exit
+            self.should_exit = True
+            return
+        self._stopping = True
+        LOG.info("received signal %s, draining", sig)
+        self._loop.call_soon_threadsafe(lambda: asyncio.ensure_future(self._drain()))
+
+    async def _drain(self):
+        try:
+            await self.on_shutdown()
+        finally:
+            self.should_exit = True
+
+
+async def shutdown(tracker: SessionTracker, cfg: dict) -> None:
+    """Stop the collector, drain running tool calls, then stop background jobs and workers."""
+    await get_collector(cfg).stop(force=True)
+    await tracker.drain(float(cfg.get("DRAIN_TIMEOUT", 30)))
+    await get_job_manager(cfg).cancel_all()
+    await get_executors(cfg).close()
+    # the stdio path leaves through os._exit, which skips atexit
+    get_tool_health(cfg).save()
+
+
 def main():
-    mcp = build_mcp()
+    # still under the stdout guard: logging.conf's console handler binds to it
+    configure_logging()
+    cfg = load_config()
+    tracker = SessionTracker()
+    mcp = build_mcp(tracker=tracker)
+    if cfg.get("TRANSPORT", "stdio") in ("http", "streamable-http", "sse"):
+        sys.stdout = _orig_stdout
+        serve_http(mcp, cfg, tracker)
+        return
+
     # Run stdio MCP server (blocking). Keep stdout pristine — FastMCP
     # will use stdout for the MCP transport. Any human-readable logs
     # should go to stderr (we already configured logging above).
@@ -85,23 +469,6 @@ def main():
     except Exception:
         pass
 
-    # Install simple signal handlers for graceful shutdown
-    import signal
-
-    def _term_handler(signum, frame):
-        LOG.info("received signal %s, exiting", signum)
-        try:
-            sys.exit(0)
-        except SystemExit:
-            raise
-
-    try:
-        signal.signal(signal.SIGINT, _term_handler)
-        signal.signal(signal.SIGTERM, _term_handler)
-    except Exception:
-        # Some platforms may not allow signal handling; ignore
-        pass
-
     async def _run_mcp(mcp_inst: FastMCP):
         # Prefer explicit stdio server + run(handshake) if available in FastMCP.
         stdio_server = getattr(_fastmcp, "stdio_server", None)
@@ -136,10 +503,54 @@ def main():
 
         raise RuntimeError("No compatible FastMCP run method available")
 
+    async def _serve_stdio():
+        loop = asyncio.get_running_loop()
+        run = asyncio.ensure_future(_run_mcp(mcp))
+        stopping = False
+
+        async def _drain_and_stop():
+            try:
+                await shutdown(tracker, cfg)
+            finally:
+                run.cancel()
+            # the stdio reader thread stays blocked on stdin, so the transport
+            # may never finish cancelling: give it a moment to flush replies, then leave
+            await asyncio.wait({run}, timeout=1.0)
+            LOG.info("mcp server stopped")
+            logging.shutdown()
+            os._exit(0)
+
+        def _term_handler(signum, frame=None):
+            # first signal drains running calls, a second one stops at once
+            nonlocal stopping
+            if stopping:
+                loop.call_soon_threadsafe(run.cancel)
+                return
+            stopping = True
+            LOG.info("received signal %s, draining", signum)
+            loop.call_soon_threadsafe(lambda: asyncio.ensure_future(_drain_and_stop()))
+
+        import signal
+
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, _term_handler, sig)
+            except (NotImplementedError, RuntimeError):
+                # Windows: no loop signal handlers
+                try:
+                    signal.signal(sig, _term_handler)
+                except Exception:
+                    pass
+        try:
+            await run
+        except asyncio.CancelledError:
+            pass
+
     try:
-        asyncio.run(_run_mcp(mcp))
+        asyncio.run(_serve_stdio())
     except KeyboardInterrupt:
-        LOG.info("mcp server stopped")
+        pass
+    LOG.info("mcp server stopped")
 
 
 if __name__ == "__main__":
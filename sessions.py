@@ -0,0 +1,163 @@
+"""In-flight tool calls per MCP session, for session cancellation and drain.
+
+With the HTTP transport one server process serves many clients, and they all
+share its registry, caches and scheduler. `SessionTracker` is a FastMCP
+middleware that runs every `tools/call` in its own task, filed under the
+caller's session id. That allows:
+
+  * `cancel_session(id)`: cancel every call of one session (the HTTP app does
+    this when a client ends its session with DELETE). Cancelling a call
+    kills the tool's process tree, as a client-side cancel does.
+  * `drain(timeout)`: refuse new calls with `server_draining`, give running
+    calls up to `timeout` seconds to finish, then cancel the rest. The
+    server runs this on SIGTERM before it stops.
+
+Calls ended this way return {"error": "cancelled", "detail": ...} rather
+than failing the whole request.
+"""
+import asyncio
+import logging
+import time
+from typing import Any, Dict, Optional, Set
+
+from fastmcp.server.middleware import Middleware
+from fastmcp.tools.base import ToolResult
+
+LOG = logging.getLogger("mcp_server")
+
+NO_SESSION = "-"
+
+
+def _session_id(context) -> str:
+    ctx = getattr(context, "fastmcp_context", None)
+    if ctx is None:
+        return NO_SESSION
+    try:
+        return ctx.session_id or NO_SESSION
+    except RuntimeError:
+        return NO_SESSION
+
+
+class SessionTracker(Middleware):
+    def __init__(self):
+        self._calls: Dict[str, Set[asyncio.Task]] = {}
+        # call task -> why we cancelled it
+        self._cancelled: Dict[asyncio.Task, str] = {}
+        # request handler tasks; they still have to send the reply after a call ends
+        self._handlers: Set[asyncio.Task] = set()
+        self.draining = False
+        self.served = 0
+
+    async def on_call_tool(self, context, call_next) -> Any:
+        if self.draining:
+            return ToolResult(structured_content={
+                "error": "server_draining", "detail": "The server is shutting down; retry the call."})
+        sid = _session_id(context)
+        handler = asyncio.current_task()
+        if handler is not None:
+            self._handlers.add(handler)
+            handler.add_done_callback(self._handlers.discard)
+        task = asyncio.ensure_future(call_next(context))
+        calls = self._calls.setdefault(sid, set())
+        calls.add(task)
+        try:
+            # cancelling the request (client cancel) also cancels `task`
+            return await task
+        except asyncio.CancelledError:
+            reason = self._cancelled.get(task)
+            if reason is None:
+                raise
+            return ToolResult(structured_content={"error": "cancelled", "detail": reason})
+        finally:
+            self.served += 1
+            self._cancelled.pop(task, None)
+            calls.discard(task)
+            if not calls and self._calls.get(sid) is calls:
+                del self._calls[sid]
+
+    def in_flight(self, session_id: Optional[str] = None) -> int:
+        if session_id is not None:
+            return len(self._calls.get(session_id, ()))
+        return sum(len(c) for c in self._calls.values())
+
+    def _cancel(self, tasks, reason: str) -> int:
+        n = 0
+        for task in list(tasks):
+            if not task.done():
+                self._cancelled[task] = reason
+                task.cancel()
+                n += 1
+        return n
+
+    def cancel_session(self, session_id: str, reason: str = "session closed") -> int:
+        """Cancel every running call of `session_id`; returns how many were cancelled."""
+        n = self._cancel(self._calls.get(session_id, ()), reason)
+        if n:
+            LOG.info("cancelled %d call(s) of session %s (%s)", n, session_id, reason)
+        return n
+
+    async def drain(self, timeout: float = 30.0) -> dict:
+        """Stop taking calls, wait up to `timeout` s for running ones, cancel the rest."""
+        self.draining = True
+        started = time.monotonic()
+        pending = {t for calls in self._calls.values() for t in calls}
+        waited = len(pending)
+        if pending:
+            LOG.info("draining %d running tool call(s) (up to %.0fs)", len(pending), timeout)
+            _done, pending = await asyncio.wait(pending, timeout=timeout)
+        cancelled = self._cancel(pending, "server shutting down")
+        if pending:
+            # give the runner a moment to kill the process trees
+            await asyncio.wait(pending, timeout=10)
+        if self._handlers:
+            # let the handlers deliver their replies
+            await asyncio.wait(set(self._handlers), timeout=5)
+        out = {"finished": waited - cancelled, "cancelled": cancelled,
+               "seconds": round(time.monotonic() - started, 3)}
+        LOG.info("drain complete: %s", out)
+        return out
+
+    def stats(self) -> dict:
+        return {
+            "draining": self.draining,
+            "in_flight": self.in_flight(),
+            "served": self.served,
+            # counts only: a session id is what lets a client end that session
+            "sessions": len(self._calls),
+        }
+
+
+class SessionCloseApp:
+    """ASGI wrapper that cancels a session's calls when the client DELETEs the session.
+
+    The calls are cancelled only once the wrapped app has accepted the DELETE
+    (a 2xx response), so a request naming a session that does not exist, or
+    that the app refuses to end, cancels nothing.
+    """
+
+    def __init__(self, app, tracker: SessionTracker, header: bytes = b"mcp-session-id"):
+        self.app = app
+        self.tracker = tracker
+        self.header = header
+
+    async def __call__(self, scope, receive, send):
+        session_id = None
+        if scope.get("type") == "http" and scope.get("method") == "DELETE":
+            for name, value in scope.get("headers") or ():
+                if name.lower() == self.header:
+                    session_id = value.decode("latin-1")
+                    break
+        if session_id is None:
+            await self.app(scope, receive, send)
+            return
+
+        async def _send(message):
+            if message.get("type") == "http.response.start" and 200 <= message.get("status", 0) < 300:
+                self.tracker.cancel_session(session_id)
+            await send(message)
+
+        await self.app(scope, receive, _send)
+
+    def __getattr__(self, name):
+        # uvicorn and tests reach for `state`, `lifespan` etc. on the wrapped app
+        return getattr(self.app, name)
@@ -0,0 +1,178 @@
+"""Stream-parse NirSoft tabular exports into records with projection and filtering.
+
+NirSoft tools write their tables with `/sxml <file>` (one element per row,
+one child element per column) or `/scomma <file>` (CSV). Rows are parsed one
+at a time and the `where` filter and `columns` projection are applied before
+a row is kept, so only matching, projected rows are ever held in memory.
+
+Column names are matched loosely: case, spaces and underscores are ignored,
+so `Process Name`, `process_name` and `ProcessName` all refer to the same
+column.
+
+`where` is a list of conditions joined by `;` or ` and `:
+    Field=value     equal (case-insensitive)
+    Field!=value    not equal
+    Field~text      contains text (case-insensitive)
+    Field!~text     does not contain text
+    Field>n, Field<n, Field>=n, Field<=n   numeric comparisons
+"""
+import csv
+import re
+import xml.etree.ElementTree as ET
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+
+Record = Dict[str, str]
+
+
+class UnknownColumn(ValueError):
+    """A `where` condition names a column the export does not have."""
+
+_COND_RE = re.compile(r"^\s*(?P<field>[^=!~<>]+?)\s*(?P<op>!=|!~|>=|<=|=|~|>|<)\s*(?P<value>.*?)\s*$")
+_SPLIT_RE = re.compile(r"\s*;\s*|\s+and\s+", re.IGNORECASE)
+
+
+def norm(name: str) -> str:
+    return re.sub(r"[^0-9a-z]", "", name.lower())
+
+
+def _number(v: str) -> Optional[float]:
+    try:
+        return float(v.replace(",", ""))
+    except (AttributeError, ValueError):
+        return None
+
+
+def _condition(field: str, op: str, value: str) -> Callable[[Dict[str, str]], bool]:
+    key = norm(field)
+    low = value.lower()
+    if op in (">", "<", ">=", "<="):
+        target = _number(value)
+        if target is None:
+            raise ValueError(f"numeric comparison needs a number: {field}{op}{value}")
+        cmp = {">": float.__gt__, "<": float.__lt__, ">=": float.__ge__, "<=": float.__le__}[op]
+
+        def numeric(row):
+            n = _number(row.get(key, ""))
+            return n is not None and cmp(n, target)
+        return numeric
+    if op == "=":
+        return lambda row: row.get(key, "").lower() == low
+    if op == "!=":
+        return lambda row: row.get(key, "").lower() != low
+    if op == "~":
+        return lambda row: low in row.get(key, "").lower()
+    return lambda row: low not in row.get(key, "").lower()
+
+
+def _conditions(expr: str) -> Iterator[re.Match]:
+    for part in _SPLIT_RE.split(expr.strip()):
+        if not part:
+            continue
+        m = _COND_RE.match(part)
+        if not m:
+            raise ValueError(f"invalid where condition: {part!r}")
+        yield m
+
+
+def where_fields(expr: str) -> List[str]:
+    """Column names referenced by a `where` expression, as written."""
+    if not expr or not expr.strip():
+        return []
+    return [m.group("field") for m in _conditions(expr)]
+
+
+def compile_where(expr: str) -> Optional[Callable[[Dict[str, str]], bool]]:
+    """Compile a `where` expression into a predicate over normalized rows.
+
+    Raises ValueError on syntax errors. Returns None for an empty expression.
+    """
+    if not expr or not expr.strip():
+        return None
+    conds = [_condition(m.group("field"), m.group("op"), m.group("value")) for m in _conditions(expr)]
+    return lambda row: all(c(row) for c in conds)
+
+
+def iter_xml_rows(path: str) -> Iterator[Record]:
+    """Yield rows from a NirSoft `/sxml` export without building the whole tree."""
+    depth = 0
+    root = None
+    row: Optional[Record] = None
+    for event, el in ET.iterparse(path, events=("start", "end")):
+        if event == "start":
+            depth += 1
+            if depth == 1:
+                root = el
+            elif depth == 2:
+                row = {}
+            continue
+        if depth == 3 and row is not None:
+            row[el.tag.replace("_", " ")] = (el.text or "").strip()
+        elif depth == 2:
+            if row is not None:
+                yield row
+            row = None
+            # drop finished rows so memory stays flat on large exports
+            root.clear()
+        depth -= 1
+
+
+def iter_csv_rows(path: str, encoding: str = "utf-8") -> Iterator[Record]:
+    """Yield rows from a `/scomma` export.
+
+    The first line is taken as the header, so the tool must be run with
+    `/AddExportHeaderLine 1` (NirSoft omits the header by default).
+    """
+    with open(path, "r", encoding=encoding, errors="ignore", newline="") as fh:
+        for row in csv.DictReader(fh):
+            yield {k: (v or "") for k, v in row.items() if k is not None}
+
+
+def select(rows: Iterable[Record], columns: Optional[List[str]] = None,
+           where: Optional[str] = None, limit: int = 0) -> dict:
+    """Apply the `where` filter and `columns` projection while consuming `rows`.
+
+    Raises UnknownColumn when `where` names a column missing from the first row;
+    otherwise such a filter would silently match nothing (or everything).
+    """
+    pred = compile_where(where or "")
+    filter_fields = where_fields(where or "")
+    wanted = [c for c in (columns or []) if c.strip()]
+    wanted_keys = [norm(c) for c in wanted]
+    out: List[Record] = []
+    names: List[str] = []
+    scanned = 0
+    for row in rows:
+        scanned += 1
+        keyed = {norm(k): v for k, v in row.items()}
+        if scanned == 1:
+            missing = [f for f in filter_fields if norm(f) not in keyed]
+            if missing:
+                raise UnknownColumn(f"unknown column(s) in where: {', '.join(missing)}; "
+                                    f"available: {', '.join(row)}")
+        if pred is not None and not pred(keyed):
+            continue
+        if not names:
+            # report the tool's own column names, in projection order if given
+            by_key = {norm(k): k for k in row}
+            names = [by_key.get(k, c) for k, c in zip(wanted_keys, wanted)] if wanted else list(row)
+        if wanted:
+            out.append({name: keyed.get(k, "") for name, k in zip(names, wanted_keys)})
+        else:
+            out.append(row)
+        if limit and len(out) >= limit:
+            break
+    return {"columns": names, "records": out, "record_count": len(out), "rows_scanned": scanned}
+
+
+def parse_file(path: str, fmt: str = "xml", columns: Optional[List[str]] = None,
+               where: Optional[str] = None, limit: int = 0) -> dict:
+    rows = iter_csv_rows(path) if fmt == "csv" else iter_xml_rows(path)
+    return select(rows, columns, where, limit)
+
+
+def parse_columns(spec) -> List[str]:
+    if not spec:
+        return []
+    if isinstance(spec, str):
+        return [c.strip() for c in spec.split(",") if c.strip()]
+    return [str(c) for c in spec]
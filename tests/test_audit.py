@@ -0,0 +1,41 @@
+import json
+import logging
+
+from audit import AuditQueueHandler
+
+
+def make_logger(name, handler):
+    log = logging.getLogger(name)
+    log.handlers[:] = [handler]
+    log.setLevel(logging.INFO)
+    log.propagate = False
+    return log
+
+
+def test_records_keep_extras_as_jsonl(tmp_path):
+    path = tmp_path / "audit.log"
+    handler = AuditQueueHandler(str(path))
+    log = make_logger("audit-test-extras", handler)
+    log.info("invoke", extra={"tool": "pslist64", "params": "-t", "category": "sysinternals"})
+    log.info("result", extra={"tool": "pslist64", "exit_code": 0, "timeout": False})
+    handler.close()
+
+    lines = [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+    assert [r["event"] for r in lines] == ["invoke", "result"]
+    assert lines[0]["params"] == "-t" and lines[0]["logger"] == "audit-test-extras"
+    assert lines[1]["exit_code"] == 0 and lines[1]["timeout"] is False
+
+
+def test_rotates_by_size(tmp_path):
+    path = tmp_path / "audit.log"
+    handler = AuditQueueHandler(str(path), max_bytes=2000, backup_count=3, batch_size=8)
+    log = make_logger("audit-test-rotate", handler)
+    for i in range(100):
+        log.info("result", extra={"tool": "t", "n": i})
+    handler.close()
+
+    files = sorted(tmp_path.glob("audit.log*"))
+    assert len(files) == 4
+    assert all(f.stat().st_size <= 2000 for f in files)
+    newest = [json.loads(line)["n"] for line in path.read_text(encoding="utf-8").splitlines()]
+    assert newest[-1] == 99
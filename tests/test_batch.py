@@ -0,0 +1,64 @@
+import asyncio
+import json
+import sys
+
+from batch import run_batch
+
+
+def make_catalog(tmp_path):
+    p = tmp_path / "binaries.json"
+    p.write_text(json.dumps([{"name": "py", "exe": sys.executable, "category": "other"}]), encoding="utf-8")
+    return {"BINARIES_PATH": str(p), "TIMEOUT": "10"}
+
+
+def test_results_arrive_in_finish_order(tmp_path):
+    cfg = make_catalog(tmp_path)
+    seen = []
+    items = [
+        {"id": "slow", "tool": "py", "args": "-c \"__import__('time').sleep(0.5) or print('slow')\""},
+        {"id": "fast", "tool": "py", "args": "-c \"print('fast')\""},
+        {"id": "missing", "tool": "nope"},
+    ]
+    res = asyncio.run(run_batch(items, cfg, on_item=lambda k, r: seen.append(k)))
+    assert seen[-1] == "slow"
+    assert res["completed"] == seen
+    assert res["results"]["fast"]["stdout"].strip() == "fast"
+    assert res["results"]["missing"]["error"] == "tool_not_found"
+
+
+def test_per_item_timeout_does_not_fail_batch(tmp_path):
+    cfg = make_catalog(tmp_path)
+    items = [
+        {"id": "hang", "tool": "py", "args": "-c \"__import__('time').sleep(30)\"", "timeout": 0.5},
+        {"id": "ok", "tool": "py", "args": "-c \"print(1)\""},
+    ]
+    res = asyncio.run(run_batch(items, cfg))
+    assert res["results"]["hang"]["error"] == "item_timeout"
+    assert res["results"]["ok"]["success"] is True
+
+
+def test_rejects_invalid_batches():
+    assert asyncio.run(run_batch([], {}))["error"] == "invalid_batch"
+    res = asyncio.run(run_batch(["x", {"args": ""}], {}))
+    assert all(r["error"] == "invalid_item" for r in res["results"].values())
+
+
+def test_bad_item_numbers_fail_only_that_item(tmp_path):
+    cfg = make_catalog(tmp_path)
+    items = [
+        {"id": "bad-priority", "tool": "py", "args": "-V", "priority": "high"},
+        {"id": "bad-timeout", "tool": "py", "args": "-V", "timeout": "soon"},
+        {"id": "ok", "tool": "py", "args": "-c \"print(1)\""},
+    ]
+    res = asyncio.run(run_batch(items, cfg))
+    assert res["results"]["bad-priority"]["error"] == "invalid_item"
+    assert res["results"]["bad-timeout"]["error"] == "invalid_item"
+    assert res["results"]["ok"]["success"] is True
+
+
+def test_structured_uses_per_tool_form(tmp_path):
+    cfg = make_catalog(tmp_path)
+    items = [{"id": "s", "tool": "py", "args": "-V", "structured": True, "columns": "Name"}]
+    res = asyncio.run(run_batch(items, cfg))
+    # py is not a NirSoft tool, so the options reach run_tool_by_name and are refused there
+    assert res["results"]["s"]["error"] == "structured_unsupported"
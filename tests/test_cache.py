@@ -0,0 +1,120 @@
+import asyncio
+
+from cache import ResultCache, cache_ttl, make_key
+
+
+def ok(text):
+    return {"exit_code": 0, "stdout": text, "stderr": "", "timeout": False, "success": True}
+
+
+def test_hit_until_ttl_expires(monkeypatch):
+    import cache as cache_mod
+
+    now = [1000.0]
+    monkeypatch.setattr(cache_mod.time, "monotonic", lambda: now[0])
+    c = ResultCache()
+    calls = []
+
+    async def run(on_output):
+        calls.append(1)
+        return ok("snapshot")
+
+    key = make_key("pslist64", ["-t"])
+    assert asyncio.run(c.get_or_run(key, 5, run))["stdout"] == "snapshot"
+    res = asyncio.run(c.get_or_run(key, 5, run))
+    assert res["cached"] is True and len(calls) == 1
+    now[0] += 6
+    asyncio.run(c.get_or_run(key, 5, run))
+    assert len(calls) == 2
+
+
+def test_failures_are_not_cached():
+    c = ResultCache()
+    asyncio.run(c.get_or_run(make_key("t", []), 5, lambda _out: asyncio.sleep(0, {"success": False, "timeout": True})))
+    assert c.stats()["entries"] == 0
+
+
+def test_concurrent_identical_requests_share_one_run():
+    async def scenario():
+        c = ResultCache()
+        calls = []
+
+        async def run(on_output):
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return ok("x")
+
+        key = make_key("cports", [])
+        results = await asyncio.gather(*(c.get_or_run(key, 5, run) for _ in range(5)))
+        assert len(calls) == 1
+        assert all(r["stdout"] == "x" for r in results)
+        assert c.stats()["coalesced"] == 4
+
+    asyncio.run(scenario())
+
+
+def test_streaming_callers_share_one_run_and_its_chunks():
+    async def scenario():
+        c = ResultCache()
+        calls = []
+        first, second = [], []
+
+        async def run(on_output):
+            calls.append(1)
+            await on_output("stdout", "a")
+            await asyncio.sleep(0.05)
+            await on_output("stdout", "b")
+            return ok("ab")
+
+        key = make_key("cports", [])
+        shared = asyncio.ensure_future(c.get_or_run(key, 5, run, on_output=lambda s, t: first.append(t)))
+        await asyncio.sleep(0.01)
+        joined = await c.get_or_run(key, 5, run, on_output=lambda s, t: second.append(t))
+        assert (await shared)["stdout"] == joined["stdout"] == "ab"
+        assert len(calls) == 1 and c.stats()["coalesced"] == 1
+        # a late joiner gets the chunks from when it joined
+        assert first == ["a", "b"] and second == ["b"]
+
+    asyncio.run(scenario())
+
+
+def test_lru_eviction_by_bytes():
+    c = ResultCache(max_bytes=3000)
+    for i in range(5):
+        c.put(make_key("t", [str(i)]), ok("x" * 700), 60)
+    assert c.bytes <= 3000
+    assert c.get(make_key("t", ["0"])) is None
+    assert c.get(make_key("t", ["4"])) is not None
+    assert c.stats()["evictions"] >= 1
+
+
+def test_destructive_tools_never_cached():
+    assert cache_ttl({"name": "sdelete", "destructive": True, "cache_ttl": 60}, {}) == 0
+    assert cache_ttl({"name": "pslist64", "cache_ttl": 5}, {}) == 5
+    assert cache_ttl({"name": "x"}, {"CACHE_DEFAULT_TTL": "2"}) == 2
+
+
+def test_concurrent_streamed_tool_calls_spawn_one_process(tmp_path, monkeypatch):
+    import json
+    import sys
+
+    import cache as cache_mod
+    from server import run_tool_by_name
+
+    monkeypatch.setattr(cache_mod, "_CACHE", None)
+    bins = tmp_path / "binaries.json"
+    bins.write_text(json.dumps([{"name": "py", "exe": sys.executable, "category": "other", "cache_ttl": 30}]),
+                    encoding="utf-8")
+    cfg = {"BINARIES_PATH": str(bins), "CACHE_ENABLED": "true"}
+    marker = (tmp_path / "spawned").as_posix()
+    args = f"-c \"open(__import__('sys').argv[1], 'a').write('x') and __import__('time').sleep(0.3) or print('done')\" {marker}"
+
+    async def scenario():
+        chunks = [[], []]
+        return chunks, await asyncio.gather(
+            *(run_tool_by_name("py", args, cfg, on_output=lambda s, t, i=i: chunks[i].append(t)) for i in (0, 1)))
+
+    chunks, results = asyncio.run(scenario())
+    assert all(r["stdout"].strip() == "done" for r in results)
+    assert (tmp_path / "spawned").read_text() == "x"
+    assert "done" in "".join(chunks[0]) and "done" in "".join(chunks[1])
@@ -0,0 +1,35 @@
+import json
+
+from catalog_index import CatalogIndex, tokenize
+
+ENTRIES = [
+    {"name": "OpenedFilesView", "category": "nirsoft", "description": "List files opened by processes",
+     "tags": ["nirsoft", "files"]},
+    {"name": "procexp64", "category": "sysinternals", "description": "Process Explorer", "tags": ["process"]},
+    {"name": "Procmon", "category": "sysinternals", "description": "Process Monitor", "tags": ["process", "trace"]},
+    {"name": "tcpvcon", "category": "sysinternals", "description": "TCP endpoints", "tags": ["network"],
+     "safe_flags": ["-a", "-c"]},
+]
+
+
+def test_tokenize_splits_camel_case():
+    assert tokenize("OpenedFilesView") == ["openedfilesview", "opened", "files", "view"]
+    assert tokenize("procexp64 /stext") == ["procexp64", "procexp", "64", "stext"]
+
+
+def test_search_ranks_name_over_description_and_requires_all_words():
+    ix = CatalogIndex.build(ENTRIES)
+    names = [r["name"] for r in ix.search("proc")]
+    assert set(names) == {"procexp64", "Procmon", "OpenedFilesView"}
+    assert names[-1] == "OpenedFilesView"
+    assert [r["name"] for r in ix.search("process trace")] == ["Procmon"]
+    assert ix.search("files", category="sysinternals") == []
+    assert [r["name"] for r in ix.search("network c")] == ["tcpvcon"]
+    assert ix.search("nothing-like-this") == []
+
+
+def test_round_trips_through_json():
+    ix = CatalogIndex.build(ENTRIES)
+    again = CatalogIndex.from_dict(json.loads(json.dumps(ix.to_dict())))
+    assert again.search("opened") == ix.search("opened")
+    assert len(again) == 4
@@ -0,0 +1,97 @@
+import asyncio
+import json
+import sys
+
+from collector import Collector, History, Target, parse_targets, parse_text_table
+
+PSLIST = """
+Process information for HOST:
+
+Name                Pid Pri Thd  Hnd   Priv        CPU Time    Elapsed Time
+Idle                  0   0   4    0     60     9:41:02.109     3:02:11.470
+System                4   8 180 3001    204     0:02:11.343     3:02:11.470
+Secure System       104   8   0    0    184     0:00:00.000     3:02:13.020
+"""
+
+
+def test_parse_text_table_keeps_spaces_in_the_first_column():
+    cols = ["Name", "Pid", "Pri", "Thd", "Hnd", "Priv", "CPU Time", "Elapsed Time"]
+    rows = parse_text_table(PSLIST, cols)
+    assert [r["Name"] for r in rows] == ["Idle", "System", "Secure System"]
+    assert rows[2]["Pid"] == "104" and rows[1]["CPU Time"] == "0:02:11.343"
+
+
+def test_diff_reports_added_removed_and_changed_rows():
+    hist = History(Target("cports", 30), size=4)
+    a = {"Process ID": "1", "Protocol": "TCP", "Local Address": "0.0.0.0", "Local Port": "80",
+         "Remote Address": "", "Remote Port": "", "State": "Listening"}
+    b = dict(a, **{"Process ID": "2", "Local Port": "443"})
+    hist.add([a, b], taken=100.0, duration_s=0.1)
+    c = dict(a, **{"Process ID": "3", "Local Port": "22"})
+    hist.add([dict(a), dict(b, State="Closed"), c], taken=110.0, duration_s=0.1)
+    # an unchanged row is the same object in both snapshots
+    assert hist.snapshots[1].rows["1|TCP|0.0.0.0|80||"] is a
+
+    d = hist.diff_since(100.0)
+    assert d["as_of"] == 110.0 and not d["full"]
+    assert [r["Process ID"] for r in d["added"]] == ["3"]
+    assert d["changed"][0]["fields"] == {"State": ["Listening", "Closed"]}
+    assert d["counts"] == {"added": 1, "removed": 0, "changed": 1, "unchanged": 1, "total": 3}
+
+    hist.add([c], taken=120.0, duration_s=0.1)
+    d = hist.diff_since(110.0)
+    assert sorted(r["Process ID"] for r in d["removed"]) == ["1", "2"]
+    assert hist.diff_since(d["as_of"])["counts"]["unchanged"] == 1
+
+
+def test_volatile_columns_and_expired_history():
+    hist = History(Target("pslist64", 15), size=2)
+    row = {"Name": "x", "Pid": "7", "Priv": "10", "CPU Time": "0:00:01.000"}
+    hist.add([row], taken=1.0, duration_s=0)
+    hist.add([dict(row, **{"CPU Time": "0:00:02.000"})], taken=2.0, duration_s=0)
+    assert hist.diff_since(1.0)["counts"]["changed"] == 0
+    hist.add([dict(row, Priv="20")], taken=3.0, duration_s=0)
+    # the snapshot at t=1 has been dropped: the whole newest snapshot comes back
+    d = hist.diff_since(1.5)
+    assert d["full"] and d["history_truncated"] and len(d["added"]) == 1
+    assert hist.diff_since(2.0)["changed"][0]["fields"] == {"Priv": ["10", "20"]}
+
+
+def test_poll_runs_the_tool_and_diffs(tmp_path):
+    table = tmp_path / "table.txt"
+    script = tmp_path / "show.py"
+    script.write_text("import sys; print(open(sys.argv[1]).read())", encoding="utf-8")
+    bins = tmp_path / "binaries.json"
+    bins.write_text(json.dumps([{"name": "py", "exe": sys.executable, "category": "other"}]), encoding="utf-8")
+    target = Target("py", 5, args=f"{script} {table}", keys=["Pid"], text_columns=["Name", "Pid"])
+    coll = Collector({"BINARIES_PATH": str(bins)}, [target])
+
+    async def scenario():
+        table.write_text("Name Pid\nfoo 1\nbar 2\n", encoding="utf-8")
+        first = await coll.poll("py")
+        assert first is not None and set(first.rows) == {"1", "2"}
+        table.write_text("Name Pid\nfoo 1\nbaz 3\n", encoding="utf-8")
+        await coll.poll("py")
+        d = coll.diff_since("py", first.taken)
+        assert [r["Name"] for r in d["added"]] == ["baz"]
+        assert [r["Name"] for r in d["removed"]] == ["bar"]
+
+    asyncio.run(scenario())
+    assert coll.diff_since("nope")["error"] == "not_collected"
+    assert coll.stats()["targets"]["py"]["polls"] == 2
+
+
+def test_parse_targets_skips_unusable_tools(tmp_path):
+    bins = tmp_path / "binaries.json"
+    bins.write_text(json.dumps([
+        {"name": "pslist64", "exe": "pslist64.exe", "category": "sysinternals"},
+        {"name": "cports", "exe": "cports.exe", "category": "nirsoft"},
+        {"name": "handle", "exe": "handle.exe", "category": "sysinternals"},
+        {"name": "pskill", "exe": "pskill.exe", "category": "sysinternals"},
+    ]), encoding="utf-8")
+    cfg = {"BINARIES_PATH": str(bins), "COLLECTOR_TARGETS": "pslist64:15, cports, handle:5, pskill:5, nope:5",
+           "COLLECTOR_KEYS": "cports=Process ID+Local Port"}
+    targets = {t.tool: t for t in parse_targets(cfg)}
+    assert set(targets) == {"pslist64", "cports"}
+    assert targets["cports"].structured and targets["cports"].keys == ["Process ID", "Local Port"]
+    assert targets["cports"].interval == 60 and targets["pslist64"].keys == ["Pid"]
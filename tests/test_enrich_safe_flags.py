@@ -0,0 +1,66 @@
+import json
+import os
+import stat
+import sys
+
+import enrich_safe_flags
+
+
+def make_tool(path, help_text):
+    path.write_text(
+        f"#!{sys.executable}\n"
+        "import pathlib, sys\n"
+        "log = pathlib.Path(__file__).with_suffix('.calls')\n"
+        "log.write_text(log.read_text() + 'x' if log.exists() else 'x')\n"
+        f"print({help_text!r})\n",
+        encoding="utf-8",
+    )
+    path.chmod(path.stat().st_mode | stat.S_IXUSR)
+    return path
+
+
+def calls(path):
+    log = path.with_suffix(".calls")
+    return len(log.read_text()) if log.exists() else 0
+
+
+def test_probes_in_parallel_and_reprobes_only_changed_binaries(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    a = make_tool(tmp_path / "a.tool", "usage: a [-v] [--all] shows things")
+    b = make_tool(tmp_path / "b.tool", "usage: b [/x] [/y] shows other things")
+    d = make_tool(tmp_path / "d.tool", "usage: d [-f] wipes the disk")
+    (tmp_path / "binaries.json").write_text(json.dumps([
+        {"name": "a", "exe": str(a)},
+        {"name": "b", "exe": str(b), "cache_ttl": 30},
+        {"name": "d", "exe": str(d), "destructive": True},
+        {"name": "gone", "exe": str(tmp_path / "gone.tool")},
+    ]), encoding="utf-8")
+    monkeypatch.delenv("PROBE_DESTRUCTIVE", raising=False)
+
+    report = enrich_safe_flags.main(["--workers", "2", "--report", "report.json"])
+    assert sorted(r["name"] for r in report) == ["a", "b"]
+    assert not any(r["cached"] for r in report)
+    entries = {e["name"]: e for e in json.loads((tmp_path / "binaries.json").read_text(encoding="utf-8"))}
+    assert entries["a"]["safe_flags"] == ["--all", "-v"]
+    assert entries["b"]["safe_flags"] == ["/x", "/y"]
+    assert entries["b"]["cache_ttl"] == 30
+    assert "safe_flags" not in entries["d"] and calls(d) == 0
+    schema = json.loads((tmp_path / "schemas" / "a.schema.json").read_text(encoding="utf-8"))
+    assert schema["properties"]["flags"]["items"]["enum"] == ["--all", "-v"]
+    assert json.loads((tmp_path / "report.json").read_text(encoding="utf-8"))["binaries"][0]["probe_s"] >= 0
+    assert not list(tmp_path.glob("**/*.tmp"))
+
+    # unchanged binaries come from the cache; an edited one is probed again
+    probed_a = calls(a)
+    make_tool(b, "usage: b [/x] [/z] changed")
+    os.utime(b, ns=(0, 0))
+    report = enrich_safe_flags.main([])
+    assert {r["name"]: r["cached"] for r in report} == {"a": True, "b": False}
+    assert calls(a) == probed_a
+    entries = {e["name"]: e for e in json.loads((tmp_path / "binaries.json").read_text(encoding="utf-8"))}
+    assert entries["b"]["safe_flags"] == ["/x", "/z"]
+
+    # a copy of a known binary is recognised by its content hash
+    copy = tmp_path / "c.tool"
+    copy.write_bytes(a.read_bytes())
+    assert enrich_safe_flags.ProbeCache().get(enrich_safe_flags.sha256_file(copy))["flags"] == ["--all", "-v"]
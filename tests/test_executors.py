@@ -0,0 +1,93 @@
+import asyncio
+import json
+import sys
+from pathlib import Path
+
+import executors
+from batch import run_fanout
+from executors import Executors, WorkerExecutor
+from server import run_tool_by_name
+
+WORKER = [sys.executable, str(Path(__file__).resolve().parent.parent / "worker.py")]
+
+
+def test_worker_is_reused_across_concurrent_runs():
+    async def main():
+        w = WorkerExecutor("stand-in", WORKER)
+        try:
+            chunks = []
+            runs = [w.run(sys.executable, ["-c", f"print({i})"], timeout=10) for i in range(4)]
+            runs.append(w.run(sys.executable, ["-c", "print('streamed')"], timeout=10,
+                              on_output=lambda stream, text: chunks.append(text)))
+            results = await asyncio.gather(*runs)
+            assert [r["stdout"].strip() for r in results] == ["0", "1", "2", "3", "streamed"]
+            assert "streamed" in "".join(chunks)
+            slow = await w.run(sys.executable, ["-c", "__import__('time').sleep(30)"], timeout=0.5)
+            assert slow["timeout"] is True
+            assert w.stats()["starts"] == 1 and w.stats()["requests"] == 6
+        finally:
+            await w.close()
+
+    asyncio.run(main())
+
+
+
+def test_runs_beyond_the_worker_slots_wait_before_their_deadline_starts():
+    async def main():
+        w = WorkerExecutor("stand-in", WORKER + ["--max-concurrent", "2"], reply_slack=0)
+        try:
+            # six 0.6 s runs through two slots take ~1.8 s, past any one run's 1.6 s deadline
+            runs = [w.run(sys.executable, ["-c", "__import__('time').sleep(0.6)"], timeout=1.5, kill_grace=0.1)
+                    for _ in range(6)]
+            results = await asyncio.gather(*runs)
+            assert [r.get("error") for r in results] == [None] * 6
+            assert all(r["success"] for r in results)
+            assert w.stats()["slots"] == 2 and w.stats()["queued"] == 0
+        finally:
+            await w.close()
+
+    asyncio.run(main())
+
+def test_lost_worker_fails_in_flight_runs_and_restarts():
+    async def main():
+        w = WorkerExecutor("stand-in", WORKER)
+        try:
+            pending = asyncio.ensure_future(w.run(sys.executable, ["-c", "__import__('time').sleep(5)"], timeout=20))
+            while not (w.requests and w.stats()["in_flight"]):
+                await asyncio.sleep(0.05)
+            w._proc.kill()
+            assert (await pending)["error"] == "worker_lost"
+            again = await w.run(sys.executable, ["-c", "print('back')"], timeout=10)
+            assert again["stdout"].strip() == "back" and w.starts == 2
+        finally:
+            await w.close()
+
+    asyncio.run(main())
+
+
+def test_run_tool_by_name_and_fanout_dispatch_to_targets(tmp_path, monkeypatch):
+    dead = [sys.executable, "-c", "__import__('time').sleep(30)"]
+    pool = Executors()
+    pool._targets = {"a": WorkerExecutor("a", WORKER), "b": WorkerExecutor("b", WORKER),
+                     "dead": WorkerExecutor("dead", dead)}
+    monkeypatch.setattr(executors, "_EXECUTORS", pool)
+    bins = tmp_path / "binaries.json"
+    bins.write_text(json.dumps([{"name": "py", "exe": sys.executable, "category": "other"},
+                                {"name": "cports", "exe": "cports.exe", "category": "nirsoft"}]), encoding="utf-8")
+    cfg = {"BINARIES_PATH": str(bins)}
+
+    async def main():
+        try:
+            res = await run_tool_by_name("py", "-c \"print('remote')\"", cfg, target="a")
+            assert res["stdout"].strip() == "remote"
+            assert (await run_tool_by_name("py", "-V", cfg, target="nope"))["error"] == "target_not_found"
+            assert (await run_tool_by_name("cports", "", cfg, target="a"))["error"] == "target_unsupported"
+            out = await run_fanout("py", "-c \"print('hi')\"", ["a", "b", "dead", "a"], cfg, timeout=3)
+            assert sorted(out["results"]) == ["a", "b", "dead"]
+            assert out["results"]["a"]["stdout"].strip() == "hi"
+            assert out["results"]["dead"]["error"] == "item_timeout"
+            assert pool.stats()["a"]["starts"] == 1
+        finally:
+            await pool.close()
+
+    asyncio.run(main())
@@ -0,0 +1,90 @@
+import asyncio
+import json
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+import export_spool
+from export_spool import ExportSpool
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "benchmarks"))
+
+import fake_tools  # noqa: E402
+
+
+def test_slots_are_reused_and_reads_are_capped(tmp_path):
+    spool = ExportSpool(str(tmp_path), slots=1, max_read_bytes=10)
+    try:
+        path = spool.acquire()
+        assert os.path.exists(path)  # preallocated
+        Path(path).write_bytes(b"line one\r\nline two\r\n")
+        overflow = spool.acquire()
+        assert overflow != path and spool.stats()["overflow"] == 1
+
+        text, size = asyncio.run(spool.read(path))
+        assert text == "line one\n" and size == 20
+        assert os.path.getsize(path) == 0
+        assert spool.acquire() == path
+
+        Path(overflow).write_text("x", encoding="utf-8")
+        asyncio.run(spool.release(overflow))
+        assert not os.path.exists(overflow)
+        asyncio.run(spool.release(path))
+        assert spool.stats()["busy"] == 0
+    finally:
+        spool.close()
+    assert not spool.dir.exists()
+
+
+
+def test_export_paths_are_absolute_for_a_relative_root(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    spool = ExportSpool("spool/exports", slots=1)
+    try:
+        for path in (spool.acquire(".txt"), spool.acquire(".xml")):
+            assert os.path.isabs(path) and Path(path).is_relative_to(tmp_path.resolve())
+    finally:
+        spool.close()
+
+def test_startup_removes_directories_of_dead_servers(tmp_path):
+    dead = tmp_path / "p12345-deadbeef"
+    dead.mkdir()
+    (dead / "lock").write_bytes(b"")
+    (dead / "slot-000.txt").write_text("left behind", encoding="utf-8")
+    (tmp_path / "unrelated.txt").write_text("kept", encoding="utf-8")
+
+    alive = ExportSpool(str(tmp_path), slots=1)
+    other = ExportSpool(str(tmp_path), slots=1)
+    try:
+        assert not dead.exists()
+        assert alive.dir.exists() and other.dir.exists()
+        assert (tmp_path / "unrelated.txt").exists()
+    finally:
+        alive.close()
+        other.close()
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="fake tools rely on shebang scripts")
+def test_nirsoft_runs_read_back_through_the_pool(tmp_path, monkeypatch):
+    from server import run_tool_by_name
+
+    monkeypatch.setattr(export_spool, "_SPOOL", ExportSpool(str(tmp_path / "exports"), slots=2))
+    paths = fake_tools.build(tmp_path / "bin")
+    bins = tmp_path / "binaries.json"
+    bins.write_text(json.dumps(fake_tools.catalog(paths)), encoding="utf-8")
+    cfg = {"BINARIES_PATH": str(bins), "CACHE_ENABLED": "false", "RESULTS_INLINE_MAX_BYTES": "0"}
+
+    async def go():
+        return await asyncio.gather(*(run_tool_by_name("fake_stext", "4", cfg) for _ in range(4)))
+
+    results = asyncio.run(go())
+    assert all(r["success"] and "Process Name : proc0.exe" in r["stdout"] for r in results)
+    spool = export_spool._SPOOL
+    assert spool.stats()["busy"] == 0
+    # only the preallocated slots (and the lock) are left, all empty
+    left = sorted(p.name for p in spool.dir.iterdir())
+    assert left == ["lock", "slot-000.txt", "slot-001.txt"]
+    assert all(p.stat().st_size == 0 for p in spool.dir.iterdir())
+    spool.close()
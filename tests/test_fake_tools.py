@@ -0,0 +1,25 @@
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "benchmarks"))
+
+import fake_tools  # noqa: E402
+from runner import run_command  # noqa: E402
+
+pytestmark = pytest.mark.skipif(sys.platform == "win32", reason="fake tools rely on shebang scripts")
+
+
+def test_fake_tools_behave_as_documented(tmp_path):
+    paths = fake_tools.build(tmp_path / "bin")
+    res = asyncio.run(run_command(paths["bigout"], ["0.5"], timeout=10))
+    assert res["stdout_bytes"] == 512 * 1024
+
+    report = tmp_path / "report.txt"
+    res = asyncio.run(run_command(paths["stext"], ["/stext", str(report), "4"], timeout=10))
+    assert res["success"] and report.stat().st_size > 3000
+
+    res = asyncio.run(run_command(paths["stubborn"], [], timeout=0.5, kill_grace=0.2))
+    assert res["timeout"] and "ignoring SIGTERM" in res["stdout"]
@@ -0,0 +1,114 @@
+import json
+import os
+import struct
+
+import generate_binaries
+from pe_info import read_pe_info
+from registry import ToolRegistry
+
+
+def _block(key, value=b"", children=b"", text=False):
+    def pad(b):
+        return b + b"\0" * (-len(b) % 4)
+
+    head_len = 6 + len((key + "\0").encode("utf-16-le"))
+    body = pad(b"\0" * head_len)[head_len:] + pad(value) + children
+    value_len = len(value) // 2 if text else len(value)
+    head = struct.pack("<HHH", 0, value_len, 1 if text else 0) + (key + "\0").encode("utf-16-le")
+    out = head + body
+    return pad(struct.pack("<H", len(out)) + out[2:])
+
+
+def version_info(description, version=(1, 2, 3, 4)):
+    fixed = struct.pack("<13I", 0xFEEF04BD, 0x10000, (version[0] << 16) | version[1],
+                        (version[2] << 16) | version[3], 0, 0, 0, 0, 0, 0, 0, 0, 0)
+    strings = _block("FileDescription", (description + "\0").encode("utf-16-le"), text=True)
+    strings += _block("ProductName", "Sysinternals\0".encode("utf-16-le"), text=True)
+    table = _block("StringFileInfo", children=_block("040904b0", children=strings, text=True), text=True)
+    return _block("VS_VERSION_INFO", fixed, children=table)
+
+
+def make_pe(machine, description=None):
+    """A minimal PE image: headers, one .rsrc section and an optional VERSIONINFO."""
+    pe64 = machine in (0x8664, 0xAA64)
+    opt_size = 240 if pe64 else 224
+    rsrc_rva, rsrc_off = 0x1000, 0x200
+    rsrc = b""
+    if description is not None:
+        vi = version_info(description)
+        # root(type 16) -> name(1) -> lang(0x409) -> data entry -> VERSIONINFO
+        rsrc = struct.pack("<IIHHHH", 0, 0, 0, 0, 0, 1) + struct.pack("<II", 16, 0x80000000 | 24)
+        rsrc += struct.pack("<IIHHHH", 0, 0, 0, 0, 0, 1) + struct.pack("<II", 1, 0x80000000 | 48)
+        rsrc += struct.pack("<IIHHHH", 0, 0, 0, 0, 0, 1) + struct.pack("<II", 0x409, 72)
+        rsrc += struct.pack("<IIII", rsrc_rva + 88, len(vi), 0, 0) + vi
+    opt = bytearray(opt_size)
+    struct.pack_into("<H", opt, 0, 0x20B if pe64 else 0x10B)
+    dirs = 112 if pe64 else 96
+    struct.pack_into("<I", opt, dirs - 4, 16)
+    if rsrc:
+        struct.pack_into("<II", opt, dirs + 16, rsrc_rva, len(rsrc))
+    header = bytearray(64)
+    header[:2] = b"MZ"
+    struct.pack_into("<I", header, 0x3C, 64)
+    coff = b"PE\0\0" + struct.pack("<HHIIIHH", machine, 1, 0, 0, 0, opt_size, 0x22)
+    section = b".rsrc\0\0\0" + struct.pack("<IIII", len(rsrc), rsrc_rva, len(rsrc), rsrc_off) + bytes(16)
+    image = bytes(header) + coff + bytes(opt) + section
+    return image + bytes(rsrc_off - len(image)) + rsrc
+
+
+def test_read_pe_info(tmp_path):
+    p = tmp_path / "tool.exe"
+    p.write_bytes(make_pe(0x8664, "Process lister"))
+    assert read_pe_info(p) == {"machine": "x64", "bits": 64, "description": "Process lister",
+                               "product": "Sysinternals", "version": "1.2.3.4"}
+    p.write_bytes(make_pe(0x14C))
+    assert read_pe_info(p) == {"machine": "x86", "bits": 32}
+    p.write_bytes(b"MZ not really")
+    assert read_pe_info(p) is None
+    p.write_bytes(b"")
+    assert read_pe_info(p) is None
+
+
+def test_incremental_scan_collapses_pairs_and_keeps_metadata(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(generate_binaries, "host_bits", lambda: 64)
+    d = tmp_path / "binaries" / "systeminternals"
+    d.mkdir(parents=True)
+    (d / "pslist.exe").write_bytes(make_pe(0x14C, "Process lister"))
+    (d / "pslist64.exe").write_bytes(make_pe(0x8664, "Process lister"))
+    (d / "sdelete.exe").write_bytes(make_pe(0x14C))
+    (tmp_path / "binaries.json").write_text(json.dumps([
+        {"name": "pslist64", "exe": "old.exe", "category": "sysinternals", "description": "sysinternals utility pslist64",
+         "tags": ["sysinternals", "process"], "safe_flags": ["-t"], "cache_ttl": 5},
+        {"name": "sdelete", "exe": "old.exe", "description": "Secure delete", "destructive": True},
+    ]), encoding="utf-8")
+    parsed = []
+    real = generate_binaries.read_pe_info
+    monkeypatch.setattr(generate_binaries, "read_pe_info", lambda p: parsed.append(p) or real(p))
+
+    generate_binaries.main([])
+    entries = {e["name"]: e for e in json.loads((tmp_path / "binaries.json").read_text(encoding="utf-8"))}
+    assert sorted(entries) == ["pslist", "sdelete"]
+    pslist = entries["pslist"]
+    assert pslist["exe"] == "binaries\\systeminternals\\pslist64.exe"
+    assert pslist["machine"] == "x64" and pslist["version"] == "1.2.3.4"
+    assert pslist["description"] == "Process lister"
+    assert pslist["aliases"] == ["pslist64"]
+    assert pslist["variants"] == {"x86": "binaries\\systeminternals\\pslist.exe",
+                                  "x64": "binaries\\systeminternals\\pslist64.exe"}
+    assert pslist["cache_ttl"] == 5 and pslist["safe_flags"] == ["-t"] and "process" in pslist["tags"]
+    assert entries["sdelete"]["description"] == "Secure delete" and entries["sdelete"]["destructive"]
+    assert len(parsed) == 3
+
+    reg = ToolRegistry(str(tmp_path / "binaries.json"), check_interval=0)
+    assert reg.get("pslist64") is reg.get("pslist")
+    assert len(reg.entries()) == 2
+
+    # second run: only the touched file is parsed again
+    parsed.clear()
+    (d / "sdelete.exe").write_bytes(make_pe(0x8664, "Secure delete"))
+    os.utime(d / "sdelete.exe", ns=(1, 1))
+    generate_binaries.main([])
+    assert [os.path.basename(p) for p in parsed] == ["sdelete.exe"]
+    entries = {e["name"]: e for e in json.loads((tmp_path / "binaries.json").read_text(encoding="utf-8"))}
+    assert entries["sdelete"]["machine"] == "x64"
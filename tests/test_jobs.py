@@ -0,0 +1,72 @@
+import asyncio
+import json
+import sys
+
+from jobs import JobManager
+
+
+def make_cfg(tmp_path):
+    p = tmp_path / "binaries.json"
+    p.write_text(json.dumps([{"name": "py", "exe": sys.executable, "category": "other"}]), encoding="utf-8")
+    return {"BINARIES_PATH": str(p)}
+
+
+async def wait_finished(mgr, job_id):
+    for _ in range(200):
+        if mgr.status(job_id)["status"] != "running":
+            return
+        await asyncio.sleep(0.05)
+
+
+def test_job_runs_in_background_and_output_is_incremental(tmp_path):
+    async def scenario():
+        mgr = JobManager(make_cfg(tmp_path))
+        code = "-u -c \"[print('tick', i) or __import__('time').sleep(0.05) for i in range(5)]\""
+        started = mgr.start("py", code, timeout=10)
+        job_id = started["job_id"]
+        assert started["status"] == "running"
+        await wait_finished(mgr, job_id)
+        first = mgr.output(job_id, 0, max_bytes=7)
+        assert first["data"] == "tick 0\n"
+        rest = mgr.output(job_id, first["next_offset"])
+        assert rest["data"].startswith("tick 1") and rest["eof"]
+        assert mgr.status(job_id)["status"] == "completed"
+
+    asyncio.run(scenario())
+
+
+def test_cancel_and_job_cap(tmp_path):
+    async def scenario():
+        mgr = JobManager(make_cfg(tmp_path), max_running=1)
+        job_id = mgr.start("py", "-c \"__import__('time').sleep(30)\"")["job_id"]
+        assert mgr.start("py", "-V")["error"] == "too_many_jobs"
+        await asyncio.sleep(0.2)
+        assert (await mgr.cancel(job_id))["status"] == "cancelled"
+        second = mgr.start("py", "-V")["job_id"]
+        # let the job finish before the loop closes, or shutdown stalls mid-spawn
+        await wait_finished(mgr, second)
+        assert mgr.status(second)["status"] == "completed"
+
+    asyncio.run(scenario())
+
+
+def test_dropped_output_is_reported(tmp_path):
+    from jobs import Job
+
+    job = Job("j", "t", "", 10, max_output_bytes=10)
+    job.append("0123456789abcdef")
+    r = job.read_output(0)
+    assert r["skipped"] == 6 and r["data"] == "6789abcdef" and r["next_offset"] == 16
+
+
+def test_large_output_stays_in_job_buffer(tmp_path):
+    async def scenario():
+        cfg = dict(make_cfg(tmp_path), RESULTS_INLINE_MAX_BYTES="10")
+        mgr = JobManager(cfg)
+        job_id = mgr.start("py", "-c \"print('x' * 5000)\"", timeout=10)["job_id"]
+        await wait_finished(mgr, job_id)
+        out = mgr.output(job_id, 0, max_bytes=100000)
+        assert out["data"].strip() == "x" * 5000
+        assert "spooled" not in mgr.get(job_id).result
+
+    asyncio.run(scenario())
@@ -0,0 +1,92 @@
+import asyncio
+import json
+import sys
+
+from fastmcp import Client
+
+import server_mcp
+from manifest import load_manifest, manifest_path_for, write_manifest
+
+
+def write_catalog(tmp_path):
+    p = tmp_path / "binaries.json"
+    p.write_text(json.dumps([
+        {"name": "py", "exe": sys.executable, "category": "other"},
+        {"name": "cports", "exe": "cports.exe", "category": "nirsoft"},
+    ]), encoding="utf-8")
+    return p
+
+
+def test_manifest_is_trusted_only_while_catalog_unchanged(tmp_path):
+    bins = write_catalog(tmp_path)
+    entries = json.loads(bins.read_text(encoding="utf-8"))
+    path = write_manifest(str(bins), entries, server_mcp.tool_spec)
+    assert path == manifest_path_for(str(bins))
+    specs = load_manifest(str(bins))
+    assert [s["name"] for s in specs] == ["py", "cports"]
+    assert "structured" in specs[1]["parameters"]["properties"]
+    assert "ctx" not in specs[0]["parameters"]["properties"]
+
+    bins.write_text(bins.read_text(encoding="utf-8") + "\n", encoding="utf-8")
+    assert load_manifest(str(bins)) is None
+
+
+def test_lazy_tools_match_eager_registration_and_run(tmp_path):
+    bins = write_catalog(tmp_path)
+    entries = json.loads(bins.read_text(encoding="utf-8"))
+    write_manifest(str(bins), entries, server_mcp.tool_spec)
+    mcp = server_mcp.build_mcp(str(tmp_path / "missing.ini"), str(bins))
+
+    eager = server_mcp.FastMCP(name="eager")
+    for e in entries:
+        server_mcp.make_tool_fn(eager, e, {})
+
+    async def scenario():
+        lazy_tools = {t.name: t for t in await mcp.list_tools()}
+        for t in await eager.list_tools():
+            assert lazy_tools[t.name].to_mcp_tool() == t.to_mcp_tool()
+        assert lazy_tools["py"]._impl is None
+        async with Client(mcp) as client:
+            res = await client.call_tool("py", {"args": "-c \"print('lazy')\""})
+        assert res.structured_content["stdout"].strip() == "lazy"
+        assert lazy_tools["py"]._impl is not None
+
+    asyncio.run(scenario())
+
+
+def test_catalog_mode_exposes_meta_tools_only(tmp_path):
+    bins = write_catalog(tmp_path)
+    ini = tmp_path / "config.ini"
+    ini.write_text("[server]\ntool_mode = catalog\nstream_output = false\n", encoding="utf-8")
+    mcp = server_mcp.build_mcp(str(ini), str(bins))
+
+    async def scenario():
+        names = {t.name for t in await mcp.list_tools()}
+        assert {"search_tools", "describe_tool", "run_tool"} <= names
+        assert "py" not in names and "cports" not in names
+        async with Client(mcp) as client:
+            found = (await client.call_tool("search_tools", {"query": "cport"})).structured_content
+            assert [r["name"] for r in found["results"]] == ["cports"]
+            desc = (await client.call_tool("describe_tool", {"name": "cports"})).structured_content
+            assert "where" in desc["arguments"]["properties"]
+            ran = (await client.call_tool("run_tool", {"name": "py", "args": "-c \"print(7)\""})).structured_content
+            assert ran["stdout"].strip() == "7"
+
+    asyncio.run(scenario())
+
+
+def test_regenerating_writes_identical_bytes(tmp_path):
+    import os
+    import subprocess
+    from pathlib import Path
+
+    repo = Path(__file__).resolve().parent.parent
+    bins = tmp_path / "binaries.json"
+    bins.write_bytes((repo / "binaries.json").read_bytes())
+    outputs = []
+    # set iteration order follows the hash seed; the manifest must not
+    for seed in ("1", "2"):
+        env = dict(os.environ, PYTHONHASHSEED=seed)
+        subprocess.run([sys.executable, str(repo / "manifest.py"), str(bins)], cwd=repo, env=env, check=True)
+        outputs.append(manifest_path_for(str(bins)).read_bytes())
+    assert outputs[0] == outputs[1]
@@ -0,0 +1,52 @@
+import asyncio
+import json
+import sys
+
+from metrics import Histogram, Metrics, get_metrics
+from runner import run_command
+from server import run_tool_by_name
+
+
+def test_histogram_buckets_and_quantiles():
+    h = Histogram((0.1, 1.0, 10.0))
+    for v in (0.05, 0.1, 0.5, 2.0, 50.0):
+        h.observe(v)
+    assert h.counts == [2, 1, 1, 1]
+    assert h.quantile(0.5) == 1.0
+    assert h.quantile(1.0) is None
+    assert h.as_dict()["count"] == 5
+
+
+def test_record_and_prometheus_text(tmp_path):
+    m = Metrics()
+    m.record("pslist64", {"wall_s": 0.2, "stdout_bytes": 500}, {"success": True})
+    m.record("pslist64", {}, {"success": False, "timeout": True})
+    snap = m.snapshot()["pslist64"]
+    assert snap["calls"] == 2 and snap["timeouts"] == 1 and snap["errors"] == 1
+    assert snap["run_seconds"]["count"] == 1
+
+    path = tmp_path / "prom" / "sysmcp.prom"
+    m.write_textfile(str(path))
+    text = path.read_text(encoding="utf-8")
+    assert 'sysmcp_tool_calls_total{tool="pslist64"} 2' in text
+    assert 'sysmcp_tool_run_seconds_bucket{tool="pslist64",le="0.25"} 1' in text
+    assert 'sysmcp_tool_run_seconds_bucket{tool="pslist64",le="+Inf"} 1' in text
+
+
+def test_run_command_fills_timing_sample():
+    sample = {}
+    asyncio.run(run_command(sys.executable, ["-c", "print('x' * 100)"], timeout=10, metrics=sample))
+    assert sample["spawn_s"] > 0 and sample["wall_s"] >= sample["spawn_s"]
+    assert sample["stdout_bytes"] == 101
+    if sys.platform != "win32":
+        assert sample["cpu_s"] > 0
+
+
+def test_tool_calls_are_recorded(tmp_path):
+    p = tmp_path / "binaries.json"
+    p.write_text(json.dumps([{"name": "metrics-py", "exe": sys.executable, "category": "other"}]), encoding="utf-8")
+    cfg = {"BINARIES_PATH": str(p), "TIMEOUT": "10"}
+    asyncio.run(run_tool_by_name("metrics-py", "-V", cfg))
+    snap = get_metrics().snapshot()["metrics-py"]
+    assert snap["calls"] == 1 and snap["errors"] == 0
+    assert snap["queue_seconds"]["count"] == 1 and snap["call_seconds"]["count"] == 1
@@ -0,0 +1,75 @@
+import asyncio
+import json
+import sys
+
+from pipeline import run_pipeline
+
+PSLIST = """Process information for HOST:
+
+Name                Pid Pri Thd  Hnd   Priv        CPU Time    Elapsed Time
+System                4   8 180 3001    204     0:02:11.343     3:02:11.470
+chrome             1200   8  30  500   9000     0:00:10.000     0:10:00.000
+chrome             1300   8  30  500   9000     0:00:10.000     0:10:00.000
+explorer           2000   8  40  900   7000     0:00:05.000     3:00:00.000
+"""
+
+
+def setup(tmp_path, names=("py",)):
+    emit = tmp_path / "emit.py"
+    emit.write_text("import sys; sys.stdout.write(open(sys.argv[1]).read())", encoding="utf-8")
+    echo = tmp_path / "echo.py"
+    echo.write_text("import sys; print('got', *sys.argv[1:])", encoding="utf-8")
+    bins = tmp_path / "binaries.json"
+    bins.write_text(json.dumps([{"name": n, "exe": sys.executable, "category": "other"} for n in names]),
+                    encoding="utf-8")
+    return {"BINARIES_PATH": str(bins)}, emit, echo
+
+
+def test_fan_out_over_regex_values(tmp_path):
+    cfg, emit, echo = setup(tmp_path)
+    data = tmp_path / "data.txt"
+    data.write_text("pid=10\npid=20\npid=10\npid=-x\npid=confirm=yes\n", encoding="utf-8")
+    stages = [{"tool": "py", "args": f"{emit} {data}", "regex": r"^pid=(\S+)$"},
+              {"tool": "py", "args": f"{echo} {{}}"}]
+    seen = []
+    res = asyncio.run(run_pipeline(stages, cfg, on_stage=lambda i, s: seen.append(i)))
+    assert [r["input"] for r in res["results"]] == ["10", "20"]
+    assert [r["result"]["stdout"].strip() for r in res["results"]] == ["got 10", "got 20"]
+    # flag-like values and server control tokens never reach the next tool
+    assert res["stages"][0]["unsafe_values_dropped"] == 2
+    assert seen == [0, 1] and "stdout" not in res["stages"][0]
+
+
+def test_field_from_a_known_text_table_with_filter(tmp_path):
+    cfg, emit, echo = setup(tmp_path, names=("pslist", "py"))
+    data = tmp_path / "pslist.txt"
+    data.write_text(PSLIST, encoding="utf-8")
+    stages = [{"tool": "pslist", "args": f"{emit} {data}", "filter": "Name=chrome", "field": "Pid", "max_items": 1},
+              {"tool": "py", "args": f"{echo} -p {{}}"}]
+    res = asyncio.run(run_pipeline(stages, cfg))
+    assert [r["input"] for r in res["results"]] == ["1200"]
+    assert res["stages"][0]["values_truncated"] == 1
+
+
+def test_generated_calls_go_through_the_destructive_gate(tmp_path):
+    cfg, emit, echo = setup(tmp_path, names=("py", "pskill"))
+    data = tmp_path / "data.txt"
+    data.write_text("victim\n", encoding="utf-8")
+    stages = [{"tool": "py", "args": f"{emit} {data}", "regex": r"\w+"},
+              {"tool": "pskill", "args": f"{echo} {{}}"}]
+    res = asyncio.run(run_pipeline(stages, cfg))
+    assert res["results"][0]["result"]["error"] == "destructive_tool_blocked"
+
+
+def test_invalid_specs_are_rejected_before_running(tmp_path):
+    cfg, emit, echo = setup(tmp_path)
+
+    def run(stages):
+        return asyncio.run(run_pipeline(stages, cfg))
+
+    assert run([])["error"] == "invalid_pipeline"
+    assert "needs a {}" in run([{"tool": "py", "regex": "x"}, {"tool": "py", "args": "-V"}])["detail"]
+    assert "known table layout" in run([{"tool": "py", "field": "Pid"}, {"tool": "py", "args": "{}"}])["detail"]
+    assert "no group" in run([{"tool": "py", "regex": "(a)", "group": 2}, {"tool": "py", "args": "{}"}])["detail"]
+    assert run([{"tool": "py", "regex": "x"}, {"tool": "nope", "args": "{}"}]) == {
+        "error": "tool_not_found", "name": "nope"}
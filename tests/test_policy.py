@@ -0,0 +1,75 @@
+import asyncio
+import json
+import sys
+
+import sanitize
+from policy import PolicySet
+from registry import ToolRegistry
+from server import run_tool_by_name
+
+
+def write(path, data):
+    path.write_text(json.dumps(data), encoding="utf-8")
+
+
+def test_both_schema_formats_and_catalog_fields(tmp_path):
+    write(tmp_path / "cports.json", {"allowed_flags": ["/stext", "/sxml"], "allow_free_args": False})
+    write(tmp_path / "pslist64.json", {"allowed_flags": ["-x", "-t"], "allow_free_args": True})
+    write(tmp_path / "wipe.json", {"allowed_flags": ["-p"], "destructive": True})
+    write(tmp_path / "strict.json", {"allowed_flags": ["/a", "/b"]})
+    write(tmp_path / "strict.schema.json", {
+        "type": "object", "additionalProperties": False,
+        "properties": {"flags": {"type": "array", "items": {"enum": ["/a"]}},
+                       "positional": {"type": "array", "items": {"type": "string"}}}})
+    policies = PolicySet([
+        {"name": "cports"},
+        {"name": "pslist", "aliases": ["pslist64"]},
+        {"name": "wipe"},
+        {"name": "strict"},
+        {"name": "probed", "safe_flags": ["-v"]},
+        {"name": "free"},
+    ], schema_dir=tmp_path)
+
+    cports = policies.get("cports")
+    assert cports.check(["/SText"]).allowed
+    d = cports.check(["/sxml", "out.xml"])
+    assert d.error == "args_schema_violation" and "positional" in d.reason and "cports.json" in d.reason
+    assert "'/shtml'" in cports.check(["/shtml"]).reason
+
+    assert policies.get("pslist").check(["-t", "chrome"]).allowed
+    assert not policies.get("pslist").check(["-k"]).allowed
+
+    # the .schema.json file wins over the legacy file for flags
+    assert not policies.get("strict").check(["/b"]).allowed
+    assert policies.get("probed").check(["-v"]).allowed
+    assert "safe_flags" in policies.get("probed").check(["-x"]).reason
+    assert policies.get("free").check(["-anything", "goes"]).allowed
+
+    wipe = policies.get("wipe")
+    d = wipe.check(["-p", "3"])
+    assert d.needs_confirmation and not d.allowed
+    d = wipe.check(["-p", "3", "--confirm"])
+    assert d.allowed and d.argv == ["-p", "3"]
+    assert wipe.check(["-p"], allow_destructive=True).allowed
+    # flag rules still apply to confirmed calls
+    assert wipe.check(["-z", "--confirm"]).error == "args_schema_violation"
+    # name-based safety net for tools the catalog does not mark
+    assert policies.get("sdelete64").destructive
+
+
+def test_registry_recompiles_when_a_schema_changes(tmp_path, monkeypatch):
+    monkeypatch.setattr(sanitize, "SCHEMA_DIR", tmp_path / "schemas")
+    (tmp_path / "schemas").mkdir()
+    bins = tmp_path / "binaries.json"
+    write(bins, [{"name": "py", "exe": sys.executable, "category": "other"}])
+    reg = ToolRegistry(str(bins), check_interval=0)
+    assert reg.catalog().policy("py").check(["-c", "pass"]).allowed
+
+    write(tmp_path / "schemas" / "py.json", {"allowed_flags": ["-V"], "allow_free_args": False})
+    assert not reg.catalog().policy("py").check(["-c", "pass"]).allowed
+
+    cfg = {"BINARIES_PATH": str(bins), "CACHE_ENABLED": "false", "RESULTS_DIR": str(tmp_path / "spool")}
+    res = asyncio.run(run_tool_by_name("py", "-c pass", cfg))
+    assert res["error"] == "args_schema_violation" and "py.json" in res["detail"]
+    res = asyncio.run(run_tool_by_name("py", "-V", cfg))
+    assert res.get("success") and "Python" in res["stdout"]
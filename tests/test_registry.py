@@ -0,0 +1,50 @@
+import json
+import os
+
+from registry import ToolRegistry
+
+
+def write_catalog(path, entries):
+    path.write_text(json.dumps(entries), encoding="utf-8")
+
+
+def test_lookup_and_indexes(tmp_path):
+    p = tmp_path / "binaries.json"
+    write_catalog(p, [
+        {"name": "pslist64", "exe": "pslist64.exe", "category": "sysinternals", "tags": ["sysinternals"]},
+        {"name": "cports", "exe": "cports.exe", "category": "nirsoft", "tags": ["nirsoft", "network"]},
+        {"name": "cports", "exe": "other\\cports.exe", "category": "other"},
+    ])
+    reg = ToolRegistry(str(p), check_interval=0)
+    cat = reg.catalog()
+    assert reg.get("pslist64")["exe"] == "pslist64.exe"
+    # duplicates keep the first entry
+    assert reg.get("cports")["exe"] == "cports.exe"
+    assert reg.get("missing") is None
+    assert [e["name"] for e in cat.in_category("nirsoft")] == ["cports"]
+    assert [e["name"] for e in cat.with_tag("Network")] == ["cports"]
+    assert len(reg.entries()) == 2
+
+
+def test_reload_only_when_file_changes(tmp_path):
+    p = tmp_path / "binaries.json"
+    write_catalog(p, [{"name": "a", "exe": "a.exe", "category": "other"}])
+    reg = ToolRegistry(str(p), check_interval=0)
+    first = reg.catalog()
+    assert reg.catalog() is first
+
+    write_catalog(p, [{"name": "a", "exe": "a.exe", "category": "other"},
+                      {"name": "b", "exe": "b.exe", "category": "other"}])
+    st = p.stat()
+    os.utime(p, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+    second = reg.catalog()
+    assert second is not first
+    assert "b" in second and "b" not in first
+
+
+def test_directory_scan(tmp_path):
+    d = tmp_path / "binaries" / "nirsoft"
+    d.mkdir(parents=True)
+    (d / "cports.exe").write_bytes(b"")
+    reg = ToolRegistry(str(tmp_path / "binaries"), check_interval=0)
+    assert reg.get("cports")["category"] == "nirsoft"
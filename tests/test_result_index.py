@@ -0,0 +1,61 @@
+import asyncio
+import json
+import sys
+
+import result_index
+from result_index import ResultIndex
+from server import run_tool_by_name
+
+NETSTAT = """Proto  Local Address          Foreign Address        State           PID
+TCP    0.0.0.0:443            0.0.0.0:0              LISTENING       4120
+TCP    0.0.0.0:4430           0.0.0.0:0              LISTENING       77
+"""
+
+
+def test_terms_match_whole_words_on_one_line():
+    idx = ResultIndex()
+    idx.add("netstat", "-ano", {"stdout": NETSTAT}, ts_ms=1000)
+    res = idx.search("443 listening")
+    assert [h["line_no"] for h in res["hits"]] == [2]
+    assert res["hits"][0]["tool"] == "netstat" and res["hits"][0]["ts_ms"] == 1000
+    assert idx.search("443 4430")["hits"] == []
+    assert idx.search("0.0.0.0:4430")["hits"][0]["line"].endswith("77")
+    assert idx.search("...")["error"] == "invalid_query"
+
+
+def test_structured_records_are_searchable_by_column():
+    idx = ResultIndex()
+    idx.add("cports", "", {"records": [
+        {"Process Name": "svchost.exe", "Local Port": "443", "Remote Port": "51000"},
+        {"Process Name": "nginx.exe", "Local Port": "8443", "Remote Port": "443"},
+    ]})
+    assert len(idx.search("443")["hits"]) == 2
+    hits = idx.search("LocalPort:443")["hits"]
+    assert len(hits) == 1 and "svchost.exe" in hits[0]["line"]
+    assert idx.search("local_port:443 svchost.exe", tool="CPORTS")["matched"] == 1
+    assert idx.search("svchost", tool="other")["hits"] == []
+
+
+def test_least_recently_used_results_are_evicted():
+    idx = ResultIndex(max_results=2)
+    idx.add("a", "", {"stdout": "alpha shared"})
+    idx.add("b", "", {"stdout": "beta shared"})
+    # a match keeps `a` around; `b` becomes the oldest
+    assert idx.search("alpha")["matched"] == 1
+    idx.add("c", "", {"stdout": "gamma shared"})
+    assert [h["tool"] for h in idx.search("shared")["hits"]] == ["c", "a"]
+    assert idx.search("beta")["hits"] == [] and "beta" not in idx._postings
+    assert idx.stats()["evictions"] == 1
+
+
+def test_run_tool_by_name_feeds_the_index(tmp_path, monkeypatch):
+    monkeypatch.setattr(result_index, "_INDEX", None)
+    bins = tmp_path / "binaries.json"
+    bins.write_text(json.dumps([{"name": "py", "exe": sys.executable, "category": "other"}]), encoding="utf-8")
+    cfg = {"BINARIES_PATH": str(bins), "INDEX_ENABLED": "true", "RESULTS_DIR": str(tmp_path / "spool")}
+    res = asyncio.run(run_tool_by_name("py", "-c \"print('owner of c:/x/foo.dll is 1234')\"", cfg))
+    assert res["success"]
+    idx = result_index.get_result_index(cfg)
+    idx._executor.submit(lambda: None).result()
+    hit = idx.search("foo.dll")["hits"][0]
+    assert hit["tool"] == "py" and "1234" in hit["line"]
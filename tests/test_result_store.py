@@ -0,0 +1,56 @@
+import asyncio
+import os
+import sys
+import time
+
+from result_store import ResultStore
+from runner import run_command
+
+
+def test_small_results_stay_inline(tmp_path):
+    store = ResultStore(root=str(tmp_path), inline_max_bytes=100)
+    res = {"stdout": "short", "success": True}
+    assert store.spool_result("t", res) is res
+
+
+def test_spool_and_read_ranges(tmp_path):
+    store = ResultStore(root=str(tmp_path), inline_max_bytes=10)
+    text = "".join(f"line {i}\n" for i in range(100))
+    out = store.spool_result("autorunsc", {"stdout": text, "success": True})
+    meta = out["spooled"]
+    assert out["stdout"] == ""
+    assert meta["size"] == len(text) and meta["lines"] == 100
+
+    r = store.read_range(meta["handle"], offset=0, length=7)
+    assert r["data"] == "line 0\n" and r["next_offset"] == 7 and not r["eof"]
+
+    r = store.read_range(meta["handle"], start_line=98, num_lines=5)
+    assert r["data"] == "line 98\nline 99\n" and r["eof"]
+
+    assert store.read_range("../../etc/passwd")["error"] == "result_not_found"
+
+
+def test_expire_by_age_and_quota(tmp_path):
+    store = ResultStore(root=str(tmp_path), inline_max_bytes=1, max_age=60, max_total_bytes=250)
+    old = store.put("t", "x" * 100)["handle"]
+    past = time.time() - 120
+    os.utime(tmp_path / f"{old}.txt", (past, past))
+    handles = [store.put("t", "y" * 100)["handle"] for _ in range(3)]
+    assert not (tmp_path / f"{old}.txt").exists()
+    remaining = [h for h in handles if (tmp_path / f"{h}.txt").exists()]
+    assert len(remaining) == 2 and remaining == handles[1:]
+
+
+def test_writer_keeps_output_that_memory_truncates(tmp_path):
+    store = ResultStore(root=str(tmp_path), inline_max_bytes=10)
+    writer = store.open_writer()
+    code = "import sys; sys.stdout.write(''.join('row %d\\n' % i for i in range(5000)))"
+    res = asyncio.run(run_command(sys.executable, ["-c", code], timeout=10,
+                                  head_bytes=100, tail_bytes=100, stdout_sink=writer))
+    assert res["truncated"]
+    out = store.commit_writer(writer, "py", res)
+    meta = out["spooled"]
+    assert meta["size"] == res["stdout_bytes"] and meta["lines"] == 5000
+    r = store.read_range(meta["handle"], start_line=2500, num_lines=1)
+    assert r["data"] == "row 2500\n"
+    assert not list(tmp_path.glob("*.tmp"))
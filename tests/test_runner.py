@@ -1,4 +1,6 @@
+import os
 import sys
+import time
 import asyncio
 import json
 from pathlib import Path
@@ -14,3 +16,80 @@ def test_run_python_print():
     res = asyncio.run(coro)
     assert res["exit_code"] == 0
     assert "hello-test" in res["stdout"]
+
+
+def test_streams_chunks_to_callback():
+    chunks = []
+
+    async def on_output(stream, text):
+        chunks.append((stream, text))
+
+    code = "import sys; print('out-line'); sys.stdout.flush(); print('err-line', file=sys.stderr)"
+    res = asyncio.run(run_command(sys.executable, ["-c", code], timeout=5, on_output=on_output))
+    assert res["exit_code"] == 0
+    assert "".join(t for s, t in chunks if s == "stdout").strip() == "out-line"
+    assert "".join(t for s, t in chunks if s == "stderr").strip() == "err-line"
+
+
+def test_bounded_buffer_keeps_head_and_tail():
+    code = "import sys; sys.stdout.write('A' * 1000 + 'B' * 100000 + 'C' * 1000)"
+    res = asyncio.run(run_command(sys.executable, ["-c", code], timeout=5, head_bytes=1000, tail_bytes=1000))
+    assert res["truncated"] is True
+    assert res["stdout_bytes"] == 102000
+    assert res["stdout"].startswith("A" * 1000 + "\n...[100000 bytes omitted]...")
+    assert res["stdout"].endswith("C" * 1000)
+
+
+def test_timeout_keeps_partial_output():
+    code = "import sys, time; print('partial'); sys.stdout.flush(); time.sleep(30)"
+    res = asyncio.run(run_command(sys.executable, ["-c", code], timeout=1, kill_grace=0.5))
+    assert res["timeout"] is True
+    assert res["truncated"] is True
+    assert "partial" in res["stdout"]
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    return True
+
+
+@pytest.mark.skipif(os.name == "nt", reason="process groups are POSIX-specific")
+def test_timeout_kills_grandchildren_that_ignore_sigterm(tmp_path):
+    pidfile = tmp_path / "child.pid"
+    child = "import signal, time; signal.signal(signal.SIGTERM, signal.SIG_IGN); time.sleep(60)"
+    code = (
+        "import subprocess, sys, time; "
+        f"p = subprocess.Popen([sys.executable, '-c', {child!r}]); "
+        f"open({str(pidfile)!r}, 'w').write(str(p.pid)); "
+        "time.sleep(60)"
+    )
+    res = asyncio.run(run_command(sys.executable, ["-c", code], timeout=1, kill_grace=0.5))
+    assert res["timeout"] is True
+    grandchild = int(pidfile.read_text())
+    for _ in range(50):
+        if not _pid_alive(grandchild):
+            break
+        time.sleep(0.05)
+    assert not _pid_alive(grandchild)
+
+
+@pytest.mark.skipif(os.name == "nt", reason="process groups are POSIX-specific")
+def test_cancellation_kills_process(tmp_path):
+    pidfile = tmp_path / "proc.pid"
+    code = f"import os, time; open({str(pidfile)!r}, 'w').write(str(os.getpid())); time.sleep(60)"
+
+    async def scenario():
+        task = asyncio.create_task(run_command(sys.executable, ["-c", code], timeout=30, kill_grace=0.5))
+        for _ in range(100):
+            await asyncio.sleep(0.05)
+            if pidfile.exists() and pidfile.read_text():
+                break
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(scenario())
+    assert not _pid_alive(int(pidfile.read_text()))
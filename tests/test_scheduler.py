@@ -0,0 +1,106 @@
+import asyncio
+
+import pytest
+
+from scheduler import Scheduler, SchedulerFull, parse_limits
+
+
+def test_parse_limits():
+    assert parse_limits("Procmon:1, nirsoft : 4,bad, x:y") == {"Procmon": 1, "nirsoft": 4}
+
+
+def test_global_cap_and_priority_order():
+    async def scenario():
+        sched = Scheduler(max_concurrent=1, max_queue=10)
+        gate = asyncio.Event()
+        order = []
+
+        async def blocker():
+            await gate.wait()
+
+        async def job(tag):
+            order.append(tag)
+
+        first = asyncio.create_task(sched.run("a", "x", blocker))
+        await asyncio.sleep(0)
+        low = asyncio.create_task(sched.run("b", "x", lambda: job("low"), priority=0))
+        high = asyncio.create_task(sched.run("c", "x", lambda: job("high"), priority=5))
+        await asyncio.sleep(0)
+        assert sched.queue_depth() == 2
+        gate.set()
+        await asyncio.gather(first, low, high)
+        assert order == ["high", "low"]
+        st = sched.stats()
+        assert st["running"] == 0 and st["queue_depth"] == 0
+        assert st["tools"]["b"]["completed"] == 1
+
+    asyncio.run(scenario())
+
+
+def test_per_tool_cap_does_not_block_other_tools():
+    async def scenario():
+        sched = Scheduler(max_concurrent=4, max_queue=10, tool_limits={"slow": 1})
+        gate = asyncio.Event()
+        ran = []
+
+        async def blocker():
+            await gate.wait()
+
+        async def quick():
+            ran.append("fast")
+
+        t1 = asyncio.create_task(sched.run("slow", "x", blocker))
+        t2 = asyncio.create_task(sched.run("slow", "x", blocker))
+        await asyncio.sleep(0)
+        await sched.run("fast", "x", quick)
+        assert ran == ["fast"]
+        assert sched.stats()["tools"]["slow"]["queued"] == 1
+        gate.set()
+        await asyncio.gather(t1, t2)
+
+    asyncio.run(scenario())
+
+
+def test_rejects_when_queue_full():
+    async def scenario():
+        sched = Scheduler(max_concurrent=1, max_queue=1)
+        gate = asyncio.Event()
+
+        async def blocker():
+            await gate.wait()
+
+        t1 = asyncio.create_task(sched.run("a", "x", blocker))
+        t2 = asyncio.create_task(sched.run("a", "x", blocker))
+        await asyncio.sleep(0)
+        with pytest.raises(SchedulerFull):
+            await sched.run("a", "x", blocker)
+        assert sched.stats()["tools"]["a"]["rejected"] == 1
+        gate.set()
+        await asyncio.gather(t1, t2)
+
+    asyncio.run(scenario())
+
+
+def test_free_slot_is_used_even_when_queue_is_full():
+    async def scenario():
+        sched = Scheduler(max_concurrent=4, max_queue=1, tool_limits={"slow": 1})
+        gate = asyncio.Event()
+
+        async def blocker():
+            await gate.wait()
+
+        async def quick():
+            return "ok"
+
+        t1 = asyncio.create_task(sched.run("slow", "x", blocker))
+        t2 = asyncio.create_task(sched.run("slow", "x", blocker))
+        await asyncio.sleep(0)
+        assert sched.queue_depth() == 1
+        # the queue is full, but a global slot is free and "fast" has no cap
+        assert await sched.run("fast", "x", quick) == "ok"
+        with pytest.raises(SchedulerFull):
+            await sched.run("slow", "x", blocker)
+        gate.set()
+        await asyncio.gather(t1, t2)
+
+    asyncio.run(scenario())
@@ -0,0 +1,118 @@
+import asyncio
+import json
+import signal
+import socket
+import sys
+
+from fastmcp import Client
+
+import server_mcp
+from sessions import SessionCloseApp, SessionTracker
+
+SLEEP = "-c \"__import__('time').sleep(30)\""
+
+
+def build(tmp_path, tracker):
+    bins = tmp_path / "binaries.json"
+    bins.write_text(json.dumps([{"name": "py", "exe": sys.executable, "category": "other"}]), encoding="utf-8")
+    return server_mcp.build_mcp(str(tmp_path / "missing.ini"), str(bins), tracker=tracker)
+
+
+async def wait_for(cond, timeout=10.0):
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while not cond():
+        assert loop.time() < deadline, "condition not reached"
+        await asyncio.sleep(0.02)
+
+
+def test_drain_cancels_leftover_calls_and_refuses_new_ones(tmp_path):
+    tracker = SessionTracker()
+    mcp = build(tmp_path, tracker)
+
+    async def go():
+        async with Client(mcp) as client:
+            slow = asyncio.ensure_future(client.call_tool("py", {"args": SLEEP}))
+            await wait_for(lambda: tracker.in_flight() == 1)
+            summary = await tracker.drain(timeout=0.2)
+            assert summary["cancelled"] == 1
+            assert (await slow).structured_content["error"] == "cancelled"
+            res = await client.call_tool("py", {"args": "-V"})
+            assert res.structured_content["error"] == "server_draining"
+
+    asyncio.run(go())
+
+
+def test_cancel_session_only_touches_that_session(tmp_path):
+    tracker = SessionTracker()
+    mcp = build(tmp_path, tracker)
+
+    async def go():
+        async with Client(mcp) as a, Client(mcp) as b:
+            slow_a = asyncio.ensure_future(a.call_tool("py", {"args": SLEEP}))
+            slow_b = asyncio.ensure_future(b.call_tool("py", {"args": "-c \"__import__('time').sleep(0.5)\""}))
+            await wait_for(lambda: tracker.in_flight() == 2)
+            assert tracker.stats()["sessions"] == 2
+            first = next(iter(tracker._calls))
+            assert tracker.cancel_session(first) == 1
+            results = [(await slow_a).structured_content, (await slow_b).structured_content]
+            assert sorted(r.get("error", "ok") for r in results) == ["cancelled", "ok"]
+            resource = await a.read_resource("stats://sessions")
+            assert json.loads(resource[0].text)["in_flight"] == 0
+
+    asyncio.run(go())
+
+
+def test_http_transport_serves_concurrent_sessions_and_drains(tmp_path):
+    tracker = SessionTracker()
+    mcp = build(tmp_path, tracker)
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    cfg = {"TRANSPORT": "http", "HTTP_HOST": "127.0.0.1", "HTTP_PORT": str(port), "DRAIN_TIMEOUT": "5"}
+    app = server_mcp.SessionCloseApp(mcp.http_app(), tracker)
+    server = server_mcp.DrainingServer(
+        server_mcp.uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning", lifespan="on"),
+        lambda: server_mcp.shutdown(tracker, cfg))
+
+    async def go():
+        serving = asyncio.ensure_future(server.serve())
+        await wait_for(lambda: server.started)
+        url = f"http://127.0.0.1:{port}/mcp"
+        async with Client(url) as a, Client(url) as b:
+            results = await asyncio.gather(*(c.call_tool("py", {"args": "-V"}) for c in (a, b, a, b)))
+            assert all("Python" in r.structured_content["stdout"] for r in results)
+            # a call still running at SIGTERM is allowed to finish
+            running = asyncio.ensure_future(a.call_tool("py", {"args": "-c \"__import__('time').sleep(0.5)\""}))
+            await wait_for(lambda: tracker.in_flight() == 1)
+            server.handle_exit(signal.SIGTERM, None)
+            assert (await running).structured_content["success"]
+        await asyncio.wait_for(serving, 15)
+        assert tracker.draining
+
+    asyncio.run(go())
+
+
+def test_delete_cancels_only_after_the_app_ends_the_session():
+    class Tracker:
+        def __init__(self):
+            self.cancelled = []
+
+        def cancel_session(self, sid):
+            self.cancelled.append(sid)
+
+    def app_replying(status):
+        async def app(scope, receive, send):
+            await send({"type": "http.response.start", "status": status, "headers": []})
+            await send({"type": "http.response.body", "body": b""})
+        return app
+
+    async def noop(message):
+        pass
+
+    scope = {"type": "http", "method": "DELETE", "headers": [(b"mcp-session-id", b"someone-else")]}
+    tracker = Tracker()
+    asyncio.run(SessionCloseApp(app_replying(404), tracker)(scope, None, noop))
+    assert tracker.cancelled == []
+    asyncio.run(SessionCloseApp(app_replying(200), tracker)(scope, None, noop))
+    assert tracker.cancelled == ["someone-else"]
@@ -0,0 +1,69 @@
+import pytest
+
+from tabular import UnknownColumn, compile_where, parse_columns, parse_file
+
+XML = """<?xml version="1.0" ?>
+<cports_list>
+<item>
+<Process_Name>chrome.exe</Process_Name>
+<Process_ID>1200</Process_ID>
+<Local_Port>50123</Local_Port>
+<Remote_Port>443</Remote_Port>
+</item>
+<item>
+<Process_Name>svchost.exe</Process_Name>
+<Process_ID>800</Process_ID>
+<Local_Port>135</Local_Port>
+<Remote_Port></Remote_Port>
+</item>
+<item>
+<Process_Name>chrome.exe</Process_Name>
+<Process_ID>1300</Process_ID>
+<Local_Port>50200</Local_Port>
+<Remote_Port>80</Remote_Port>
+</item>
+</cports_list>
+"""
+
+
+def test_xml_filter_and_projection(tmp_path):
+    p = tmp_path / "out.xml"
+    p.write_text(XML, encoding="utf-8")
+    res = parse_file(str(p), "xml", columns=["process id", "Remote_Port"], where="Process Name=CHROME.EXE; remote port>100")
+    assert res["columns"] == ["Process ID", "Remote Port"]
+    assert res["records"] == [{"Process ID": "1200", "Remote Port": "443"}]
+    assert res["rows_scanned"] == 3
+
+
+def test_limit_stops_early(tmp_path):
+    p = tmp_path / "out.xml"
+    p.write_text(XML, encoding="utf-8")
+    res = parse_file(str(p), "xml", limit=1)
+    assert res["record_count"] == 1 and res["rows_scanned"] == 1
+    assert res["records"][0]["Process Name"] == "chrome.exe"
+
+
+def test_csv_with_header(tmp_path):
+    p = tmp_path / "out.csv"
+    p.write_text("Driver Name,Address\nntfs.sys,0xfff\nbeep.sys,0xaaa\n", encoding="utf-8")
+    res = parse_file(str(p), "csv", where="driver name!~ntfs")
+    assert res["records"] == [{"Driver Name": "beep.sys", "Address": "0xaaa"}]
+
+
+def test_invalid_where():
+    with pytest.raises(ValueError):
+        compile_where("no operator here")
+    with pytest.raises(ValueError):
+        compile_where("Port>abc")
+    assert parse_columns(" a, b ,,c") == ["a", "b", "c"]
+
+
+def test_where_on_unknown_column_is_rejected(tmp_path):
+    p = tmp_path / "out.xml"
+    p.write_text(XML, encoding="utf-8")
+    with pytest.raises(UnknownColumn, match="Remote Host"):
+        parse_file(str(p), "xml", where="Remote Host~example")
+    # an empty export has no header to check against
+    empty = tmp_path / "empty.xml"
+    empty.write_text("<cports_list></cports_list>", encoding="utf-8")
+    assert parse_file(str(empty), "xml", where="Remote Host~x")["records"] == []
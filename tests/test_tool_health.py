@@ -0,0 +1,90 @@
+import asyncio
+import json
+import sys
+
+import tool_health
+from server import run_tool_by_name
+from tool_health import ToolHealth
+
+OK = {"exit_code": 0, "success": True, "timeout": False}
+TIMED_OUT = {"exit_code": None, "success": False, "timeout": True}
+
+
+def test_timeout_follows_the_learned_percentile():
+    health = ToolHealth(percentile=90, headroom=2, min_headroom=1, min_samples=3, min_timeout=2, max_timeout=100)
+    assert health.timeout_for("t", default=30) == 30
+    for wall in (1.0, 2.0, 4.0):
+        health.record("t", OK, wall, 30)
+    assert health.timeout_for("t") == 4.0 * 2 + 1
+    # quick tools are clamped to min_timeout, explicit entries win
+    for _ in range(20):
+        health.record("q", OK, 0.01, 30)
+    assert health.timeout_for("q") == 2
+    assert health.timeout_for("q", {"timeout": 45}) == 45
+    # a timeout at 9s means the next run gets at least 18s, until one completes
+    health.record("t", TIMED_OUT, 9.0, 9.0)
+    assert health.timeout_for("t") == 18
+    health.record("t", OK, 3.0, 18)
+    assert health.timeout_for("t") == 9
+
+
+def test_breaker_opens_fails_fast_and_closes_after_a_good_trial(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(tool_health.time, "monotonic", lambda: clock[0])
+    health = ToolHealth(breaker_failures=2, breaker_cooldown=60)
+    health.record("t", TIMED_OUT, 30, 30)
+    assert health.check("t") is None
+    health.record("t", {"exit_code": -11, "success": False}, 0.1, 30)
+    blocked = health.check("t")
+    assert blocked["error"] == "circuit_open" and blocked["retry_after_s"] == 60
+    clock[0] += 61
+    assert health.check("t") is None           # the trial call
+    assert health.check("t")["error"] == "circuit_open"
+    health.record("t", OK, 0.5, 30)
+    assert health.check("t") is None and health.stats()["t"]["circuit"] == "closed"
+
+
+def test_stats_survive_a_restart(tmp_path):
+    path = tmp_path / "stats.json"
+    health = ToolHealth(min_samples=2, stats_file=str(path), save_interval=3600)
+    health.record("t", OK, 10.0, 30)
+    health.record("t", OK, 10.0, 30)
+    health.save()
+    assert json.loads(path.read_text())["tools"]["t"]["runs"] == [10.0, 10.0]
+    again = ToolHealth(min_samples=2, headroom=1, min_headroom=0, stats_file=str(path))
+    assert again.timeout_for("t") == 10
+
+
+def test_crashing_tool_is_not_spawned_while_the_circuit_is_open(tmp_path, monkeypatch):
+    monkeypatch.setattr(tool_health, "_HEALTH", ToolHealth(breaker_failures=1, breaker_cooldown=60))
+    bins = tmp_path / "binaries.json"
+    bins.write_text(json.dumps([{"name": "crashy", "exe": sys.executable, "category": "other"}]), encoding="utf-8")
+    cfg = {"BINARIES_PATH": str(bins)}
+    # killed by a signal on POSIX; an access-violation NTSTATUS exit code on Windows
+    crash = "-c \"raise SystemExit(-1073741819)\"" if sys.platform == "win32" else "-c \"__import__('os').abort()\""
+    first = asyncio.run(run_tool_by_name("crashy", crash, cfg))
+    assert tool_health.is_crash(first)
+    second = asyncio.run(run_tool_by_name("crashy", "-V", cfg))
+    assert second["error"] == "circuit_open"
+
+
+def test_jobs_ending_at_their_own_timeout_do_not_trip_the_breaker(tmp_path, monkeypatch):
+    from jobs import JobManager
+
+    monkeypatch.setattr(tool_health, "_HEALTH", ToolHealth(adaptive=True, breaker_failures=3, breaker_cooldown=60))
+    bins = tmp_path / "binaries.json"
+    bins.write_text(json.dumps([{"name": "py", "exe": sys.executable, "category": "other"}]), encoding="utf-8")
+    cfg = {"BINARIES_PATH": str(bins)}
+
+    async def go():
+        mgr = JobManager(cfg)
+        for _ in range(3):
+            job_id = mgr.start("py", "-c \"__import__('time').sleep(30)\"", timeout=1)["job_id"]
+            while mgr.status(job_id)["status"] == "running":
+                await asyncio.sleep(0.05)
+            assert mgr.status(job_id)["status"] == "timeout"
+        return await run_tool_by_name("py", "-c \"print('still runs')\"", cfg)
+
+    res = asyncio.run(go())
+    assert res["stdout"].strip() == "still runs"
+    assert tool_health.get_tool_health().stats()["py"]["floor_s"] is None
@@ -0,0 +1,244 @@
+"""Per-tool timeouts learned from observed run times, and a circuit breaker.
+
+A single `[server] timeout` fits no tool well: a quick tool that hangs keeps a
+scheduler slot for the whole timeout, and slow ones such as `autorunsc` are
+killed halfway. `ToolHealth` keeps the wall times of each tool's last
+`window` completed runs. Once a tool has `min_samples` of them, its timeout
+is the `percentile`-th run time times `headroom`, plus `min_headroom` seconds,
+clamped to [`min_timeout`, `max_timeout`]. Until then the configured timeout
+applies. A `timeout` in the tool's `binaries.json` entry always wins.
+
+A run that times out never reports how long it would have taken, so with
+`adaptive` on the tool's next timeout is at least double the one it hit (up
+to `max_timeout`), until a run completes again.
+
+The circuit breaker counts consecutive timeouts and crashes (killed by a
+signal, or an NTSTATUS error exit code). After `breaker_failures` of them
+the tool fails fast with `circuit_open` for `breaker_cooldown` seconds.
+After that one trial call is let through: if it succeeds the breaker
+closes, and if it fails the tool stays blocked for another cool-down.
+
+Run times and floors are saved to `stats_file` (at most every
+`save_interval` seconds, and at shutdown) and loaded at startup.
+"""
+import atexit
+import json
+import logging
+import math
+import os
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import Deque, Dict, Optional
+
+LOG = logging.getLogger("mcp_server")
+
+STATS_VERSION = 1
+# Windows reports an unhandled exception as an NTSTATUS error code (0xC0000005 etc.)
+_NTSTATUS_ERROR = 0xC0000000
+
+
+def is_crash(res: dict) -> bool:
+    code = res.get("exit_code")
+    return isinstance(code, int) and (code < 0 or code >= _NTSTATUS_ERROR)
+
+
+class _Tool:
+    __slots__ = ("runs", "floor", "failures", "open_until", "trial", "trips")
+
+    def __init__(self, window: int):
+        self.runs: Deque[float] = deque(maxlen=window)
+        self.floor: Optional[float] = None
+        self.failures = 0
+        self.open_until = 0.0
+        # when a half-open breaker let its trial call through (0: none in flight)
+        self.trial = 0.0
+        self.trips = 0
+
+
+class ToolHealth:
+    def __init__(self, default_timeout: float = 30.0, adaptive: bool = True, percentile: float = 99.0,
+                 headroom: float = 1.5, min_headroom: float = 2.0, min_samples: int = 5,
+                 min_timeout: float = 5.0, max_timeout: float = 600.0, window: int = 100,
+                 breaker_failures: int = 3, breaker_cooldown: float = 60.0,
+                 stats_file: Optional[str] = None, save_interval: float = 30.0):
+        self.default_timeout = default_timeout
+        self.adaptive = adaptive
+        self.percentile = min(100.0, max(1.0, percentile))
+        self.headroom = headroom
+        self.min_headroom = min_headroom
+        self.min_samples = max(1, min_samples)
+        self.min_timeout = min_timeout
+        self.max_timeout = max(max_timeout, min_timeout)
+        self.window = max(1, window)
+        self.breaker_failures = breaker_failures
+        self.breaker_cooldown = breaker_cooldown
+        self.stats_file = Path(stats_file) if stats_file else None
+        self.save_interval = save_interval
+        self._tools: Dict[str, _Tool] = {}
+        # the scheduler's loop and atexit both touch this
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._saved_at = time.monotonic()
+        if self.stats_file is not None:
+            self.load()
+
+    def _tool(self, name: str) -> _Tool:
+        t = self._tools.get(name)
+        if t is None:
+            t = self._tools[name] = _Tool(self.window)
+        return t
+
+    def _quantile(self, runs) -> float:
+        ordered = sorted(runs)
+        rank = max(0, math.ceil(self.percentile / 100.0 * len(ordered)) - 1)
+        return ordered[rank]
+
+    def timeout_for(self, name: str, entry: Optional[dict] = None, default: Optional[float] = None) -> float:
+        """Seconds to give the next run of `name`; `default` replaces the configured timeout."""
+        fixed = (entry or {}).get("timeout")
+        if fixed:
+            try:
+                return float(fixed)
+            except (TypeError, ValueError):
+                LOG.warning("ignoring bad timeout %r for %s in binaries.json", fixed, name)
+        with self._lock:
+            t = self._tools.get(name)
+            learned = None
+            if self.adaptive and t is not None and len(t.runs) >= self.min_samples:
+                learned = self._quantile(t.runs) * self.headroom + self.min_headroom
+                learned = min(self.max_timeout, max(self.min_timeout, learned))
+            if learned is not None:
+                timeout = learned
+            else:
+                timeout = self.default_timeout if default is None else default
+            if self.adaptive and t is not None and t.floor is not None:
+                timeout = max(timeout, t.floor)
+        return round(timeout, 1)
+
+    def check(self, name: str) -> Optional[dict]:
+        """None if `name` may run now, else the `circuit_open` error to return."""
+        if not self.breaker_failures:
+            return None
+        with self._lock:
+            t = self._tools.get(name)
+            if t is None or t.failures < self.breaker_failures:
+                return None
+            now = time.monotonic()
+            remaining = t.open_until - now
+            # a trial call that never reported back (cancelled) does not block forever
+            if remaining <= 0 and (not t.trial or now - t.trial >= self.breaker_cooldown):
+                t.trial = now
+                return None
+            return {"error": "circuit_open",
+                    "detail": f"{name} failed {t.failures} times in a row (timeouts or crashes); "
+                              f"not running it again for a while",
+                    "retry_after_s": round(max(remaining, 0.0), 1)}
+
+    def record(self, name: str, res: dict, wall_s: Optional[float], timeout: float) -> None:
+        """Account one finished run of `name` that was given `timeout` seconds."""
+        failed = bool(res.get("timeout")) or is_crash(res)
+        with self._lock:
+            t = self._tool(name)
+            t.trial = 0.0
+            if res.get("timeout"):
+                t.floor = min(self.max_timeout, max(t.floor or 0.0, timeout * 2))
+            elif wall_s is not None and res.get("exit_code") is not None:
+                t.runs.append(round(wall_s, 4))
+                t.floor = None
+            if failed:
+                t.failures += 1
+                if self.breaker_failures and t.failures >= self.breaker_failures:
+                    t.open_until = time.monotonic() + self.breaker_cooldown
+                    t.trips += 1
+                    LOG.warning("circuit open for %s after %d failures; cooling down %.0fs",
+                                name, t.failures, self.breaker_cooldown)
+            else:
+                t.failures = 0
+            self._dirty = True
+        if self.stats_file is not None and time.monotonic() - self._saved_at >= self.save_interval:
+            self.save()
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        out = {}
+        with self._lock:
+            names = sorted(self._tools)
+        for name in names:
+            timeout = self.timeout_for(name)
+            with self._lock:
+                t = self._tools[name]
+                out[name] = {
+                    "samples": len(t.runs),
+                    "p50_s": sorted(t.runs)[len(t.runs) // 2] if t.runs else None,
+                    "timeout_s": timeout,
+                    "floor_s": t.floor,
+                    "failures": t.failures,
+                    "circuit": self._circuit(t, now),
+                    "trips": t.trips,
+                }
+        return out
+
+    def _circuit(self, t: _Tool, now: float) -> str:
+        if not self.breaker_failures or t.failures < self.breaker_failures:
+            return "closed"
+        return "open" if t.open_until > now else "half-open"
+
+    def load(self) -> None:
+        try:
+            data = json.loads(self.stats_file.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as ex:
+            LOG.warning("ignoring unreadable tool stats %s: %s", self.stats_file, ex)
+            return
+        if not isinstance(data, dict) or data.get("version") != STATS_VERSION:
+            return
+        with self._lock:
+            for name, rec in (data.get("tools") or {}).items():
+                t = self._tool(name)
+                t.runs.extend(float(x) for x in rec.get("runs") or [])
+                t.floor = rec.get("floor")
+
+    def save(self) -> None:
+        with self._lock:
+            if not self._dirty:
+                return
+            data = {"version": STATS_VERSION, "saved": time.time(),
+                    "tools": {name: {"runs": list(t.runs), "floor": t.floor} for name, t in self._tools.items()}}
+            self._dirty = False
+            self._saved_at = time.monotonic()
+        try:
+            self.stats_file.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.stats_file.with_name(self.stats_file.name + ".tmp")
+            tmp.write_text(json.dumps(data, separators=(",", ":")), encoding="utf-8")
+            os.replace(tmp, self.stats_file)
+        except OSError as ex:
+            LOG.warning("could not save tool stats to %s: %s", self.stats_file, ex)
+
+
+_HEALTH: Optional[ToolHealth] = None
+
+
+def get_tool_health(cfg: Optional[dict] = None) -> ToolHealth:
+    global _HEALTH
+    if _HEALTH is None:
+        cfg = cfg or {}
+        _HEALTH = ToolHealth(
+            default_timeout=float(cfg.get("TIMEOUT", 30)),
+            adaptive=str(cfg.get("TIMEOUT_ADAPTIVE", "false")).lower() in ("1", "true", "yes"),
+            percentile=float(cfg.get("TIMEOUT_PERCENTILE", 99)),
+            headroom=float(cfg.get("TIMEOUT_HEADROOM", 1.5)),
+            min_headroom=float(cfg.get("TIMEOUT_MIN_HEADROOM", 2)),
+            min_samples=int(cfg.get("TIMEOUT_MIN_SAMPLES", 5)),
+            min_timeout=float(cfg.get("TIMEOUT_MIN", 5)),
+            max_timeout=float(cfg.get("TIMEOUT_MAX", 600)),
+            window=int(cfg.get("TIMEOUT_WINDOW", 100)),
+            breaker_failures=int(cfg.get("BREAKER_FAILURES", 0)),
+            breaker_cooldown=float(cfg.get("BREAKER_COOLDOWN", 60)),
+            stats_file=cfg.get("TIMEOUT_STATS_FILE") or None,
+        )
+        if _HEALTH.stats_file is not None:
+            atexit.register(_HEALTH.save)
+    return _HEALTH
@@ -1,8 +1,9 @@
-import json
 import logging
 import os
 from pathlib import Path
 
+from registry import get_registry
+
 LOG = logging.getLogger("mcp_tools")
 
 
@@ -18,7 +19,7 @@ def register_tools_with_fastmcp(app=None, binaries_path: str = "binaries.json"):
         LOG.warning("binaries.json not found; no tools to register")
         return []
 
-    bins = json.loads(p.read_text(encoding="utf-8"))
+    bins = get_registry(binaries_path).entries()
     registered = []
 
     for entry in bins:
@@ -0,0 +1,193 @@
+"""Worker agent for the persistent-worker executor backend.
+
+The server starts one worker per target with the command from `[targets]`,
+for example `ssh -T host1 python worker.py`, and keeps it running. Every
+tool run is then a request over the worker's stdin/stdout instead of a new
+connection. The worker runs the tool with `runner.run_command`, so the same
+output limits, timeouts and process-tree kills apply on the target.
+
+Frames are a 4-byte big-endian length followed by that many bytes of UTF-8
+JSON. Requests carry an `id`, and several may be in flight at once:
+
+    {"id": 1, "op": "run", "exe": ..., "argv": [...], "timeout": 30,
+     "head_bytes": ..., "tail_bytes": ..., "kill_grace": 2, "stream": true}
+    {"id": 1, "op": "cancel"}
+    {"id": 2, "op": "ping"}
+
+Replies are `{"id", "result": {...}, "metrics": {...}}` for a run, and
+`{"id", "pong": true, "pid", "slots"}` for a ping, where `slots` is
+`--max-concurrent`: the server keeps at most that many runs in flight, so
+none waits in the worker's queue while its reply deadline runs. A streaming run also sends
+`{"id", "stream": "stdout"|"stderr", "data": text}` as output arrives.
+Relative exe paths are resolved against `--root`.
+
+Only this file and runner.py are needed on a target.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import struct
+import sys
+import threading
+from typing import BinaryIO, Dict, Optional
+
+from runner import run_command
+
+LOG = logging.getLogger("mcp_worker")
+
+HEADER = struct.Struct(">I")
+MAX_FRAME = 64 * 1024 * 1024
+
+
+class FrameError(ValueError):
+    """The peer sent something that is not a valid frame."""
+
+
+def encode_frame(msg: dict) -> bytes:
+    body = json.dumps(msg, separators=(",", ":")).encode("utf-8")
+    return HEADER.pack(len(body)) + body
+
+
+def _decode(body: bytes) -> dict:
+    try:
+        msg = json.loads(body.decode("utf-8"))
+    except ValueError as ex:
+        raise FrameError(f"bad frame: {ex}")
+    if not isinstance(msg, dict):
+        raise FrameError("bad frame: not a JSON object")
+    return msg
+
+
+def read_frame(stream: BinaryIO) -> Optional[dict]:
+    """Next frame from a blocking binary stream; None at EOF."""
+    head = stream.read(HEADER.size)
+    if len(head) < HEADER.size:
+        return None
+    (size,) = HEADER.unpack(head)
+    if size > MAX_FRAME:
+        raise FrameError(f"frame of {size} bytes exceeds {MAX_FRAME}")
+    body = stream.read(size)
+    if len(body) < size:
+        return None
+    return _decode(body)
+
+
+async def read_frame_async(reader: asyncio.StreamReader) -> Optional[dict]:
+    """Next frame from an asyncio stream; None at EOF."""
+    try:
+        head = await reader.readexactly(HEADER.size)
+        (size,) = HEADER.unpack(head)
+        if size > MAX_FRAME:
+            raise FrameError(f"frame of {size} bytes exceeds {MAX_FRAME}")
+        return _decode(await reader.readexactly(size))
+    except asyncio.IncompleteReadError:
+        return None
+
+
+class Worker:
+    def __init__(self, out: BinaryIO, root: Optional[str] = None, max_concurrent: int = 8):
+        self.out = out
+        self.root = root
+        self.max_concurrent = max(1, max_concurrent)
+        self._slots = asyncio.Semaphore(self.max_concurrent)
+        self._tasks: Dict[object, asyncio.Task] = {}
+
+    def send(self, msg: dict) -> None:
+        # only the loop thread writes, one whole frame at a time
+        self.out.write(encode_frame(msg))
+        self.out.flush()
+
+    def _exe(self, exe: str) -> str:
+        if self.root and not os.path.isabs(exe):
+            return os.path.join(self.root, exe)
+        return exe
+
+    async def _run(self, req: dict) -> None:
+        rid = req.get("id")
+        on_output = None
+        if req.get("stream"):
+            def on_output(stream: str, text: str):
+                self.send({"id": rid, "stream": stream, "data": text})
+        metrics: dict = {}
+        try:
+            async with self._slots:
+                res = await run_command(self._exe(str(req["exe"])), [str(a) for a in req.get("argv") or []],
+                                        timeout=float(req.get("timeout") or 30), on_output=on_output,
+                                        head_bytes=req.get("head_bytes"), tail_bytes=req.get("tail_bytes"),
+                                        kill_grace=float(req.get("kill_grace") or 2.0), metrics=metrics)
+        except asyncio.CancelledError:
+            self.send({"id": rid, "result": {"error": "cancelled", "exit_code": None, "success": False,
+                                             "timeout": False, "stdout": "", "stderr": ""}})
+            raise
+        except Exception as ex:
+            LOG.exception("run %s failed", req.get("exe"))
+            res = {"error": "worker_error", "detail": str(ex), "exit_code": None, "success": False,
+                   "timeout": False, "stdout": "", "stderr": ""}
+        finally:
+            self._tasks.pop(rid, None)
+        self.send({"id": rid, "result": res, "metrics": metrics})
+
+    def handle(self, req: dict) -> None:
+        op = req.get("op")
+        rid = req.get("id")
+        if op == "run":
+            self._tasks[rid] = asyncio.ensure_future(self._run(req))
+        elif op == "cancel":
+            task = self._tasks.get(rid)
+            if task is not None:
+                task.cancel()
+        elif op == "ping":
+            self.send({"id": rid, "pong": True, "pid": os.getpid(), "slots": self.max_concurrent})
+        else:
+            self.send({"id": rid, "result": {"error": "unknown_op", "detail": str(op)}})
+
+    async def serve(self, inp: BinaryIO) -> None:
+        """Handle requests from `inp` until EOF, then cancel what is still running."""
+        loop = asyncio.get_running_loop()
+        queue: "asyncio.Queue[Optional[dict]]" = asyncio.Queue()
+
+        def _reader():
+            # stdin cannot be read asynchronously on every platform; a thread can
+            try:
+                while True:
+                    msg = read_frame(inp)
+                    loop.call_soon_threadsafe(queue.put_nowait, msg)
+                    if msg is None:
+                        return
+            except (OSError, FrameError) as ex:
+                LOG.error("stopping: %s", ex)
+                loop.call_soon_threadsafe(queue.put_nowait, None)
+
+        threading.Thread(target=_reader, name="worker-stdin", daemon=True).start()
+        while True:
+            msg = await queue.get()
+            if msg is None:
+                break
+            self.handle(msg)
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="Run catalog tools for a remote MCP server over stdin/stdout.")
+    ap.add_argument("--root", help="directory relative exe paths are resolved against")
+    ap.add_argument("--max-concurrent", type=int, default=8, help="tools run at once (default: 8)")
+    args = ap.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, stream=sys.stderr)
+    out = sys.stdout.buffer
+    # the protocol owns stdout; stray prints go to stderr
+    sys.stdout = sys.stderr
+    worker = Worker(out, root=args.root, max_concurrent=args.max_concurrent)
+    try:
+        asyncio.run(worker.serve(sys.stdin.buffer))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())